@@ -1,31 +1,295 @@
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
 import os
+import json
+import uuid
+import base64
+import asyncio
+import datetime
+import threading
 from dotenv import load_dotenv
 import httpx
+from app.database.unit_of_work import count_round_trip, current_unit_of_work
+from app.database.metadata_cache import get_metadata_cache
 
 load_dotenv()
 
-def get_supabase():
+
+async def _count_request(_request):
+    count_round_trip()
+
+
+class SupabaseClientRegistry:
     """
-    Create and return Supabase client - simple version
+    Process-wide holder for the Supabase client and its pooled HTTP connection.
+
+    Every repository used to build its own client (and its own httpx.Client),
+    which meant a fresh TLS handshake per repository per request. The registry
+    builds one client on first use (or at FastAPI startup) and hands the same
+    instance to every repository until shutdown closes it.
+
+    Pool settings come from the environment:
+    - SUPABASE_MAX_CONNECTIONS (default: 20)
+    - SUPABASE_MAX_KEEPALIVE (default: 10)
+    - SUPABASE_KEEPALIVE_EXPIRY seconds (default: 30)
+    - SUPABASE_HTTP2 "true"/"false" (default: true)
+    - SUPABASE_TIMEOUT seconds (default: 60)
     """
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_KEY")
 
-    if not url or not key:
-        raise ValueError("Missing Supabase credentials in .env")
+    def __init__(self):
+        self._client = None
+        self._http_client = None
+        self._lock = threading.Lock()
+        self._async_client = None
+        self._async_http_client = None
+        self._async_loop = None
+        self._async_lock = None
+        self._async_lock_loop = None
+
+    @staticmethod
+    def _credentials():
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_SERVICE_KEY")
+
+        if not url or not key:
+            raise ValueError("Missing Supabase credentials in .env")
+
+        return url, key
+
+    @staticmethod
+    def _http_settings():
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+        )
+
+        # SSL verification stays disabled as before, the pool just keeps the
+        # connections (and their handshakes) alive between requests
+        return {
+            "timeout": float(os.getenv("SUPABASE_TIMEOUT", "60")),
+            "verify": False,
+            "limits": limits,
+            "http2": os.getenv("SUPABASE_HTTP2", "true").lower() == "true",
+            "follow_redirects": True
+        }
+
+    def startup(self):
+        """Create the shared client if it does not exist yet and return it."""
+        if self._client is not None:
+            return self._client
+
+        with self._lock:
+            if self._client is None:
+                url, key = self._credentials()
+
+                self._http_client = httpx.Client(**self._http_settings())
+                self._client = create_client(
+                    url,
+                    key,
+                    options=ClientOptions(httpx_client=self._http_client)
+                )
+
+        return self._client
+
+    def shutdown(self):
+        """Close the pooled connections and forget the client."""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._client = None
+
+    def _loop_lock(self, loop):
+        # asyncio locks belong to one event loop, each loop gets its own
+        with self._lock:
+            if self._async_lock_loop is not loop:
+                self._async_lock = asyncio.Lock()
+                self._async_lock_loop = loop
+            return self._async_lock
 
-    # Create client with SSL disabled and long timeout
-    http_client = httpx.Client(
-        timeout=60.0,
-        verify=False  # Disable SSL verification
+    async def astartup(self):
+        """
+        Create the shared async client if needed and return it.
+
+        The async client is bound to the event loop it was created on, so a
+        new loop (e.g. a CLI script calling asyncio.run twice) gets a new one
+        and the previous one's connections are closed. Concurrent first
+        calls wait for a single client to be built.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is not None and self._async_loop is loop:
+            return self._async_client
+
+        async with self._loop_lock(loop):
+            if self._async_client is not None and self._async_loop is loop:
+                return self._async_client
+
+            await self._close_async_client()
+            url, key = self._credentials()
+
+            # Every request is counted against the running unit of work
+            http_client = httpx.AsyncClient(
+                **self._http_settings(),
+                event_hooks={"request": [_count_request]}
+            )
+            try:
+                self._async_client = await acreate_client(
+                    url,
+                    key,
+                    options=AsyncClientOptions(httpx_client=http_client)
+                )
+            except BaseException:
+                await http_client.aclose()
+                raise
+            self._async_http_client = http_client
+            self._async_loop = loop
+
+        return self._async_client
+
+    async def _close_async_client(self):
+        http_client = self._async_http_client
+        self._async_http_client = None
+        self._async_client = None
+        self._async_loop = None
+        if http_client is not None:
+            try:
+                await http_client.aclose()
+            except Exception as e:
+                # Its event loop may be gone already, the connections go with it
+                print(f"[WARNING] Could not close the previous Supabase connections: {e}")
+
+    async def ashutdown(self):
+        """Close the pooled async connections and forget the async client."""
+        async with self._loop_lock(asyncio.get_running_loop()):
+            await self._close_async_client()
+
+
+supabase_registry = SupabaseClientRegistry()
+
+
+def get_supabase() -> Client:
+    """
+    Return the shared Supabase client, creating it on first use.
+    """
+    return supabase_registry.startup()
+
+
+async def get_async_supabase() -> AsyncClient:
+    """
+    Return the shared async Supabase client, creating it on first use.
+    """
+    return await supabase_registry.astartup()
+
+
+def first_row(response):
+    """
+    The row an insert or update sent back, or None.
+
+    PostgREST returns the written rows (Prefer: return=representation), so
+    writes hand them to the caller instead of selecting them again.
+    """
+    data = getattr(response, "data", None)
+    if isinstance(data, list):
+        return data[0] if data else None
+    return data
+
+
+def encode_cursor(timestamp, row_id):
+    """Opaque keyset cursor for a (timestamp, uuid) position"""
+    key = json.dumps([timestamp, row_id])
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """(timestamp, uuid) of a cursor, ValueError if it is not one of ours"""
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        # Both go into a PostgREST filter, so only accept what we encoded
+        datetime.datetime.fromisoformat(timestamp)
+        return timestamp, str(uuid.UUID(row_id))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def keyset_condition(timestamp_column, id_column, operator, cursor):
+    """
+    PostgREST logic tree for rows strictly past the cursor in the
+    (timestamp_column, id_column) order, operator "lt" or "gt".
+    """
+    timestamp, row_id = decode_cursor(cursor)
+    return (
+        f'or({timestamp_column}.{operator}."{timestamp}",'
+        f'and({timestamp_column}.eq."{timestamp}",{id_column}.{operator}.{row_id}))'
     )
 
-    client = create_client(url, key)
-    client.postgrest.session = http_client
 
-    return client
+class MetadataCacheMixin:
+    """
+    Read-through helpers over the metadata cache (app/database/metadata_cache.py);
+    when it is disabled reads go to the database and invalidations do nothing.
+    """
+
+    @staticmethod
+    def _cached(table, column, value):
+        cache = get_metadata_cache()
+        return cache.get(table, column, value) if cache is not None and value else None
+
+    @staticmethod
+    def _cache(table, column, value, row):
+        cache = get_metadata_cache()
+        return cache.put(table, column, value, row) if cache is not None and value else row
 
-class BaseRepo:
-    def __init__(self):
-        self.client = get_supabase()
\ No newline at end of file
+    @staticmethod
+    def _invalidate(table, column, value):
+        cache = get_metadata_cache()
+        if cache is not None and value:
+            cache.invalidate(table, column, value)
+
+
+class BaseRepo(MetadataCacheMixin):
+    def __init__(self, client: Client = None):
+        self.client = client or get_supabase()
+
+
+class AsyncBaseRepo(MetadataCacheMixin):
+    """
+    Base for repositories built on the async Supabase client.
+
+    The client has to be awaited into existence, so build repositories with
+    `await SomeRepo.create()` instead of calling the class directly.
+    """
+    def __init__(self, client: AsyncClient):
+        self.client = client
+
+    @classmethod
+    async def create(cls):
+        return cls(await get_async_supabase())
+
+    # Identity map of the request's unit of work (see app/database/unit_of_work.py);
+    # without an open unit of work these fall through to the database
+
+    @staticmethod
+    def _loaded(table, column, value):
+        uow = current_unit_of_work()
+        return uow.get(table, column, value) if uow is not None and value else None
+
+    @staticmethod
+    def _remember(table, row, *columns):
+        uow = current_unit_of_work()
+        return uow.remember(table, row, *columns) if uow is not None else row
+
+    @staticmethod
+    def _forget(table, column, value):
+        uow = current_unit_of_work()
+        if uow is not None:
+            uow.forget(table, column, value)
+
+    async def _update(self, table, column, value, data):
+        """Update the row where column == value and return it, staged until the unit of work flushes"""
+        uow = current_unit_of_work()
+        if uow is not None:
+            return uow.stage_update(self.client, table, column, value, data)
+        response = await self.client.table(table).update(data).eq(column, value).execute()
+        self._invalidate(table, column, value)
+        return first_row(response)
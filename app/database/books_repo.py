@@ -7,7 +7,45 @@ if __name__ == "__main__":
 
 import uuid
 import datetime
-from app.database.base import BaseRepo
+from app.database.base import BaseRepo, AsyncBaseRepo, first_row
+
+
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".txt": "text/plain",
+    ".epub": "application/epub+zip"
+}
+
+
+def _content_type(filename):
+    """Detect content type based on file extension"""
+    file_ext = os.path.splitext(filename)[1].lower()
+    return CONTENT_TYPES.get(file_ext, "application/octet-stream")
+
+
+def _book_lookup(book_id=None, book_title=None, filename=None):
+    # The column a book is looked up or deleted by, the first one given
+    for column, value in (("book_id", book_id), ("book_title", book_title), ("filename", filename)):
+        if value:
+            return column, value
+    return None, None
+
+
+def _book_row(user_id, filename, author, book_title, storage_path, pinecone_namespace):
+    if pinecone_namespace is None:
+        pinecone_namespace = f"user_{user_id}"
+    return {
+        "book_id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "book_title": book_title,
+        "filename": filename,
+        "storage_path": storage_path,
+        "author": author,
+        "metadata": {},
+        "pinecone_namespace": pinecone_namespace,
+        "uploaded_at": datetime.datetime.now().isoformat()
+    }
 
 
 class BooksRepository(BaseRepo):
@@ -20,17 +58,7 @@ class BooksRepository(BaseRepo):
     def upload_file_to_storage(self, user_id: str, file_content: bytes, filename: str, bucket_name: str = "book_storage"):
         """Upload file to Supabase Storage in user's subfolder"""
         storage_path = f"{user_id}/{filename}"
-
-        # Detect content type based on file extension
-        content_types = {
-            ".pdf": "application/pdf",
-            ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            ".txt": "text/plain",
-            ".epub": "application/epub+zip"
-        }
-
-        file_ext = os.path.splitext(filename)[1].lower()
-        content_type = content_types.get(file_ext, "application/octet-stream")
+        content_type = _content_type(filename)
 
         result = self.client.storage.from_(bucket_name).upload(
             path=storage_path,
@@ -43,36 +71,23 @@ class BooksRepository(BaseRepo):
         }
 
     def create_book(self, user_id=None, filename=None, author=None, book_title=None, storage_path=None, pinecone_namespace=None):
-        if pinecone_namespace is None:
-            pinecone_namespace = f"user_{user_id}"
-        else:
-            pass
-        books_data = {
-            "book_id": str(uuid.uuid4()),
-            "user_id": user_id,
-            "book_title": book_title,
-            "filename": filename,
-            "storage_path": storage_path,
-            "author": author,
-            "metadata": {},
-            "pinecone_namespace": pinecone_namespace,
-            "uploaded_at": datetime.datetime.now().isoformat()
-        }
+        books_data = _book_row(user_id, filename, author, book_title, storage_path, pinecone_namespace)
         response = self.client.table("books_table").insert(books_data).execute()
-        print("Created Success") 
-        return response
-       
+        print("Created Success")
+        return self._cache("books_table", "book_id", books_data["book_id"], first_row(response))
+
     def get_book_by_id(self, book_id=None, book_title=None, filename=None):
         try:
-            if book_id:
-                data_on_book = self.client.table("books_table").select("*").eq("book_id", book_id).execute()
-                return data_on_book.data[0] if data_on_book.data else None
-            elif book_title:
-                data_on_book = self.client.table("books_table").select("*").eq("book_title", book_title).execute()
-                return data_on_book.data[0] if data_on_book.data else None
-            elif filename:
-                data_on_book = self.client.table("books_table").select("*").eq("filename", filename).execute()
-                return data_on_book.data[0] if data_on_book.data else None
+            column, value = _book_lookup(book_id, book_title, filename)
+            if column is None:
+                return None
+            cached = self._cached("books_table", column, value)
+            if cached is not None:
+                return cached
+            data_on_book = self.client.table("books_table").select("*").eq(column, value).execute()
+            if not data_on_book.data:
+                return None
+            return self._cache("books_table", column, value, data_on_book.data[0])
         except Exception as e:
             print(e)
             return None
@@ -84,3 +99,86 @@ class BooksRepository(BaseRepo):
         except Exception as e:
             print(e)
             return None
+
+    def delete_file_from_storage(self, storage_path: str, bucket_name: str = "book_storage"):
+        """Remove a stored file from Supabase Storage"""
+        return self.client.storage.from_(bucket_name).remove([storage_path])
+
+    def delete_book(self, book_id=None, book_title=None):
+        column, value = _book_lookup(book_id, book_title)
+        if column is None:
+            return None
+        response = self.client.table("books_table").delete().eq(column, value).execute()
+        self._invalidate("books_table", column, value)
+        return response
+
+
+class AsyncBooksRepository(AsyncBaseRepo):
+    """
+    Async variant of BooksRepository for use inside FastAPI handlers
+    """
+    async def upload_file_to_storage(self, user_id: str, file_content: bytes, filename: str, bucket_name: str = "book_storage"):
+        """Upload file to Supabase Storage in user's subfolder"""
+        storage_path = f"{user_id}/{filename}"
+
+        await self.client.storage.from_(bucket_name).upload(
+            path=storage_path,
+            file=file_content,
+            file_options={"content-type": _content_type(filename)}
+        )
+
+        return {
+            "storage_path": storage_path
+        }
+
+    async def download_file_from_storage(self, storage_path: str, bucket_name: str = "book_storage"):
+        """Download a stored file's bytes from Supabase Storage"""
+        return await self.client.storage.from_(bucket_name).download(storage_path)
+
+    async def create_book(self, user_id=None, filename=None, author=None, book_title=None, storage_path=None, pinecone_namespace=None):
+        books_data = _book_row(user_id, filename, author, book_title, storage_path, pinecone_namespace)
+        response = await self.client.table("books_table").insert(books_data).execute()
+        print("Created Success")
+        row = self._cache("books_table", "book_id", books_data["book_id"], first_row(response))
+        return self._remember("books_table", row, "book_id")
+
+    async def get_book_by_id(self, book_id=None, book_title=None, filename=None):
+        try:
+            column, value = _book_lookup(book_id, book_title, filename)
+            if column is None:
+                return None
+            loaded = self._loaded("books_table", column, value)
+            if loaded is not None:
+                return loaded
+            cached = self._cached("books_table", column, value)
+            if cached is not None:
+                return self._remember("books_table", cached, "book_id", column)
+            data_on_book = await self.client.table("books_table").select("*").eq(column, value).execute()
+            if not data_on_book.data:
+                return None
+            row = self._cache("books_table", column, value, data_on_book.data[0])
+            return self._remember("books_table", row, "book_id", column)
+        except Exception as e:
+            print(e)
+            return None
+
+    async def get_all_books(self, user_id):
+        try:
+            data_on_book = await self.client.table("books_table").select("*").eq("user_id", user_id).execute()
+            return data_on_book.data if data_on_book.data else None
+        except Exception as e:
+            print(e)
+            return None
+
+    async def delete_file_from_storage(self, storage_path: str, bucket_name: str = "book_storage"):
+        """Remove a stored file from Supabase Storage"""
+        return await self.client.storage.from_(bucket_name).remove([storage_path])
+
+    async def delete_book(self, book_id=None, book_title=None):
+        column, value = _book_lookup(book_id, book_title)
+        if column is None:
+            return None
+        self._forget("books_table", column, value)
+        response = await self.client.table("books_table").delete().eq(column, value).execute()
+        self._invalidate("books_table", column, value)
+        return response
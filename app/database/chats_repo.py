@@ -7,13 +7,55 @@ if __name__ == "__main__":
 
 import uuid
 import datetime
-from app.database.base import BaseRepo
+from app.database.base import BaseRepo, AsyncBaseRepo, first_row, encode_cursor, keyset_condition
+
+# Columns of a chat listing, the messages JSON stays in the database
+CHAT_LIST_COLUMNS = "chat_id, user_id, chat_title, created_at, updated_at"
+
+
+def encode_chat_cursor(chat):
+    """Opaque cursor pointing just after `chat` in the (updated_at, chat_id) order"""
+    return encode_cursor(chat["updated_at"], chat["chat_id"])
+
+
+def _chat_page_query(table, user_id, limit, cursor, with_message_count):
+    """
+    Build the select of one page of a user's chats, most recently updated first.
+
+    Keyset pagination: the page starts strictly after the cursor's
+    (updated_at, chat_id), so every page is an index range scan on
+    (user_id, updated_at desc, chat_id desc) however deep the user scrolls.
+    One row more than limit is fetched to know whether another page exists.
+    """
+    columns = CHAT_LIST_COLUMNS
+    if with_message_count:
+        # Embedded aggregate over the messages_table.chat_id foreign key
+        columns += ", messages_table(count)"
+
+    query = table.select(columns).eq("user_id", user_id)
+    if cursor:
+        query = query.or_(keyset_condition("updated_at", "chat_id", "lt", cursor))
+    return query.order("updated_at", desc=True).order("chat_id", desc=True).limit(limit + 1)
+
+
+def _chat_page(rows, limit):
+    chats = []
+    for row in rows[:limit]:
+        counts = row.pop("messages_table", None)
+        if counts is not None:
+            row["message_count"] = counts[0]["count"] if counts else 0
+        chats.append(row)
+
+    next_cursor = encode_chat_cursor(chats[-1]) if len(rows) > limit else None
+    return {"chats": chats, "next_cursor": next_cursor}
+
 
 class chatsRepo(BaseRepo):
      def __init__(self):
         super().__init__() #getting supabase client from BaseRepo
 
      def create_chat(self, user_id=None, title=None, updated_at=None):
+        """Insert a new chat and return its row, or None on error"""
         if updated_at is None:
             updated_at = datetime.datetime.now().isoformat()
 
@@ -28,18 +70,21 @@ class chatsRepo(BaseRepo):
 
         try:
             response = self.client.table("chats_table").insert(chat_data).execute()
-            return response
+            return first_row(response)
         except Exception as e:
             print(e)
             return None
 
-     def get_chat_by_id(self, chat_id=None, title=None):
+     def get_chat_by_id(self, chat_id=None, title=None, columns="*"):
+        # columns=CHAT_LIST_COLUMNS skips the messages JSON when it is not needed
         try:
             if chat_id:
-                data_on_chat = self.client.table("chats_table").select("*").eq("chat_id", chat_id).execute()
+                # Not in the metadata cache: the messages JSON changes every turn and a
+                # stale copy in one worker would overwrite turns saved by another
+                data_on_chat = self.client.table("chats_table").select(columns).eq("chat_id", chat_id).execute()
                 return data_on_chat.data[0] if data_on_chat.data else None
             elif title:
-                data_on_chat = self.client.table("chats_table").select("*").eq("chat_title", title).execute()
+                data_on_chat = self.client.table("chats_table").select(columns).eq("chat_title", title).execute()
                 return data_on_chat.data[0] if data_on_chat.data else None
         except Exception as e:
             print(e)
@@ -53,6 +98,37 @@ class chatsRepo(BaseRepo):
             print(e)
             return None
 
+     def list_chats(self, user_id, limit=20, cursor=None, with_message_count=False):
+        """
+        One page of a user's chats without their messages, most recently
+        updated first.
+
+        Parameters:
+        -----------
+        user_id : str
+            The user whose chats are listed
+        limit : int
+            Chats per page
+        cursor : str
+            next_cursor of the previous page, None for the first page
+        with_message_count : bool
+            Add each chat's message_count (one aggregate over messages_table)
+
+        Returns:
+        --------
+        dict : {"chats": [...], "next_cursor": str or None}, or None if error
+
+        Raises:
+        -------
+        ValueError : If cursor is not a valid chat cursor
+        """
+        query = _chat_page_query(self.client.table("chats_table"), user_id, limit, cursor, with_message_count)
+        try:
+            return _chat_page(query.execute().data or [], limit)
+        except Exception as e:
+            print(f"Error listing chats: {e}")
+            return None
+
      def get_chat_messages(self, chat_id=None):
         """
         Retrieves all messages for a specific chat in chronological order.
@@ -84,6 +160,7 @@ class chatsRepo(BaseRepo):
         """
         Updates the chat's messages field with a new message from messages_table.
         Retrieves the message by message_id and appends it to the chat's messages in OpenAI format.
+        Returns the updated chat row, or None on error.
         """
         try:
             if message_id:
@@ -91,7 +168,7 @@ class chatsRepo(BaseRepo):
             else: 
                 print("Sorry Enter a message_ID to retreive the data ")
             # Get the message from messages_table
-            message_data = self.client.table("messages_table").select("role, content").eq("message_id", message_id).execute()
+            message_data = self.client.table("messages_table").select("role, content, created_at").eq("message_id", message_id).execute()
 
             if not message_data.data:
                 print(f"Message with id {message_id} not found")
@@ -111,7 +188,8 @@ class chatsRepo(BaseRepo):
             # Create new message in OpenAI format
             new_message = {
                 "role": message["role"],
-                "content": message["content"]
+                "content": message["content"],
+                "created_at": message.get("created_at")
             }
 
             # Add message to messages dict with message_id as key
@@ -125,8 +203,234 @@ class chatsRepo(BaseRepo):
 
             response = self.client.table("chats_table").update(update_data).eq("chat_id", chat_id).execute()
             print("Updated Chat Successfully")
-            return response
+            return first_row(response)
+
+        except Exception as e:
+            print(f"Error updating chat: {e}")
+            return None
+
+     def append_messages(self, chat_id=None, message_rows=None, chat_data=None):
+        """
+        Append newly inserted messages to the chat's messages field with one update.
+
+        Pass chat_data when the chat row is already loaded to skip the select.
+        Returns the updated chat row, or None on error.
+        """
+        try:
+            if chat_data is None:
+                chat_data = self.get_chat_by_id(chat_id=chat_id)
+                if not chat_data:
+                    print(f"Chat with id {chat_id} not found")
+                    return None
+
+            messages = dict(chat_data.get("messages") or {})
+            for row in message_rows or []:
+                # created_at orders the turns: jsonb does not keep the keys' order
+                messages[row["message_id"]] = {"role": row["role"], "content": row["content"], "created_at": row.get("created_at")}
+
+            update_data = {
+                "messages": messages,
+                "updated_at": datetime.datetime.now().isoformat()
+            }
+            response = self.client.table("chats_table").update(update_data).eq("chat_id", chat_id).execute()
+            return first_row(response)
 
         except Exception as e:
             print(f"Error updating chat: {e}")
-            return None
\ No newline at end of file
+            return None
+
+     def delete_chat(self, chat_id=None):
+        """Delete a chat and the messages that belong to it"""
+        self.client.table("messages_table").delete().eq("chat_id", chat_id).execute()
+        response = self.client.table("chats_table").delete().eq("chat_id", chat_id).execute()
+        return response
+
+
+class AsyncChatsRepo(AsyncBaseRepo):
+    """
+    Async variant of chatsRepo for use inside FastAPI handlers.
+
+    Within a request's unit of work a chat is selected at most once and its
+    updates are sent together when the request ends.
+    """
+    async def create_chat(self, user_id=None, title=None, updated_at=None):
+        """Insert a new chat and return its row, or None on error"""
+        if updated_at is None:
+            updated_at = datetime.datetime.now().isoformat()
+
+        chat_data = {
+            "chat_id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "chat_title": title,
+            "created_at": datetime.datetime.now().isoformat(),
+            "updated_at": updated_at,
+            "messages": {}
+        }
+
+        try:
+            response = await self.client.table("chats_table").insert(chat_data).execute()
+            return self._remember("chats_table", first_row(response), "chat_id")
+        except Exception as e:
+            print(e)
+            return None
+
+    async def get_chat_by_id(self, chat_id=None, title=None, columns="*"):
+        # columns=CHAT_LIST_COLUMNS skips the messages JSON when it is not needed
+        try:
+            if chat_id:
+                # A chat already loaded in this request is not selected again
+                loaded = self._loaded("chats_table", "chat_id", chat_id)
+                if loaded is not None:
+                    return loaded
+                # Not in the metadata cache, see chatsRepo.get_chat_by_id
+                data_on_chat = await self.client.table("chats_table").select(columns).eq("chat_id", chat_id).execute()
+                if not data_on_chat.data:
+                    return None
+                if columns == "*":
+                    return self._remember("chats_table", data_on_chat.data[0], "chat_id")
+                return data_on_chat.data[0]
+            elif title:
+                data_on_chat = await self.client.table("chats_table").select(columns).eq("chat_title", title).execute()
+                return data_on_chat.data[0] if data_on_chat.data else None
+        except Exception as e:
+            print(e)
+            return None
+
+    async def get_all_chats(self, user_id):
+        try:
+            data_on_chat = await self.client.table("chats_table").select("*").eq("user_id", user_id).execute()
+            return data_on_chat.data if data_on_chat.data else None
+        except Exception as e:
+            print(e)
+            return None
+
+    async def list_chats(self, user_id, limit=20, cursor=None, with_message_count=False):
+        """
+        One page of a user's chats without their messages, see chatsRepo.list_chats.
+        """
+        query = _chat_page_query(self.client.table("chats_table"), user_id, limit, cursor, with_message_count)
+        try:
+            response = await query.execute()
+            return _chat_page(response.data or [], limit)
+        except Exception as e:
+            print(f"Error listing chats: {e}")
+            return None
+
+    async def get_chat_messages(self, chat_id=None):
+        """
+        Retrieves all messages for a specific chat in chronological order.
+        Returns a list of messages with role and content.
+        """
+        try:
+            chat = await self.get_chat_by_id(chat_id=chat_id)
+            if not chat:
+                print(f"Chat with id {chat_id} not found")
+                return None
+
+            messages = chat.get("messages", {})
+
+            return [
+                {
+                    "message_id": message_id,
+                    "role": message_data.get("role"),
+                    "content": message_data.get("content")
+                }
+                for message_id, message_data in messages.items()
+            ]
+        except Exception as e:
+            print(f"Error retrieving chat messages: {e}")
+            return None
+
+    async def update_chat(self, chat_id=None, message_id=None):
+        """
+        Updates the chat's messages field with a new message from messages_table.
+        Retrieves the message by message_id and appends it to the chat's messages in OpenAI format.
+        Returns the updated chat row, or None on error.
+        """
+        try:
+            if not message_id:
+                print("Sorry Enter a message_ID to retreive the data ")
+
+            message = self._loaded("messages_table", "message_id", message_id)
+            if message is None:
+                message_data = await self.client.table("messages_table").select("role, content, created_at").eq("message_id", message_id).execute()
+
+                if not message_data.data:
+                    print(f"Message with id {message_id} not found")
+                    return None
+
+                message = message_data.data[0]
+
+            chat = await self.get_chat_by_id(chat_id=chat_id)
+            if not chat:
+                print(f"Chat with id {chat_id} not found")
+                return None
+
+            messages = chat.get("messages", {})
+            messages[message_id] = {
+                "role": message["role"],
+                "content": message["content"],
+                "created_at": message.get("created_at")
+            }
+
+            update_data = {
+                "messages": messages,
+                "updated_at": datetime.datetime.now().isoformat()
+            }
+
+            row = await self._update("chats_table", "chat_id", chat_id, update_data)
+            print("Updated Chat Successfully")
+            return row
+
+        except Exception as e:
+            print(f"Error updating chat: {e}")
+            return None
+
+    async def update_history_summary(self, chat_id=None, summary=None, message_count=0):
+        """
+        Cache the summary of the chat's oldest message_count messages on the chat row
+        (history_summary / history_summary_count columns, see HistoryManager).
+        """
+        try:
+            update_data = {
+                "history_summary": summary,
+                "history_summary_count": message_count
+            }
+            return await self._update("chats_table", "chat_id", chat_id, update_data)
+        except Exception as e:
+            print(f"Error caching chat summary: {e}")
+            return None
+
+    async def append_messages(self, chat_id=None, message_rows=None, chat_data=None):
+        """
+        Append newly inserted messages to the chat's messages field with one
+        update, see chatsRepo.append_messages.
+        """
+        try:
+            if chat_data is None:
+                chat_data = await self.get_chat_by_id(chat_id=chat_id)
+                if not chat_data:
+                    print(f"Chat with id {chat_id} not found")
+                    return None
+
+            messages = dict(chat_data.get("messages") or {})
+            for row in message_rows or []:
+                # created_at orders the turns: jsonb does not keep the keys' order
+                messages[row["message_id"]] = {"role": row["role"], "content": row["content"], "created_at": row.get("created_at")}
+
+            update_data = {
+                "messages": messages,
+                "updated_at": datetime.datetime.now().isoformat()
+            }
+            return await self._update("chats_table", "chat_id", chat_id, update_data)
+
+        except Exception as e:
+            print(f"Error updating chat: {e}")
+            return None
+
+    async def delete_chat(self, chat_id=None):
+        """Delete a chat and the messages that belong to it"""
+        self._forget("chats_table", "chat_id", chat_id)
+        await self.client.table("messages_table").delete().eq("chat_id", chat_id).execute()
+        response = await self.client.table("chats_table").delete().eq("chat_id", chat_id).execute()
+        return response
@@ -7,13 +7,70 @@ if __name__ == "__main__":
 
 import uuid
 import datetime
-from app.database.base import BaseRepo
+from app.database.base import BaseRepo, AsyncBaseRepo, first_row, encode_cursor, keyset_condition
+
+MESSAGE_COLUMNS = "message_id, chat_id, role, content, created_at"
+
+
+def _message_rows(chat_id, messages):
+    # One microsecond apart so created_at keeps the turn's order
+    now = datetime.datetime.now()
+    return [
+        {
+            "message_id": str(uuid.uuid4()),
+            "chat_id": chat_id,
+            "role": message["role"],
+            "content": message["content"],
+            "created_at": (now + datetime.timedelta(microseconds=i)).isoformat(),
+        }
+        for i, message in enumerate(messages)
+    ]
+
+
+def encode_message_cursor(message):
+    """Opaque cursor of `message`'s position in the (created_at, message_id) order"""
+    return encode_cursor(message["created_at"], message["message_id"])
+
+
+def _messages_page_query(table, chat_id, limit, before, after, newest_first):
+    """
+    Build the select of one page of a chat's messages, ordered by the database.
+
+    before / after are message cursors; only messages strictly older than
+    before and strictly newer than after are returned, so each page is an
+    index range scan on (chat_id, created_at, message_id). One row more than
+    limit is fetched to know whether another page exists.
+    """
+    query = table.select(MESSAGE_COLUMNS).eq("chat_id", chat_id)
+
+    bounds = []
+    if before:
+        bounds.append(keyset_condition("created_at", "message_id", "lt", before))
+    if after:
+        bounds.append(keyset_condition("created_at", "message_id", "gt", after))
+    if bounds:
+        query = query.or_(bounds[0] if len(bounds) == 1 else f"and({','.join(bounds)})")
+
+    return (
+        query.order("created_at", desc=newest_first)
+        .order("message_id", desc=newest_first)
+        .limit(limit + 1)
+    )
+
+
+def _messages_page(rows, limit):
+    messages = rows[:limit]
+    # Continues in the same direction: older for newest-first, newer otherwise
+    next_cursor = encode_message_cursor(messages[-1]) if len(rows) > limit else None
+    return {"messages": messages, "next_cursor": next_cursor}
+
 
 class MessagesRepo(BaseRepo):
     def __init__(self):
         super().__init__() #getting supabase client from BaseRepo
 
     def add_message(self, chat_id=None, role=None, content=None):
+        """Insert one message and return its row, or None on error"""
         chat_data = {
             "message_id": str(uuid.uuid4()),
             "chat_id": chat_id,
@@ -23,7 +80,30 @@ class MessagesRepo(BaseRepo):
         }
         try:
             response = self.client.table("messages_table").insert(chat_data).execute()
-            return response 
+            return first_row(response)
+        except Exception as e:
+            print(e)
+            return None
+
+    def add_messages(self, chat_id=None, messages=None):
+        """
+        Insert several messages of a chat in one request.
+
+        Parameters:
+        -----------
+        chat_id : str
+            The chat the messages belong to
+        messages : list of dict
+            {"role": ..., "content": ...} in conversation order
+
+        Returns:
+        --------
+        list : The inserted message rows, or None if error
+        """
+        rows = _message_rows(chat_id, messages or [])
+        try:
+            self.client.table("messages_table").insert(rows).execute()
+            return rows
         except Exception as e:
             print(e)
             return None
@@ -54,4 +134,109 @@ class MessagesRepo(BaseRepo):
                 return data.data if data.data else []
         except Exception as E:
             print(f"Couldn't load messages for chat_id {chat_id}: {E}")
-            return None
\ No newline at end of file
+            return None
+
+
+    def get_messages_page(self, chat_id, limit=50, before=None, after=None, newest_first=False):
+        """
+        One page of a chat's messages in created_at order.
+
+        Parameters:
+        -----------
+        chat_id : str
+            The chat to read
+        limit : int
+            Messages per page
+        before : str
+            Message cursor, only return messages older than it
+        after : str
+            Message cursor, only return messages newer than it
+        newest_first : bool
+            Order newest to oldest instead of oldest to newest
+
+        Returns:
+        --------
+        dict : {"messages": [...], "next_cursor": str or None}, or None if error.
+            next_cursor continues in the page's order (pass it as `after`
+            for oldest-first pages, as `before` for newest-first ones)
+
+        Raises:
+        -------
+        ValueError : If before or after is not a valid message cursor
+        """
+        query = _messages_page_query(self.client.table("messages_table"), chat_id, limit, before, after, newest_first)
+        try:
+            return _messages_page(query.execute().data or [], limit)
+        except Exception as E:
+            print(f"Couldn't load messages for chat_id {chat_id}: {E}")
+            return None
+
+
+class AsyncMessagesRepo(AsyncBaseRepo):
+    """
+    Async variant of MessagesRepo for use inside FastAPI handlers
+    """
+    async def add_message(self, chat_id=None, role=None, content=None):
+        """Insert one message and return its row, or None on error"""
+        chat_data = {
+            "message_id": str(uuid.uuid4()),
+            "chat_id": chat_id,
+            "role": role,
+            "content": content,
+            "created_at": datetime.datetime.now().isoformat(),
+        }
+        try:
+            response = await self.client.table("messages_table").insert(chat_data).execute()
+            return self._remember("messages_table", first_row(response), "message_id")
+        except Exception as e:
+            print(e)
+            return None
+
+    async def add_messages(self, chat_id=None, messages=None):
+        """Insert several messages of a chat in one request, see MessagesRepo.add_messages"""
+        rows = _message_rows(chat_id, messages or [])
+        try:
+            await self.client.table("messages_table").insert(rows).execute()
+            return [self._remember("messages_table", row, "message_id") for row in rows]
+        except Exception as e:
+            print(e)
+            return None
+
+    async def get_message_by_id(self, message_id=None):
+        try:
+            if message_id:
+                loaded = self._loaded("messages_table", "message_id", message_id)
+                if loaded is not None:
+                    return loaded
+                data_on_chat = await self.client.table("messages_table").select("*").eq("message_id", message_id).execute()
+                if not data_on_chat.data:
+                    return None
+                return self._remember("messages_table", data_on_chat.data[0], "message_id")
+        except Exception as E:
+            print(f"Couldn't Load chat, this is what the system says: {E}")
+
+    async def get_messages_by_chat_id(self, chat_id=None):
+        """
+        Get all messages for a specific chat_id.
+
+        Returns:
+        --------
+        list : List of message records, or None if error
+        """
+        try:
+            if chat_id:
+                data = await self.client.table("messages_table").select("*").eq("chat_id", chat_id).execute()
+                return data.data if data.data else []
+        except Exception as E:
+            print(f"Couldn't load messages for chat_id {chat_id}: {E}")
+            return None
+
+    async def get_messages_page(self, chat_id, limit=50, before=None, after=None, newest_first=False):
+        """One page of a chat's messages in created_at order, see MessagesRepo.get_messages_page"""
+        query = _messages_page_query(self.client.table("messages_table"), chat_id, limit, before, after, newest_first)
+        try:
+            response = await query.execute()
+            return _messages_page(response.data or [], limit)
+        except Exception as E:
+            print(f"Couldn't load messages for chat_id {chat_id}: {E}")
+            return None
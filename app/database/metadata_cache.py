@@ -0,0 +1,293 @@
+"""
+Read-through cache of user and book rows.
+
+The repositories look these rows up on almost every request although they
+rarely change. get_by_id / get_by_email / get_by_name and get_book_by_id
+first ask the process-wide MetadataCache, and every create, update or delete
+of a row invalidates it once the write has gone out (staged unit of work
+updates when they are flushed).
+
+Chat rows are not cached: their messages JSON is rewritten every turn, and
+a turn built from a stale copy would overwrite the turns saved meanwhile.
+
+Two backends:
+- "memory" (default): an LRU with TTL in this process. Other worker
+  processes keep serving their copy until it expires.
+- "sqlite": a SQLite file shared by every worker process on the host, so an
+  invalidation in one worker is seen by all of them.
+"""
+import os
+import time
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# The cached tables. Every cached row is also tagged with its primary key, so
+# a write can drop it whichever column it was looked up by
+PRIMARY_KEYS = {
+    "user_table": "user_id",
+    "books_table": "book_id"
+}
+
+
+def _key(table, column, value):
+    return f"{table}:{column}:{value}"
+
+
+class MemoryCacheBackend:
+    """In-process LRU of serialized rows with a per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (row id, serialized row, expires)
+        self._keys_by_row = {}         # row id -> keys caching it
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, row_id, value, ttl_seconds):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (row_id, value, time.monotonic() + ttl_seconds)
+            self._keys_by_row.setdefault(row_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete_row(self, row_id):
+        with self._lock:
+            for key in list(self._keys_by_row.get(row_id, ())):
+                self._drop(key)
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def _drop(self, key):
+        row_id, _value, _expires = self._entries.pop(key)
+        keys = self._keys_by_row.get(row_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_row[row_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_row.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    Serialized rows in a SQLite file, shared by the worker processes of a host.
+
+    Expired entries are skipped on read and purged when the table grows past
+    `max_entries`, oldest expiry first.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            " key TEXT PRIMARY KEY,"
+            " row_id TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS metadata_row_id ON metadata(row_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS metadata_expires ON metadata(expires)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            # Wall clock, since the expiry is shared between processes
+            row = self._conn.execute(
+                "SELECT value FROM metadata WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, row_id, value, ttl_seconds):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO metadata (key, row_id, value, expires) VALUES (?, ?, ?, ?)",
+                (key, row_id, value, time.time() + ttl_seconds)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+            if count > self.max_entries:
+                self._evict(count)
+            self._conn.commit()
+
+    def _evict(self, count):
+        # Drop expired entries, then the soonest to expire down to 90% of the limit
+        self._conn.execute("DELETE FROM metadata WHERE expires <= ?", (time.time(),))
+        count = self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+        excess = count - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM metadata WHERE key IN (SELECT key FROM metadata ORDER BY expires LIMIT ?)",
+                (excess,)
+            )
+            self.evictions += excess
+
+    def delete_row(self, row_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM metadata WHERE row_id = ?", (row_id,))
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM metadata WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM metadata")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+
+
+class MetadataCache:
+    """
+    Rows keyed by (table, lookup column, value), over a pluggable backend.
+
+    Rows are stored serialized, so callers get their own copy and can
+    modify it without touching the cache. Only found rows are cached.
+    """
+
+    def __init__(self, backend, ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._tables = {}  # table -> {"hits": ..., "misses": ...}
+        self._lock = threading.Lock()
+
+    def _count(self, table, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            counts = self._tables.setdefault(table, {"hits": 0, "misses": 0})
+            counts[outcome] += 1
+
+    def get(self, table, column, value):
+        """The cached row looked up by column == value, or None."""
+        serialized = self.backend.get(_key(table, column, value))
+        if serialized is None:
+            self._count(table, "misses")
+            return None
+        self._count(table, "hits")
+        return json.loads(serialized)
+
+    def put(self, table, column, value, row):
+        """Cache a row found by column == value and return it."""
+        if row and table in PRIMARY_KEYS:
+            row_id = f"{table}:{row.get(PRIMARY_KEYS[table])}"
+            self.backend.set(_key(table, column, value), row_id, json.dumps(row, default=str), self.ttl_seconds)
+        return row
+
+    def invalidate(self, table, column, value):
+        """
+        Forget a row after it was written.
+
+        Invalidating by the primary key drops the row under every column it
+        was cached by; by another column, the row that column pointed to.
+        """
+        if table not in PRIMARY_KEYS:
+            return
+        if column == PRIMARY_KEYS.get(table):
+            self.backend.delete_row(f"{table}:{value}")
+        else:
+            key = _key(table, column, value)
+            serialized = self.backend.get(key)
+            self.backend.delete(key)
+            if serialized is not None:
+                row = json.loads(serialized)
+                self.backend.delete_row(f"{table}:{row.get(PRIMARY_KEYS[table])}")
+        with self._lock:
+            self.invalidations += 1
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "entries": len(self.backend),
+                "max_entries": self.backend.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.backend.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "tables": {table: dict(counts) for table, counts in self._tables.items()}
+            }
+
+
+_metadata_cache = None
+_metadata_cache_lock = threading.Lock()
+
+
+def get_metadata_cache():
+    """
+    Return the process-wide MetadataCache, or None when disabled.
+
+    Configured with METADATA_CACHE_ENABLED (default: true),
+    METADATA_CACHE_BACKEND "memory" or "sqlite" (default: memory),
+    METADATA_CACHE_TTL_SECONDS (default: 60), METADATA_CACHE_MAX_ENTRIES
+    (default: 10000) and, for sqlite, METADATA_CACHE_PATH
+    (default: cache/metadata.sqlite3).
+    """
+    global _metadata_cache
+    if os.getenv("METADATA_CACHE_ENABLED", "true").lower() != "true":
+        return None
+
+    with _metadata_cache_lock:
+        if _metadata_cache is None:
+            max_entries = int(os.getenv("METADATA_CACHE_MAX_ENTRIES", "10000"))
+            if os.getenv("METADATA_CACHE_BACKEND", "memory").lower() == "sqlite":
+                backend = SQLiteCacheBackend(
+                    path=os.getenv("METADATA_CACHE_PATH", os.path.join("cache", "metadata.sqlite3")),
+                    max_entries=max_entries
+                )
+            else:
+                backend = MemoryCacheBackend(max_entries)
+            _metadata_cache = MetadataCache(
+                backend,
+                ttl_seconds=float(os.getenv("METADATA_CACHE_TTL_SECONDS", "60"))
+            )
+    return _metadata_cache
@@ -0,0 +1,170 @@
+"""
+Request-scoped unit of work shared by the async repositories.
+
+A request used to load the same chat row in the router, again in the chat
+service and again for every message appended to it. While a unit of work is
+open (one per API request, see main.py) the repositories:
+
+- serve a row they already loaded in this request from its identity map
+  instead of selecting it again;
+- stage updates to it (merged per row, the cached row is patched in place so
+  later reads see them) and send them all when the unit of work is flushed.
+
+Inserts still go out immediately, since they return the inserted row.
+Nothing staged by a request that failed is sent, and an update that could
+not be sent fails the request (FlushError) instead of being lost silently.
+
+Every HTTP request the shared Supabase client sends is counted against the
+current unit of work (see SupabaseClientRegistry), which main.py reports in
+the X-DB-Round-Trips header.
+"""
+import os
+import contextvars
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from app.database.metadata_cache import get_metadata_cache
+
+load_dotenv()
+
+_current = contextvars.ContextVar("unit_of_work", default=None)
+
+
+class FlushError(Exception):
+    """One or more staged updates could not be sent."""
+
+
+class UnitOfWork:
+    """
+    Identity map plus pending updates of one request.
+
+    Rows are keyed by (table, column, value) for every unique column they
+    were looked up or cached by, e.g. ("chats_table", "chat_id", "...").
+    """
+
+    def __init__(self):
+        self.round_trips = 0
+        self.identity_hits = 0
+        self.closed = False
+        self._rows = {}
+        self._pending = {}  # (table, column, value) -> (client, update data)
+
+    def get(self, table, column, value):
+        """The row loaded earlier in this request, or None."""
+        row = self._rows.get((table, column, value))
+        if row is not None:
+            self.identity_hits += 1
+        return row
+
+    def remember(self, table, row, *columns):
+        """Cache row under each of its unique columns and return it."""
+        if row:
+            for column in columns:
+                if row.get(column) is not None:
+                    self._rows[(table, column, row[column])] = row
+        return row
+
+    def forget(self, table, column, value):
+        """Drop a deleted row from the identity map and its pending updates."""
+        key = (table, column, value)
+        row = self._rows.get(key)
+        self._rows = {k: cached for k, cached in self._rows.items() if k != key and cached is not row}
+        self._pending.pop(key, None)
+
+    def stage_update(self, client, table, column, value, data):
+        """
+        Record an update of the row where column == value, to be sent by flush().
+
+        Several updates of the same row in a request become one. The cached
+        row, if any, is patched now.
+
+        Returns:
+        --------
+        dict : The row as it will be once flushed (only the updated columns
+            and the key when the row was never loaded)
+        """
+        key = (table, column, value)
+        _client, pending = self._pending.get(key, (client, {}))
+        pending.update(data)
+        self._pending[key] = (client, pending)
+
+        row = self._rows.get(key)
+        if row is None:
+            return {column: value, **data}
+        row.update(data)
+        return row
+
+    def discard(self):
+        """Drop the staged updates without sending them."""
+        self._pending = {}
+
+    async def flush(self):
+        """
+        Send the staged updates, one request per updated row.
+
+        Every update is attempted even if an earlier one failed.
+
+        Raises:
+        -------
+        FlushError : If any of them could not be sent
+        """
+        cache = get_metadata_cache()
+        pending, self._pending = self._pending, {}
+        failed = []
+        for (table, column, value), (client, data) in pending.items():
+            try:
+                await client.table(table).update(data).eq(column, value).execute()
+                # Only once the write landed, or another request could cache the old row again
+                if cache is not None:
+                    cache.invalidate(table, column, value)
+            except Exception as e:
+                print(f"[WARNING] Could not flush the update of {table} {column}={value}: {e}")
+                failed.append(f"{table} {column}={value}: {e}")
+        if failed:
+            raise FlushError("Could not save " + "; ".join(failed))
+
+
+def current_unit_of_work():
+    """The unit of work of the running request, None outside of one or once it is closed."""
+    uow = _current.get()
+    if uow is None or uow.closed:
+        return None
+    return uow
+
+
+def count_round_trip():
+    # Also counts after close (e.g. a streamed response saving its turn)
+    uow = _current.get()
+    if uow is not None:
+        uow.round_trips += 1
+
+
+def db_debug_headers_enabled() -> bool:
+    return os.getenv("DB_DEBUG_HEADERS", "false").lower() == "true"
+
+
+@asynccontextmanager
+async def unit_of_work():
+    """
+    Open a unit of work for the enclosed code and flush it on the way out.
+
+    If the enclosed code raises, the staged updates are dropped instead.
+    Writes staged after the unit of work closed (e.g. by a streamed response
+    that outlives its request handler) are sent immediately.
+
+    Raises:
+    -------
+    FlushError : If a staged update could not be sent
+    """
+    uow = UnitOfWork()
+    token = _current.set(uow)
+    try:
+        try:
+            yield uow
+        except BaseException:
+            uow.discard()
+            raise
+        finally:
+            uow.closed = True
+        await uow.flush()
+    finally:
+        _current.reset(token)
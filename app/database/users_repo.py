@@ -11,7 +11,16 @@ if __name__ == "__main__":
 import uuid
 import datetime
 import time
-from app.database.base import BaseRepo
+import asyncio
+from app.database.base import BaseRepo, AsyncBaseRepo, first_row, MetadataCacheMixin
+
+
+def _cache_user(row):
+    # A new user is looked up by id and by email next (login, registration check)
+    if row:
+        MetadataCacheMixin._cache("user_table", "email", row.get("email"), row)
+        MetadataCacheMixin._cache("user_table", "user_id", row.get("user_id"), row)
+    return row
 
 
 class UsersRepository(BaseRepo):
@@ -22,7 +31,7 @@ class UsersRepository(BaseRepo):
         super().__init__() #getting supabase client from BaseRepo 
 
     def create_user(self, email, name):
-        """Create user with retry logic"""
+        """Create user with retry logic, returns the new user row"""
         user_data = {
             "user_id": str(uuid.uuid4()),           # str: "abc-123-def-456"
             "email": email,                          # str
@@ -34,7 +43,7 @@ class UsersRepository(BaseRepo):
         for attempt in range(max_retries):
             try:
                 response = self.client.table("user_table").insert(user_data).execute()
-                return response
+                return _cache_user(first_row(response))
             except Exception as e:
                 if attempt < max_retries - 1:
                     print(f"Retry {attempt + 1}/{max_retries} - Error creating user: {e}")
@@ -45,19 +54,30 @@ class UsersRepository(BaseRepo):
     def get_by_id(self, user_id):
         """Get user by user_id"""
         try:
+            cached = self._cached("user_table", "user_id", user_id)
+            if cached is not None:
+                return cached
             data_on_user = self.client.table("user_table").select("*").eq("user_id", user_id).execute()
-            return data_on_user.data[0] if data_on_user.data else None
+            if not data_on_user.data:
+                return None
+            return self._cache("user_table", "user_id", user_id, data_on_user.data[0])
         except Exception as e:
             print(f"Error getting user by ID: {e}")
             return None
 
     def get_by_email(self, email):
         """Get user by email with retry logic"""
+        cached = self._cached("user_table", "email", email)
+        if cached is not None:
+            return cached
+
         max_retries = 3
         for attempt in range(max_retries):
             try:
                 data_on_user = self.client.table("user_table").select("*").eq("email", email).execute()
-                return data_on_user.data[0] if data_on_user.data else None
+                if not data_on_user.data:
+                    return None
+                return self._cache("user_table", "email", email, data_on_user.data[0])
             except Exception as e:
                 if attempt < max_retries - 1:
                     print(f"Retry {attempt + 1}/{max_retries} - Error getting user by email: {e}")
@@ -69,9 +89,96 @@ class UsersRepository(BaseRepo):
     def get_by_name(self, name):
         """Get user by name"""
         try:
+            cached = self._cached("user_table", "name", name)
+            if cached is not None:
+                return cached
             data_on_user = self.client.table("user_table").select("*").eq("name", name).execute()
-            return data_on_user.data[0] if data_on_user.data else None
+            if not data_on_user.data:
+                return None
+            return self._cache("user_table", "name", name, data_on_user.data[0])
+        except Exception as e:
+            print(f"Error getting user by name: {e}")
+            return None
+
+
+class AsyncUsersRepository(AsyncBaseRepo):
+    """
+    Async variant of UsersRepository for use inside FastAPI handlers
+    """
+    async def create_user(self, email, name):
+        """Create user with retry logic, returns the new user row"""
+        user_data = {
+            "user_id": str(uuid.uuid4()),
+            "email": email,
+            "name": name,
+            "created_at": datetime.datetime.now().isoformat()
+        }
+
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                response = await self.client.table("user_table").insert(user_data).execute()
+                return self._remember("user_table", _cache_user(first_row(response)), "user_id", "email")
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    print(f"Retry {attempt + 1}/{max_retries} - Error creating user: {e}")
+                    await asyncio.sleep(1 * (attempt + 1))
+                else:
+                    raise Exception(f"Failed to create user after {max_retries} attempts: {e}")
+
+    async def get_by_id(self, user_id):
+        """Get user by user_id"""
+        try:
+            loaded = self._loaded("user_table", "user_id", user_id)
+            if loaded is not None:
+                return loaded
+            cached = self._cached("user_table", "user_id", user_id)
+            if cached is not None:
+                return self._remember("user_table", cached, "user_id", "email")
+            data_on_user = await self.client.table("user_table").select("*").eq("user_id", user_id).execute()
+            if not data_on_user.data:
+                return None
+            row = self._cache("user_table", "user_id", user_id, data_on_user.data[0])
+            return self._remember("user_table", row, "user_id", "email")
+        except Exception as e:
+            print(f"Error getting user by ID: {e}")
+            return None
+
+    async def get_by_email(self, email):
+        """Get user by email with retry logic"""
+        loaded = self._loaded("user_table", "email", email)
+        if loaded is not None:
+            return loaded
+        cached = self._cached("user_table", "email", email)
+        if cached is not None:
+            return self._remember("user_table", cached, "user_id", "email")
+
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                data_on_user = await self.client.table("user_table").select("*").eq("email", email).execute()
+                if not data_on_user.data:
+                    return None
+                row = self._cache("user_table", "email", email, data_on_user.data[0])
+                return self._remember("user_table", row, "user_id", "email")
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    print(f"Retry {attempt + 1}/{max_retries} - Error getting user by email: {e}")
+                    await asyncio.sleep(1 * (attempt + 1))
+                else:
+                    print(f"Error getting user by email after {max_retries} attempts: {e}")
+                    return None
+
+    async def get_by_name(self, name):
+        """Get user by name"""
+        try:
+            cached = self._cached("user_table", "name", name)
+            if cached is not None:
+                return cached
+            data_on_user = await self.client.table("user_table").select("*").eq("name", name).execute()
+            if not data_on_user.data:
+                return None
+            return self._cache("user_table", "name", name, data_on_user.data[0])
         except Exception as e:
             print(f"Error getting user by name: {e}")
             return None
-        
@@ -0,0 +1,198 @@
+"""
+App-scoped service providers for FastAPI's Depends.
+
+Clients, repositories and services are built once (at startup, or on first
+use when a credential is missing then) and shared by every request instead of
+being constructed per request.
+"""
+import os
+import asyncio
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from openai import AsyncOpenAI
+from langchain_openai import OpenAIEmbeddings
+
+from app.database.users_repo import AsyncUsersRepository
+from app.database.chats_repo import AsyncChatsRepo
+from app.database.messages_repo import AsyncMessagesRepo
+from app.database.books_repo import AsyncBooksRepository
+from app.services.embedding_cache import with_embedding_cache
+from app.services.pinecone_service import AsyncPineconeService, VectorStorePool
+from app.services.local_vectorstore import LocalVectorBackend, vector_backend
+from app.services.openai_service import AsyncOpenAIResponse
+from app.services.chat_service import AsyncChatService
+from app.services.book_processing_service import BookProcessingService
+
+load_dotenv()
+
+
+class ChatServiceFactory:
+    """Builds the per-request AsyncChatService from the shared services."""
+
+    def __init__(self, pinecone_service, chats_repo, messages_repo, openai_service):
+        self.pinecone_service = pinecone_service
+        self.chats_repo = chats_repo
+        self.messages_repo = messages_repo
+        self.openai_service = openai_service
+
+    async def create(self, user_id: str, question: str):
+        vectorstore = await self.pinecone_service.get_vectorstore(f"user_{user_id}")
+        return AsyncChatService(
+            user_id=user_id,
+            question=question,
+            vectorstore=vectorstore,
+            chats_repo=self.chats_repo,
+            messages_repo=self.messages_repo,
+            openai_service=self.openai_service
+        )
+
+
+class AppServices:
+    """
+    Holds the long-lived objects of the API process.
+
+    Every getter creates its object on first call and returns the same
+    instance afterwards. startup() warms them all so the first request does
+    not pay for it; shutdown() closes the clients and forgets everything so
+    a new event loop (e.g. a restarted TestClient) starts fresh.
+    """
+
+    def __init__(self):
+        self._instances = {}
+        self._locks = {}
+
+    async def _get(self, name, build):
+        if name not in self._instances:
+            # One lock per object, so concurrent first requests build it once
+            lock = self._locks.setdefault(name, asyncio.Lock())
+            async with lock:
+                if name not in self._instances:
+                    self._instances[name] = await build()
+        return self._instances[name]
+
+    def peek(self, name):
+        """The shared object called name if it was built already, without building it."""
+        return self._instances.get(name)
+
+    async def openai_client(self):
+        async def build():
+            return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return await self._get("openai_client", build)
+
+    async def embeddings(self):
+        async def build():
+            return with_embedding_cache(OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY")))
+        return await self._get("embeddings", build)
+
+    async def vectorstore_pool(self):
+        async def build():
+            if vector_backend() == "local":
+                pool = LocalVectorBackend(await self.embeddings())
+            else:
+                pool = VectorStorePool(await self.embeddings())
+            # Resolving the index host is a network call, done once
+            await pool.connect()
+            return pool
+        return await self._get("vectorstore_pool", build)
+
+    async def repository(self, repo_class):
+        return await self._get(repo_class.__name__, repo_class.create)
+
+    async def pinecone_service(self):
+        async def build():
+            return AsyncPineconeService(
+                books_repo=await self.repository(AsyncBooksRepository),
+                embeddings=await self.embeddings(),
+                pool=await self.vectorstore_pool()
+            )
+        return await self._get("pinecone_service", build)
+
+    async def openai_service(self):
+        async def build():
+            return AsyncOpenAIResponse(
+                chats_repo=await self.repository(AsyncChatsRepo),
+                client=await self.openai_client()
+            )
+        return await self._get("openai_service", build)
+
+    async def chat_services(self):
+        async def build():
+            return ChatServiceFactory(
+                pinecone_service=await self.pinecone_service(),
+                chats_repo=await self.repository(AsyncChatsRepo),
+                messages_repo=await self.repository(AsyncMessagesRepo),
+                openai_service=await self.openai_service()
+            )
+        return await self._get("chat_services", build)
+
+    async def book_service(self):
+        async def build():
+            return BookProcessingService(
+                books_repo=await self.repository(AsyncBooksRepository),
+                pinecone_service=await self.pinecone_service()
+            )
+        return await self._get("book_service", build)
+
+    async def startup(self):
+        """Create every shared object now, reporting (not raising) what cannot be built yet."""
+        for name, getter in (
+            ("users repository", lambda: self.repository(AsyncUsersRepository)),
+            ("messages repository", lambda: self.repository(AsyncMessagesRepo)),
+            ("chat services", self.chat_services),
+            ("book service", self.book_service)
+        ):
+            try:
+                await getter()
+            except Exception as e:
+                print(f"[WARNING] Could not initialize {name} at startup, will retry on first use: {e}")
+
+    async def shutdown(self):
+        client = self._instances.get("openai_client")
+        if client is not None:
+            await client.close()
+        pool = self._instances.get("vectorstore_pool")
+        if pool is not None:
+            await pool.close()
+        self._instances.clear()
+        self._locks.clear()
+
+
+app_services = AppServices()
+
+
+# ==================== PROVIDERS ====================
+
+async def _provide(getter, *args):
+    # A missing credential or unreachable backend becomes a 503 for this request
+    try:
+        return await getter(*args)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
+
+
+async def get_users_repo() -> AsyncUsersRepository:
+    return await _provide(app_services.repository, AsyncUsersRepository)
+
+
+async def get_chats_repo() -> AsyncChatsRepo:
+    return await _provide(app_services.repository, AsyncChatsRepo)
+
+
+async def get_messages_repo() -> AsyncMessagesRepo:
+    return await _provide(app_services.repository, AsyncMessagesRepo)
+
+
+async def get_books_repo() -> AsyncBooksRepository:
+    return await _provide(app_services.repository, AsyncBooksRepository)
+
+
+async def get_pinecone_service() -> AsyncPineconeService:
+    return await _provide(app_services.pinecone_service)
+
+
+async def get_chat_services() -> ChatServiceFactory:
+    return await _provide(app_services.chat_services)
+
+
+async def get_book_service() -> BookProcessingService:
+    return await _provide(app_services.book_service)
@@ -66,18 +66,27 @@ class MessageResponse(BaseModel):
     created_at: str
 
 
+class MessagePageResponse(BaseModel):
+    """Response model for one page of a chat's messages"""
+    messages: List[MessageResponse]
+    next_cursor: Optional[str] = None  # Continues in the same order, None on the last page
+    has_more: bool = False
+
+
 # ==================== CHAT SCHEMAS ====================
 
 class NewChatRequest(BaseModel):
     """Request model for creating a new chat"""
     user_id: str
     question: str = Field(..., min_length=1, max_length=5000)
+    book_id: Optional[str] = Field(None, description="Only search this book's chunks")
 
 
 class ContinueChatRequest(BaseModel):
     """Request model for continuing an existing chat"""
     chat_id: str
     question: str = Field(..., min_length=1, max_length=5000)
+    book_id: Optional[str] = Field(None, description="Only search this book's chunks")
 
 
 class ChatResponse(BaseModel):
@@ -91,13 +100,15 @@ class ChatResponse(BaseModel):
 
 
 class ChatDetailResponse(BaseModel):
-    """Response model for detailed chat with messages"""
+    """Response model for detailed chat with a page of its messages"""
     chat_id: str
     user_id: str
     title: str
     created_at: str
     updated_at: str
     messages: List[MessageResponse]
+    next_cursor: Optional[str] = None  # Cursor for the next page of messages
+    has_more: bool = False
 
 
 class ChatListResponse(BaseModel):
@@ -106,6 +117,23 @@ class ChatListResponse(BaseModel):
     total: int
 
 
+class ChatSummaryResponse(BaseModel):
+    """Response model for a chat in a listing, without its messages"""
+    chat_id: str
+    user_id: str
+    title: str
+    created_at: str
+    updated_at: str
+    message_count: Optional[int] = None  # Only when include_message_count is set
+
+
+class ChatPageResponse(BaseModel):
+    """Response model for one page of a user's chats"""
+    chats: List[ChatSummaryResponse]
+    next_cursor: Optional[str] = None  # Pass as cursor for the next page, None on the last one
+    has_more: bool = False
+
+
 class ChatMessageResponse(BaseModel):
     """Response model for a chat interaction (question + answer)"""
     chat_id: Optional[str] = None
@@ -137,6 +165,49 @@ class VectorProcessResponse(BaseModel):
     message: str
     namespace: Optional[str] = None
     chunks_count: Optional[int] = None
+    stats: Optional[Dict] = None  # Ingestion throughput (chunks/s, tokens/s, ...)
+
+
+# ==================== JOB SCHEMAS ====================
+
+class JobStageResponse(BaseModel):
+    """Progress of one stage of a background job"""
+    name: str
+    status: Literal["pending", "running", "completed", "failed"]
+    progress: float = 0.0
+    detail: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    """Status of a background job"""
+    job_id: str
+    kind: str
+    status: Literal["queued", "running", "completed", "failed"]
+    stages: List[JobStageResponse]
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+
+class JobAcceptedResponse(BaseModel):
+    """Response for requests that queue a background job"""
+    success: bool
+    message: str
+    job_id: str
+    status_url: str
+
+
+# ==================== ADMIN SCHEMAS ====================
+
+class CacheStatsResponse(BaseModel):
+    """Hit rates and sizes of the server's caches"""
+    query_cache: Dict
+    answer_cache: Dict
+    embedding_cache: Optional[Dict] = None  # None when the embedding cache is disabled
+    vectorstore_pool: Optional[Dict] = None  # None until Pinecone is first used
+    keyword_index: Optional[Dict] = None
+    metadata_cache: Optional[Dict] = None  # None when the metadata cache is disabled
 
 
 # ==================== UPLOAD SCHEMAS ====================
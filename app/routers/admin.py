@@ -0,0 +1,95 @@
+from fastapi import APIRouter, HTTPException
+
+from app.models.schemas import CacheStatsResponse, SuccessResponse
+from app.services.query_cache import query_cache
+from app.services.answer_cache import answer_cache
+from app.services.embedding_cache import get_embedding_cache
+from app.services.hybrid_search import keyword_indexes
+from app.database.metadata_cache import get_metadata_cache
+from app.dependencies import app_services
+
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"]
+)
+
+
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+async def get_cache_stats():
+    """
+    Get hit rates and sizes of the retrieval query cache, the semantic
+    answer cache, the embedding cache, the vectorstore pool, the loaded
+    keyword indexes and the user/book metadata cache.
+
+    Returns:
+        CacheStatsResponse with the stats of each cache
+
+    Raises:
+        HTTPException: If reading the stats fails
+    """
+    try:
+        embedding_cache = get_embedding_cache()
+        metadata_cache = get_metadata_cache()
+        pool = app_services.peek("vectorstore_pool")
+        return CacheStatsResponse(
+            query_cache=query_cache.stats(),
+            answer_cache=answer_cache.stats(),
+            embedding_cache=embedding_cache.stats() if embedding_cache is not None else None,
+            vectorstore_pool=pool.stats() if pool is not None else None,
+            keyword_index=keyword_indexes.stats(),
+            metadata_cache=metadata_cache.stats() if metadata_cache is not None else None
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving cache stats: {str(e)}"
+        )
+
+
+@router.delete("/cache/query", response_model=SuccessResponse)
+async def clear_query_cache():
+    """
+    Drop every cached retrieval result.
+
+    Returns:
+        SuccessResponse confirming the cache was cleared
+    """
+    query_cache.clear()
+    return SuccessResponse(
+        success=True,
+        message="Query cache cleared"
+    )
+
+
+@router.delete("/cache/answers", response_model=SuccessResponse)
+async def clear_answer_cache():
+    """
+    Drop every cached first-turn answer.
+
+    Returns:
+        SuccessResponse confirming the cache was cleared
+    """
+    answer_cache.clear()
+    return SuccessResponse(
+        success=True,
+        message="Answer cache cleared"
+    )
+
+
+@router.delete("/cache/metadata", response_model=SuccessResponse)
+async def clear_metadata_cache():
+    """
+    Drop every cached user and book row.
+
+    Returns:
+        SuccessResponse confirming the cache was cleared
+    """
+    metadata_cache = get_metadata_cache()
+    if metadata_cache is not None:
+        metadata_cache.clear()
+    return SuccessResponse(
+        success=True,
+        message="Metadata cache cleared"
+    )
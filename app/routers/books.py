@@ -2,7 +2,6 @@ from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from fastapi.responses import JSONResponse
 from typing import Optional
 import os
-import tempfile
 
 from app.models.schemas import (
     BookUploadRequest,
@@ -11,13 +10,15 @@ from app.models.schemas import (
     BookListResponse,
     FileUploadResponse,
     VectorProcessResponse,
-    SuccessResponse,
-    ErrorResponse
+    ErrorResponse,
+    JobAcceptedResponse,
+    JobResponse
 )
-from app.services.book_processing_service import BookProcessingService
-from app.services.pinecone_service import PineconeService
-from app.services.ragappfunction import read_doc, chunks
-from app.database.books_repo import BooksRepository
+from app.services.book_processing_service import BookProcessingService, INGESTION_STAGES, DELETION_STAGES
+from app.services.job_service import job_manager
+from app.services.pinecone_service import AsyncPineconeService
+from app.database.books_repo import AsyncBooksRepository
+from app.dependencies import get_books_repo, get_book_service, get_pinecone_service
 
 
 router = APIRouter(
@@ -31,14 +32,15 @@ async def upload_book(
     file: UploadFile = File(..., description="PDF file to upload"),
     user_id: str = Form(..., description="User ID"),
     book_title: str = Form(..., min_length=1, max_length=200, description="Book title"),
-    author: Optional[str] = Form(None, max_length=100, description="Author name (optional)")
+    author: Optional[str] = Form(None, max_length=100, description="Author name (optional)"),
+    book_service: BookProcessingService = Depends(get_book_service)
 ):
     """
     Upload a PDF book and create a database record.
 
     This endpoint handles:
     1. Validating the uploaded file is a PDF
-    2. Saving the file temporarily
+    2. Keeping the file in memory (no temp files)
     3. Uploading to Supabase Storage
     4. Creating a book record in the database
 
@@ -71,9 +73,6 @@ async def upload_book(
                 detail="Uploaded file is empty"
             )
 
-        # Initialize book service
-        book_service = BookProcessingService()
-
         # Upload PDF and create book record
         book_record = await book_service.upload_pdf(
             file_content=file_content,
@@ -100,24 +99,26 @@ async def upload_book(
         )
 
 
-@router.post("/upload-and-process", response_model=VectorProcessResponse)
+@router.post("/upload-and-process", response_model=JobAcceptedResponse, status_code=202)
 async def upload_and_process_book(
     file: UploadFile = File(..., description="PDF file to upload"),
     user_id: str = Form(..., description="User ID"),
     book_title: str = Form(..., min_length=1, max_length=200, description="Book title"),
     author: Optional[str] = Form(None, max_length=100, description="Author name (optional)"),
     chunk_size: int = Form(400, ge=100, le=2000, description="Size of text chunks"),
-    chunk_overlap: int = Form(50, ge=0, le=500, description="Overlap between chunks")
+    chunk_overlap: int = Form(50, ge=0, le=500, description="Overlap between chunks"),
+    book_service: BookProcessingService = Depends(get_book_service)
 ):
     """
-    Upload a PDF book and process it into vector embeddings in one operation.
+    Upload a PDF book and process it into vector embeddings in the background.
 
-    This is a comprehensive endpoint that:
+    The request only validates and reads the file, then queues a job that:
     1. Uploads the PDF to storage and creates a database record
-    2. Processes the PDF into text chunks
-    3. Uploads vectors to Pinecone
+    2. Parses the PDF pages
+    3. Processes the pages into text chunks
+    4. Embeds and uploads the vectors to Pinecone
 
-    This mirrors the upload_book function from the CLI application.
+    Poll GET /api/books/jobs/{job_id} for per-stage progress and the result.
 
     Args:
         file: PDF file (multipart/form-data)
@@ -128,15 +129,13 @@ async def upload_and_process_book(
         chunk_overlap: Overlap between chunks (default: 50)
 
     Returns:
-        VectorProcessResponse with processing details
+        JobAcceptedResponse with the job id
 
     Raises:
-        HTTPException: If any step fails
+        HTTPException: If the file is not a valid upload
     """
-    temp_file_path = None
-
     try:
-        # Step 1: Validate file is a PDF
+        # Validate file is a PDF
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(
                 status_code=400,
@@ -152,74 +151,79 @@ async def upload_and_process_book(
                 detail="Uploaded file is empty"
             )
 
-        # Step 2: Upload to storage and create book record
-        book_service = BookProcessingService()
-
-        book_record = await book_service.upload_pdf(
-            file_content=file_content,
-            filename=file.filename,
-            user_id=user_id,
-            book_title=book_title,
-            author=author
+        filename = file.filename
+
+        job = job_manager.submit(
+            kind="book_ingestion",
+            stages=INGESTION_STAGES,
+            run=lambda job: book_service.ingest_upload(
+                job,
+                file_content=file_content,
+                filename=filename,
+                user_id=user_id,
+                book_title=book_title,
+                author=author,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap
+            )
         )
 
-        # Step 3: Save file temporarily for processing
-        # Create a temporary file with .pdf extension
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(file_content)
-            temp_file_path = tmp_file.name
-
-        # Step 4: Process PDF into chunks
-        docs = read_doc(temp_file_path)
-        chunked_docs = chunks(docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-
-        # Step 5: Upload to Pinecone
-        pinecone_service = PineconeService()
-        namespace = f"user_{user_id}"
-
-        # Get vectorstore and add documents
-        vector_store = pinecone_service.get_vectorstore(namespace=namespace)
-        vector_store.add_documents(chunked_docs)
-
-        # Clean up temp file
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-
-        return VectorProcessResponse(
+        return JobAcceptedResponse(
             success=True,
-            message=f"Book uploaded and processed successfully. {len(chunked_docs)} chunks created.",
-            namespace=namespace,
-            chunks_count=len(chunked_docs)
+            message="Book queued for processing",
+            job_id=job.job_id,
+            status_url=f"/api/books/jobs/{job.job_id}"
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        # Clean up temp file on error
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-            except:
-                pass
-
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing book: {str(e)}"
+            detail=f"Error queuing book: {str(e)}"
         )
 
 
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job_status(job_id: str):
+    """
+    Get the status of a background book job.
+
+    Args:
+        job_id: ID returned when the job was queued
+
+    Returns:
+        JobResponse with overall status, per-stage progress and the result once done
+
+    Raises:
+        HTTPException: If no job with this id is known
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job with ID '{job_id}' not found"
+        )
+
+    return JobResponse(**job.to_dict())
+
+
 @router.post("/process/{book_title}", response_model=VectorProcessResponse)
 async def process_existing_book(
     book_title: str,
     chunk_size: int = 400,
-    chunk_overlap: int = 50
+    chunk_overlap: int = 50,
+    books_repo: AsyncBooksRepository = Depends(get_books_repo),
+    pinecone_service: AsyncPineconeService = Depends(get_pinecone_service)
 ):
     """
     Process an already uploaded book into vector embeddings.
 
     Use this endpoint when you've previously uploaded a book but want to
     re-process it with different chunking parameters or if processing
-    was interrupted.
+    was interrupted. Only chunks that are not indexed yet are embedded and
+    chunks that no longer exist are deleted, so re-processing with the same
+    parameters changes nothing.
 
     Args:
         book_title: Title of the book to process
@@ -233,11 +237,8 @@ async def process_existing_book(
         HTTPException: If book not found or processing fails
     """
     try:
-        pinecone_service = PineconeService()
-
         # Get book record to validate it exists
-        books_repo = BooksRepository()
-        book_record = books_repo.get_book_by_id(book_title=book_title)
+        book_record = await books_repo.get_book_by_id(book_title=book_title)
 
         if not book_record:
             raise HTTPException(
@@ -245,22 +246,20 @@ async def process_existing_book(
                 detail=f"Book with title '{book_title}' not found"
             )
 
-        # Get docs from storage
-        docs = pinecone_service.upload_vectors(book_title)
-
-        # Chunk the documents
-        chunked_docs = pinecone_service.chunk_doc(docs, chunk_size, chunk_overlap)
+        # Stream the book's chunks from storage, parsed and chunked as they are ingested
+        documents = await pinecone_service.stream_book(book_record, chunk_size, chunk_overlap)
 
-        # Get namespace and upload to Pinecone
+        # Get namespace and upload only the new chunks to Pinecone
         namespace = book_record['pinecone_namespace']
-        vector_store = pinecone_service.get_vectorstore(namespace=namespace)
-        vector_store.add_documents(chunked_docs)
+        stats = await pinecone_service.reindex_book(namespace, book_record['book_id'], documents)
 
         return VectorProcessResponse(
             success=True,
-            message=f"Book processed successfully. {len(chunked_docs)} chunks created.",
+            message=(f"Book processed successfully. {stats['total_chunks']} chunks: {stats['chunks']} new, "
+                     f"{stats['unchanged']} unchanged, {stats['deleted']} removed."),
             namespace=namespace,
-            chunks_count=len(chunked_docs)
+            chunks_count=stats["total_chunks"],
+            stats=stats
         )
 
     except HTTPException:
@@ -273,7 +272,10 @@ async def process_existing_book(
 
 
 @router.get("/user/{user_id}", response_model=BookListResponse)
-async def get_user_books(user_id: str):
+async def get_user_books(
+    user_id: str,
+    books_repo: AsyncBooksRepository = Depends(get_books_repo)
+):
     """
     Get all books for a specific user.
 
@@ -287,8 +289,7 @@ async def get_user_books(user_id: str):
         HTTPException: If retrieval fails
     """
     try:
-        books_repo = BooksRepository()
-        books = books_repo.get_all_books(user_id=user_id)
+        books = await books_repo.get_all_books(user_id=user_id)
 
         if not books:
             books = []
@@ -306,7 +307,10 @@ async def get_user_books(user_id: str):
 
 
 @router.get("/{book_title}", response_model=BookResponse)
-async def get_book_by_title(book_title: str):
+async def get_book_by_title(
+    book_title: str,
+    books_repo: AsyncBooksRepository = Depends(get_books_repo)
+):
     """
     Get book details by title.
 
@@ -320,8 +324,7 @@ async def get_book_by_title(book_title: str):
         HTTPException: If book not found
     """
     try:
-        books_repo = BooksRepository()
-        book = books_repo.get_book_by_id(book_title=book_title)
+        book = await books_repo.get_book_by_id(book_title=book_title)
 
         if not book:
             raise HTTPException(
@@ -340,42 +343,51 @@ async def get_book_by_title(book_title: str):
         )
 
 
-@router.delete("/{book_title}", response_model=SuccessResponse)
-async def delete_book(book_title: str):
+@router.delete("/{book_title}", response_model=JobAcceptedResponse, status_code=202)
+async def delete_book(
+    book_title: str,
+    books_repo: AsyncBooksRepository = Depends(get_books_repo),
+    book_service: BookProcessingService = Depends(get_book_service)
+):
     """
-    Delete a book and its associated data.
+    Delete a book with its vectors and stored file, in the background.
+
+    The request only looks the book up, then queues a job that:
+    1. Deletes the book's vectors from its namespace in batches
+    2. Removes the PDF from storage
+    3. Deletes the book record
 
-    Note: This currently only deletes the database record.
-    TODO: Add cleanup of storage files and Pinecone vectors
+    Poll GET /api/books/jobs/{job_id} for per-stage progress and the result.
 
     Args:
         book_title: Title of the book to delete
 
     Returns:
-        SuccessResponse confirming deletion
+        JobAcceptedResponse with the job id
 
     Raises:
-        HTTPException: If book not found or deletion fails
+        HTTPException: If book not found or the job cannot be queued
     """
     try:
-        books_repo = BooksRepository()
-
         # Check if book exists
-        book = books_repo.get_book_by_id(book_title=book_title)
+        book = await books_repo.get_book_by_id(book_title=book_title)
         if not book:
             raise HTTPException(
                 status_code=404,
                 detail=f"Book with title '{book_title}' not found"
             )
 
-        # Delete book record
-        # TODO: Add storage and Pinecone cleanup
-        result = books_repo.delete_book(book_title=book_title)
+        job = job_manager.submit(
+            kind="book_deletion",
+            stages=DELETION_STAGES,
+            run=lambda job: book_service.delete_book(job, book)
+        )
 
-        return SuccessResponse(
+        return JobAcceptedResponse(
             success=True,
-            message=f"Book '{book_title}' deleted successfully",
-            data={"book_title": book_title}
+            message=f"Book '{book_title}' queued for deletion",
+            job_id=job.job_id,
+            status_url=f"/api/books/jobs/{job.job_id}"
         )
 
     except HTTPException:
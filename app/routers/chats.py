@@ -1,20 +1,23 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from typing import Optional, List
+from fastapi import APIRouter, HTTPException, Header, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional, List, Literal
+import json
+import asyncio
 
 from app.models.schemas import (
     NewChatRequest,
     ContinueChatRequest,
-    ChatResponse,
     ChatDetailResponse,
-    ChatListResponse,
+    ChatSummaryResponse,
+    ChatPageResponse,
     ChatMessageResponse,
     MessageResponse,
     SuccessResponse
 )
-from app.services.chat_service import ChatService
-from app.database.chats_repo import chatsRepo
-from app.database.messages_repo import MessagesRepo
+from app.database.chats_repo import AsyncChatsRepo, CHAT_LIST_COLUMNS
+from app.database.messages_repo import AsyncMessagesRepo
+from app.database.books_repo import AsyncBooksRepository
+from app.dependencies import ChatServiceFactory, get_chat_services, get_chats_repo, get_messages_repo, get_books_repo
 
 
 router = APIRouter(
@@ -23,19 +26,66 @@ router = APIRouter(
 )
 
 
+async def _sse(events):
+    """
+    Format chat service events as server-sent events.
+
+    Every event is sent as `event: <name>` plus a JSON `data:` line. Errors
+    raised mid-stream become an `error` event since the status is already sent.
+    """
+    try:
+        async for event in events:
+            name = event.pop("event")
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+
+def _use_cache(bypass_header):
+    # "X-Bypass-Cache: true" skips the semantic answer cache for this request
+    return (bypass_header or "").strip().lower() not in ("1", "true", "yes")
+
+
+async def _check_book_scope(books_repo, book_id, user_id):
+    """Reject a book scope that is not one of the user's books."""
+    if not book_id:
+        return
+    book = await books_repo.get_book_by_id(book_id=book_id)
+    if not book or book.get('user_id') != user_id:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Book with ID '{book_id}' not found for this user"
+        )
+
+
+def _sse_response(events):
+    return StreamingResponse(
+        _sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/new", response_model=ChatMessageResponse, status_code=201)
-async def create_new_chat(request: NewChatRequest):
+async def create_new_chat(
+    request: NewChatRequest,
+    x_bypass_cache: Optional[str] = Header(None, description="Set to true to skip the semantic answer cache"),
+    books_repo: AsyncBooksRepository = Depends(get_books_repo),
+    chat_services: ChatServiceFactory = Depends(get_chat_services)
+):
     """
     Create a new chat session and get the first response.
 
     This endpoint:
     1. Creates a new chat session for the user
     2. Processes the user's first question
-    3. Uses RAG (Retrieval Augmented Generation) to search user's uploaded books
+    3. Uses RAG (Retrieval Augmented Generation) to search user's uploaded books,
+       or only the book given as book_id
     4. Returns the AI-generated response
 
     Args:
-        request: NewChatRequest with user_id and question
+        request: NewChatRequest with user_id, question and optional book_id
+        x_bypass_cache: X-Bypass-Cache header, "true" always generates a fresh answer
 
     Returns:
         ChatMessageResponse with chat_id, question, and AI answer
@@ -44,17 +94,20 @@ async def create_new_chat(request: NewChatRequest):
         HTTPException: If chat creation or processing fails
     """
     try:
+        await _check_book_scope(books_repo, request.book_id, request.user_id)
+
         # Initialize ChatService
-        chat_service = ChatService(
+        chat_service = await chat_services.create(
             user_id=request.user_id,
-            question=request.question,
-            retrieve_history=False
+            question=request.question
         )
 
         # Create new chat
-        result = chat_service.new_chat(
+        result = await chat_service.new_chat(
             question=request.question,
-            vectorstore=chat_service.vectorstore
+            vectorstore=chat_service.vectorstore,
+            use_cache=_use_cache(x_bypass_cache),
+            book_id=request.book_id
         )
 
         if not result or result == "end":
@@ -63,29 +116,13 @@ async def create_new_chat(request: NewChatRequest):
                 detail="Failed to create chat or generate response"
             )
 
-        # Get the chat_id that was just created
-        chats_repo_instance = chatsRepo()
-        all_chats = chats_repo_instance.get_all_chats(user_id=request.user_id)
-
-        if all_chats and len(all_chats) > 0:
-            # Sort by created_at and get the most recent
-            sorted_chats = sorted(all_chats, key=lambda x: x.get('created_at', ''), reverse=True)
-            chat_id = sorted_chats[0].get('chat_id')
-
-            return ChatMessageResponse(
-                chat_id=chat_id,
-                question=request.question,
-                answer=result,
-                continue_status="c"
-            )
-        else:
-            # Fallback if we can't get the chat_id
-            return ChatMessageResponse(
-                chat_id=None,
-                question=request.question,
-                answer=result,
-                continue_status="c"
-            )
+        # new_chat keeps the chat_id of the row it inserted
+        return ChatMessageResponse(
+            chat_id=chat_service.chat_id,
+            question=request.question,
+            answer=result,
+            continue_status="c"
+        )
 
     except HTTPException:
         raise
@@ -97,18 +134,23 @@ async def create_new_chat(request: NewChatRequest):
 
 
 @router.post("/continue", response_model=ChatMessageResponse)
-async def continue_existing_chat(request: ContinueChatRequest):
+async def continue_existing_chat(
+    request: ContinueChatRequest,
+    chats_repo: AsyncChatsRepo = Depends(get_chats_repo),
+    books_repo: AsyncBooksRepository = Depends(get_books_repo),
+    chat_services: ChatServiceFactory = Depends(get_chat_services)
+):
     """
     Continue an existing chat conversation.
 
     This endpoint:
     1. Retrieves the chat history
     2. Processes the new question with context from previous messages
-    3. Uses RAG to search user's books for relevant information
+    3. Uses RAG to search user's books (or only book_id) for relevant information
     4. Returns the AI-generated response
 
     Args:
-        request: ContinueChatRequest with chat_id and question
+        request: ContinueChatRequest with chat_id, question and optional book_id
 
     Returns:
         ChatMessageResponse with chat_id, question, and AI answer
@@ -118,8 +160,7 @@ async def continue_existing_chat(request: ContinueChatRequest):
     """
     try:
         # Verify chat exists
-        chats_repo_instance = chatsRepo()
-        chat_data = chats_repo_instance.get_chat_by_id(chat_id=request.chat_id)
+        chat_data = await chats_repo.get_chat_by_id(chat_id=request.chat_id)
 
         if not chat_data:
             raise HTTPException(
@@ -129,18 +170,19 @@ async def continue_existing_chat(request: ContinueChatRequest):
 
         # Get user_id from chat
         user_id = chat_data.get('user_id')
+        await _check_book_scope(books_repo, request.book_id, user_id)
 
         # Initialize ChatService
-        chat_service = ChatService(
+        chat_service = await chat_services.create(
             user_id=user_id,
-            question=request.question,
-            retrieve_history=True
+            question=request.question
         )
 
         # Continue existing chat
-        result = chat_service.continuing_chat(
+        result = await chat_service.continuing_chat(
             chat_id=request.chat_id,
-            question=request.question
+            question=request.question,
+            book_id=request.book_id
         )
 
         if not result or result == "end":
@@ -165,74 +207,209 @@ async def continue_existing_chat(request: ContinueChatRequest):
         )
 
 
-@router.get("/user/{user_id}", response_model=ChatListResponse)
-async def get_user_chats(user_id: str):
+@router.post("/new/stream")
+async def stream_new_chat(
+    request: NewChatRequest,
+    x_bypass_cache: Optional[str] = Header(None, description="Set to true to skip the semantic answer cache"),
+    books_repo: AsyncBooksRepository = Depends(get_books_repo),
+    chat_services: ChatServiceFactory = Depends(get_chat_services)
+):
     """
-    Get all chats for a specific user.
+    Create a new chat session and stream the first answer as server-sent events.
 
-    Returns a list of all chat sessions created by the user,
-    sorted by creation date (most recent first).
+    Events:
+        token: {"content": "..."} for every generated token
+        done: {"chat_id": "...", "answer": "..."} once the turn is saved
+        error: {"detail": "..."} if generation or saving fails
 
     Args:
-        user_id: ID of the user
+        request: NewChatRequest with user_id, question and optional book_id
+        x_bypass_cache: X-Bypass-Cache header, "true" always generates a fresh answer
 
     Returns:
-        ChatListResponse with list of chats and total count
+        text/event-stream response
 
     Raises:
-        HTTPException: If retrieval fails
+        HTTPException: If book_id is not one of the user's books
     """
     try:
-        chats_repo_instance = chatsRepo()
-        chats = chats_repo_instance.get_all_chats(user_id=user_id)
-
-        if not chats:
-            chats = []
-
-        # Convert to response format
-        chat_responses = []
-        for chat in chats:
-            chat_responses.append(ChatResponse(
-                chat_id=chat.get('chat_id'),
-                user_id=chat.get('user_id'),
-                title=chat.get('chat_title', 'Untitled Chat'),
-                created_at=chat.get('created_at'),
-                updated_at=chat.get('updated_at', chat.get('created_at')),
-                messages=chat.get('messages', {})
-            ))
-
-        return ChatListResponse(
-            chats=chat_responses,
-            total=len(chat_responses)
+        await _check_book_scope(books_repo, request.book_id, request.user_id)
+        chat_service = await chat_services.create(
+            user_id=request.user_id,
+            question=request.question
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error creating new chat: {str(e)}"
         )
 
+    return _sse_response(chat_service.stream_new_chat(
+        question=request.question,
+        vectorstore=chat_service.vectorstore,
+        use_cache=_use_cache(x_bypass_cache),
+        book_id=request.book_id
+    ))
+
+
+@router.post("/continue/stream")
+async def stream_continue_chat(
+    request: ContinueChatRequest,
+    chats_repo: AsyncChatsRepo = Depends(get_chats_repo),
+    books_repo: AsyncBooksRepository = Depends(get_books_repo),
+    chat_services: ChatServiceFactory = Depends(get_chat_services)
+):
+    """
+    Continue an existing chat and stream the answer as server-sent events.
+
+    Emits the same events as /new/stream.
+
+    Args:
+        request: ContinueChatRequest with chat_id, question and optional book_id
+
+    Returns:
+        text/event-stream response
+
+    Raises:
+        HTTPException: If chat or book not found
+    """
+    try:
+        chat_data = await chats_repo.get_chat_by_id(chat_id=request.chat_id)
+
+        if not chat_data:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Chat with ID '{request.chat_id}' not found"
+            )
+
+        await _check_book_scope(books_repo, request.book_id, chat_data.get('user_id'))
+
+        chat_service = await chat_services.create(
+            user_id=chat_data.get('user_id'),
+            question=request.question
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error retrieving chats: {str(e)}"
+            detail=f"Error continuing chat: {str(e)}"
+        )
+
+    return _sse_response(chat_service.stream_continuing_chat(
+        chat_id=request.chat_id,
+        question=request.question,
+        chat_data=chat_data,
+        book_id=request.book_id
+    ))
+
+
+@router.get("/user/{user_id}", response_model=ChatPageResponse)
+async def get_user_chats(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100, description="Chats per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    include_message_count: bool = Query(False, description="Add each chat's message_count"),
+    chats_repo: AsyncChatsRepo = Depends(get_chats_repo)
+):
+    """
+    Get one page of a user's chats.
+
+    Chats are sorted by last update (most recent first) and listed without
+    their messages, so a page costs the same for a user with thousands of
+    chats. Follow next_cursor until it is null to walk all of them.
+
+    Args:
+        user_id: ID of the user
+        limit: Chats per page (1-100)
+        cursor: next_cursor of the previous page, omitted for the first page
+        include_message_count: Also count each chat's messages
+
+    Returns:
+        ChatPageResponse with the page of chats and the next cursor
+
+    Raises:
+        HTTPException: If the cursor is invalid or retrieval fails
+    """
+    try:
+        page = await chats_repo.list_chats(
+            user_id=user_id,
+            limit=limit,
+            cursor=cursor,
+            with_message_count=include_message_count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if page is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Error retrieving chats"
         )
 
+    chat_responses = [
+        ChatSummaryResponse(
+            chat_id=chat.get('chat_id'),
+            user_id=chat.get('user_id'),
+            title=chat.get('chat_title') or 'Untitled Chat',
+            created_at=chat.get('created_at'),
+            updated_at=chat.get('updated_at') or chat.get('created_at'),
+            message_count=chat.get('message_count')
+        )
+        for chat in page["chats"]
+    ]
+
+    return ChatPageResponse(
+        chats=chat_responses,
+        next_cursor=page["next_cursor"],
+        has_more=page["next_cursor"] is not None
+    )
+
 
 @router.get("/{chat_id}", response_model=ChatDetailResponse)
-async def get_chat_by_id(chat_id: str):
+async def get_chat_by_id(
+    chat_id: str,
+    limit: int = Query(50, ge=1, le=200, description="Messages per page"),
+    before: Optional[str] = Query(None, description="Only messages older than this cursor"),
+    after: Optional[str] = Query(None, description="Only messages newer than this cursor"),
+    order: Literal["asc", "desc"] = Query("asc", description="asc: oldest first, desc: newest first"),
+    chats_repo: AsyncChatsRepo = Depends(get_chats_repo),
+    messages_repo: AsyncMessagesRepo = Depends(get_messages_repo)
+):
     """
-    Get detailed chat information including all messages.
+    Get a chat's details and one page of its messages.
 
-    Retrieves a specific chat with its full message history,
-    sorted chronologically.
+    The chat row is read without its messages JSON and the messages are
+    paged by the database, see GET /api/messages/chat/{chat_id} for the
+    paging parameters.
 
     Args:
         chat_id: ID of the chat
+        limit: Messages per page (1-200)
+        before: Cursor, only return older messages
+        after: Cursor, only return newer messages
+        order: "asc" (oldest first) or "desc" (newest first)
 
     Returns:
-        ChatDetailResponse with chat details and messages
+        ChatDetailResponse with chat details, messages and the next cursor
 
     Raises:
-        HTTPException: If chat not found
+        HTTPException: If chat not found or a cursor is invalid
     """
     try:
-        chats_repo_instance = chatsRepo()
-        chat_data = chats_repo_instance.get_chat_by_id(chat_id=chat_id)
+        chat_data, page = await asyncio.gather(
+            chats_repo.get_chat_by_id(chat_id=chat_id, columns=CHAT_LIST_COLUMNS),
+            messages_repo.get_messages_page(
+                chat_id=chat_id,
+                limit=limit,
+                before=before,
+                after=after,
+                newest_first=order == "desc"
+            )
+        )
 
         if not chat_data:
             raise HTTPException(
@@ -240,35 +417,35 @@ async def get_chat_by_id(chat_id: str):
                 detail=f"Chat with ID '{chat_id}' not found"
             )
 
-        # Get messages from messages_table for proper ordering
-        messages_repo = MessagesRepo()
-        messages_list = messages_repo.get_messages_by_chat_id(chat_id=chat_id)
-
-        # Convert messages to response format
-        message_responses = []
-        if messages_list:
-            # Sort messages by created_at to ensure chronological order
-            sorted_messages = sorted(messages_list, key=lambda x: x.get('created_at', ''))
-
-            for msg in sorted_messages:
-                message_responses.append(MessageResponse(
-                    message_id=msg.get('message_id'),
-                    role=msg.get('role'),
-                    content=msg.get('content'),
-                    created_at=msg.get('created_at')
-                ))
+        if page is None:
+            raise HTTPException(
+                status_code=500,
+                detail="Error retrieving chat messages"
+            )
 
         return ChatDetailResponse(
             chat_id=chat_data.get('chat_id'),
             user_id=chat_data.get('user_id'),
-            title=chat_data.get('chat_title', 'Untitled Chat'),
+            title=chat_data.get('chat_title') or 'Untitled Chat',
             created_at=chat_data.get('created_at'),
-            updated_at=chat_data.get('updated_at', chat_data.get('created_at')),
-            messages=message_responses
+            updated_at=chat_data.get('updated_at') or chat_data.get('created_at'),
+            messages=[
+                MessageResponse(
+                    message_id=msg.get('message_id'),
+                    role=msg.get('role'),
+                    content=msg.get('content'),
+                    created_at=msg.get('created_at')
+                )
+                for msg in page["messages"]
+            ],
+            next_cursor=page["next_cursor"],
+            has_more=page["next_cursor"] is not None
         )
 
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -277,7 +454,10 @@ async def get_chat_by_id(chat_id: str):
 
 
 @router.delete("/{chat_id}", response_model=SuccessResponse)
-async def delete_chat(chat_id: str):
+async def delete_chat(
+    chat_id: str,
+    chats_repo: AsyncChatsRepo = Depends(get_chats_repo)
+):
     """
     Delete a chat and its associated messages.
 
@@ -293,10 +473,8 @@ async def delete_chat(chat_id: str):
         HTTPException: If chat not found or deletion fails
     """
     try:
-        chats_repo_instance = chatsRepo()
-
         # Check if chat exists
-        chat_data = chats_repo_instance.get_chat_by_id(chat_id=chat_id)
+        chat_data = await chats_repo.get_chat_by_id(chat_id=chat_id)
         if not chat_data:
             raise HTTPException(
                 status_code=404,
@@ -304,7 +482,7 @@ async def delete_chat(chat_id: str):
             )
 
         # Delete chat (this should cascade to delete messages in database)
-        result = chats_repo_instance.delete_chat(chat_id=chat_id)
+        result = await chats_repo.delete_chat(chat_id=chat_id)
 
         return SuccessResponse(
             success=True,
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional, Literal
 
-from app.models.schemas import MessageResponse
-from app.database.messages_repo import MessagesRepo
+from app.models.schemas import MessageResponse, MessagePageResponse
+from app.database.messages_repo import AsyncMessagesRepo
+from app.dependencies import get_messages_repo
 
 
 router = APIRouter(
@@ -11,53 +12,73 @@ router = APIRouter(
 )
 
 
-@router.get("/chat/{chat_id}", response_model=List[MessageResponse])
-async def get_chat_messages(chat_id: str):
+def _message_response(msg):
+    return MessageResponse(
+        message_id=msg.get('message_id'),
+        role=msg.get('role'),
+        content=msg.get('content'),
+        created_at=msg.get('created_at')
+    )
+
+
+@router.get("/chat/{chat_id}", response_model=MessagePageResponse)
+async def get_chat_messages(
+    chat_id: str,
+    limit: int = Query(50, ge=1, le=200, description="Messages per page"),
+    before: Optional[str] = Query(None, description="Only messages older than this cursor"),
+    after: Optional[str] = Query(None, description="Only messages newer than this cursor"),
+    order: Literal["asc", "desc"] = Query("asc", description="asc: oldest first, desc: newest first"),
+    messages_repo: AsyncMessagesRepo = Depends(get_messages_repo)
+):
     """
-    Get all messages for a specific chat.
+    Get one page of a chat's messages.
 
-    Retrieves all messages in chronological order for a given chat session.
+    Messages are ordered by the database, oldest first by default; use
+    order=desc to open a chat at its latest messages. next_cursor continues
+    in the same order: pass it as `after` for asc pages, as `before` for desc.
 
     Args:
         chat_id: ID of the chat
+        limit: Messages per page (1-200)
+        before: Cursor, only return older messages
+        after: Cursor, only return newer messages
+        order: "asc" (oldest first) or "desc" (newest first)
 
     Returns:
-        List of MessageResponse objects
+        MessagePageResponse with the page of messages and the next cursor
 
     Raises:
-        HTTPException: If retrieval fails
+        HTTPException: If a cursor is invalid or retrieval fails
     """
     try:
-        messages_repo = MessagesRepo()
-        messages_list = messages_repo.get_messages_by_chat_id(chat_id=chat_id)
-
-        if not messages_list:
-            messages_list = []
-
-        # Sort messages by created_at to ensure chronological order
-        sorted_messages = sorted(messages_list, key=lambda x: x.get('created_at', ''))
-
-        # Convert to response format
-        message_responses = []
-        for msg in sorted_messages:
-            message_responses.append(MessageResponse(
-                message_id=msg.get('message_id'),
-                role=msg.get('role'),
-                content=msg.get('content'),
-                created_at=msg.get('created_at')
-            ))
-
-        return message_responses
+        page = await messages_repo.get_messages_page(
+            chat_id=chat_id,
+            limit=limit,
+            before=before,
+            after=after,
+            newest_first=order == "desc"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    except Exception as e:
+    if page is None:
         raise HTTPException(
             status_code=500,
-            detail=f"Error retrieving messages: {str(e)}"
+            detail="Error retrieving messages"
         )
 
+    return MessagePageResponse(
+        messages=[_message_response(msg) for msg in page["messages"]],
+        next_cursor=page["next_cursor"],
+        has_more=page["next_cursor"] is not None
+    )
+
 
 @router.get("/{message_id}", response_model=MessageResponse)
-async def get_message_by_id(message_id: str):
+async def get_message_by_id(
+    message_id: str,
+    messages_repo: AsyncMessagesRepo = Depends(get_messages_repo)
+):
     """
     Get a specific message by its ID.
 
@@ -71,8 +92,7 @@ async def get_message_by_id(message_id: str):
         HTTPException: If message not found
     """
     try:
-        messages_repo = MessagesRepo()
-        message = messages_repo.get_message_by_id(message_id=message_id)
+        message = await messages_repo.get_message_by_id(message_id=message_id)
 
         if not message:
             raise HTTPException(
@@ -80,12 +100,7 @@ async def get_message_by_id(message_id: str):
                 detail=f"Message with ID '{message_id}' not found"
             )
 
-        return MessageResponse(
-            message_id=message.get('message_id'),
-            role=message.get('role'),
-            content=message.get('content'),
-            created_at=message.get('created_at')
-        )
+        return _message_response(message)
 
     except HTTPException:
         raise
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import JSONResponse
 from typing import Optional
 
@@ -8,7 +8,8 @@ from app.models.schemas import (
     SuccessResponse,
     ErrorResponse
 )
-from app.database.users_repo import UsersRepository
+from app.database.users_repo import AsyncUsersRepository
+from app.dependencies import get_users_repo
 
 
 router = APIRouter(
@@ -18,7 +19,10 @@ router = APIRouter(
 
 
 @router.post("/register", response_model=UserResponse, status_code=201)
-async def register_user(user_request: UserCreateRequest):
+async def register_user(
+    user_request: UserCreateRequest,
+    users_repo: AsyncUsersRepository = Depends(get_users_repo)
+):
     """
     Register a new user.
 
@@ -34,10 +38,8 @@ async def register_user(user_request: UserCreateRequest):
         HTTPException: If email already exists or registration fails
     """
     try:
-        users_repo = UsersRepository()
-
         # Check if email already exists
-        existing_user = users_repo.get_by_email(email=user_request.email)
+        existing_user = await users_repo.get_by_email(email=user_request.email)
         if existing_user:
             raise HTTPException(
                 status_code=400,
@@ -45,13 +47,12 @@ async def register_user(user_request: UserCreateRequest):
             )
 
         # Create user
-        response = users_repo.create_user(
+        user_data = await users_repo.create_user(
             email=user_request.email,
             name=user_request.name
         )
 
-        if response and response.data:
-            user_data = response.data[0] if isinstance(response.data, list) else response.data
+        if user_data:
             return UserResponse(
                 user_id=user_data.get('user_id'),
                 email=user_data.get('email'),
@@ -74,7 +75,11 @@ async def register_user(user_request: UserCreateRequest):
 
 
 @router.post("/login", response_model=UserResponse)
-async def login_user(email: Optional[str] = None, name: Optional[str] = None):
+async def login_user(
+    email: Optional[str] = None,
+    name: Optional[str] = None,
+    users_repo: AsyncUsersRepository = Depends(get_users_repo)
+):
     """
     Login user by email or name.
 
@@ -98,16 +103,15 @@ async def login_user(email: Optional[str] = None, name: Optional[str] = None):
                 detail="Either email or name must be provided"
             )
 
-        users_repo = UsersRepository()
         user_data = None
 
         # Try email first if provided
         if email:
-            user_data = users_repo.get_by_email(email=email)
+            user_data = await users_repo.get_by_email(email=email)
 
         # If email didn't work or wasn't provided, try name
         if not user_data and name:
-            user_data = users_repo.get_by_name(name=name)
+            user_data = await users_repo.get_by_name(name=name)
 
         if not user_data:
             raise HTTPException(
@@ -132,7 +136,10 @@ async def login_user(email: Optional[str] = None, name: Optional[str] = None):
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user_by_id(user_id: str):
+async def get_user_by_id(
+    user_id: str,
+    users_repo: AsyncUsersRepository = Depends(get_users_repo)
+):
     """
     Get user details by user ID.
 
@@ -146,8 +153,7 @@ async def get_user_by_id(user_id: str):
         HTTPException: If user not found
     """
     try:
-        users_repo = UsersRepository()
-        user_data = users_repo.get_by_id(user_id=user_id)
+        user_data = await users_repo.get_by_id(user_id=user_id)
 
         if not user_data:
             raise HTTPException(
@@ -172,7 +178,10 @@ async def get_user_by_id(user_id: str):
 
 
 @router.get("/email/{email}", response_model=UserResponse)
-async def get_user_by_email(email: str):
+async def get_user_by_email(
+    email: str,
+    users_repo: AsyncUsersRepository = Depends(get_users_repo)
+):
     """
     Get user details by email.
 
@@ -186,8 +195,7 @@ async def get_user_by_email(email: str):
         HTTPException: If user not found
     """
     try:
-        users_repo = UsersRepository()
-        user_data = users_repo.get_by_email(email=email)
+        user_data = await users_repo.get_by_email(email=email)
 
         if not user_data:
             raise HTTPException(
@@ -212,7 +220,10 @@ async def get_user_by_email(email: str):
 
 
 @router.get("/name/{name}", response_model=UserResponse)
-async def get_user_by_name(name: str):
+async def get_user_by_name(
+    name: str,
+    users_repo: AsyncUsersRepository = Depends(get_users_repo)
+):
     """
     Get user details by name.
 
@@ -226,8 +237,7 @@ async def get_user_by_name(name: str):
         HTTPException: If user not found
     """
     try:
-        users_repo = UsersRepository()
-        user_data = users_repo.get_by_name(name=name)
+        user_data = await users_repo.get_by_name(name=name)
 
         if not user_data:
             raise HTTPException(
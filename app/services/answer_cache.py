@@ -0,0 +1,124 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def context_key(documents):
+    """
+    Identify a retrieved context set, independent of the order of the documents.
+
+    Uses the Pinecone vector ids, or a hash of the text for documents without one.
+    """
+    ids = sorted(
+        doc.id if getattr(doc, "id", None) else hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+        for doc in documents or []
+    )
+    return "|".join(ids)
+
+
+class SemanticAnswerCache:
+    """
+    Cache of first-turn answers, looked up by question similarity.
+
+    Each namespace keeps up to `max_entries` (question embedding, context
+    ids, answer) entries. A new question reuses an answer when it was
+    answered from the same context set and its embedding has a cosine
+    similarity of at least `threshold` with the cached question. Since the
+    context set is part of the match, adding or removing books only reuses
+    answers whose retrieved chunks did not change.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, namespace: str, embedding, documents):
+        """
+        Return the cached answer of the most similar question, or None.
+        """
+        key = context_key(documents)
+        query = self._unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._namespaces.get(namespace, OrderedDict())
+            best, best_score = None, self.threshold
+            for entry_id, entry in list(entries.items()):
+                if entry["expires"] <= now:
+                    del entries[entry_id]
+                    continue
+                if entry["context"] != key or entry["vector"].shape != query.shape:
+                    continue
+                score = float(np.dot(entry["vector"], query))
+                if score >= best_score:
+                    best, best_score = entry_id, score
+
+            if best is None:
+                self.misses += 1
+                return None
+            entries.move_to_end(best)
+            self.hits += 1
+            return entries[best]["answer"]
+
+    def put(self, namespace: str, embedding, documents, answer: str):
+        with self._lock:
+            entries = self._namespaces.setdefault(namespace, OrderedDict())
+            entries[object()] = {
+                "vector": self._unit(embedding),
+                "context": context_key(documents),
+                "answer": answer,
+                "expires": time.monotonic() + self.ttl_seconds
+            }
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._namespaces.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": answer_cache_enabled(),
+                "namespaces": len(self._namespaces),
+                "entries": sum(len(entries) for entries in self._namespaces.values()),
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def answer_cache_enabled() -> bool:
+    return os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+
+
+# Process-wide cache, opt-in with SEMANTIC_CACHE_ENABLED=true. Tuned with
+# SEMANTIC_CACHE_THRESHOLD (default: 0.95 cosine similarity),
+# SEMANTIC_CACHE_MAX_ENTRIES (default: 256 per namespace) and
+# SEMANTIC_CACHE_TTL_SECONDS (default: 86400)
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "256")),
+    ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+)
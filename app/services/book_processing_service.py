@@ -1,5 +1,15 @@
-import os
-from app.database.books_repo import BooksRepository
+import asyncio
+from app.database.books_repo import AsyncBooksRepository
+from app.services.pinecone_service import AsyncPineconeService
+from app.services.ragappfunction import iter_pdf_pages, count_pages
+from app.services.ingestion_service import stream_chunks
+from app.services.job_service import Job, job_manager
+
+# Stages of a book ingestion job, in order
+INGESTION_STAGES = ["upload", "parse", "chunk", "embed"]
+
+# Stages of a book deletion job, in order
+DELETION_STAGES = ["vectors", "storage", "record"]
 
 
 class BookProcessingService:
@@ -8,14 +18,16 @@ class BookProcessingService:
     This service coordinates between receiving files and storing them.
     """
 
-    def __init__(self):
+    def __init__(self, books_repo: AsyncBooksRepository = None, pinecone_service: AsyncPineconeService = None):
         """
         Initialize the service with necessary dependencies.
-        - books_repo: Repository for database and storage operations
-        - temp_folder: Local folder to temporarily store uploaded files
+        - books_repo: Async repository for database and storage operations
+          (created on first upload when not given)
+        - pinecone_service: Service the chunks are ingested through
+          (created per ingestion when not given)
         """
-        self.books_repo = BooksRepository()
-        self.temp_folder = "temp"
+        self.books_repo = books_repo
+        self.pinecone_service = pinecone_service
 
     async def upload_pdf(
         self,
@@ -48,34 +60,28 @@ class BookProcessingService:
 
         Process:
         --------
-        1. Save file to temp folder for potential later processing (Chunking the doc and uploading to Pinecoene)
-        2. Upload file to Supabase Storage in user's subfolder
-        3. Create book record in database with storage path
-        """
-        temp_path = None
+        1. Upload file to Supabase Storage in user's subfolder
+        2. Create book record in database with storage path
 
+        Nothing is written to local disk, processing parses the bytes in
+        memory or downloads them again from storage.
+        """
         try:
-            # Step 1: Save file to temp folder
-            # Format: temp/user123_mybook.pdf
-            # This allows the file to be processed later by other services
-            temp_path = os.path.join(self.temp_folder, f"{user_id}_{filename}")
-
-            # Write the binary content to a file
-            with open(temp_path, "wb") as f:
-                f.write(file_content)
+            if self.books_repo is None:
+                self.books_repo = await AsyncBooksRepository.create()
 
-            # Step 2: Upload to Supabase Storage
+            # Step 1: Upload to Supabase Storage
             # This creates a subfolder with user_id and stores the file
             # Example path in Supabase: documents/user123/mybook.pdf
-            upload_result = self.books_repo.upload_file_to_storage(
+            upload_result = await self.books_repo.upload_file_to_storage(
                 user_id=user_id,
                 file_content=file_content,
                 filename=filename
             )
 
-            # Step 3: Create book record in database
+            # Step 2: Create book record in database
             # This saves metadata about the book including where it's stored
-            book_record = self.books_repo.create_book(
+            book_record = await self.books_repo.create_book(
                 user_id=user_id,
                 filename=filename,
                 author=author,
@@ -87,9 +93,132 @@ class BookProcessingService:
             return book_record
 
         except Exception as e:
-            # If any error occurs, clean up the temp file
-            if temp_path and os.path.exists(temp_path):
-                os.remove(temp_path)
-
             # Re-raise the exception with context
             raise Exception(f"Error uploading PDF: {str(e)}")
+
+    async def ingest_upload(
+        self,
+        job: Job,
+        file_content: bytes,
+        filename: str,
+        user_id: str,
+        book_title: str,
+        author: str = None,
+        chunk_size: int = 400,
+        chunk_overlap: int = 50
+    ):
+        """
+        Body of a book ingestion job (see INGESTION_STAGES).
+
+        1. upload: store the PDF and create the book record
+        2. parse: extract the pages in parallel on the job manager's process pool
+        3. chunk: split the pages into text chunks
+        4. embed: embed and upsert the chunks to the user's namespace
+
+        Parse, chunk and embed run as one stream: pages are chunked as they
+        are extracted and chunks are embedded as they are produced, so the
+        book is never held in memory as a whole list of pages or chunks.
+
+        Returns:
+        --------
+        dict : Namespace, chunk count and ingestion stats, stored as job.result
+        """
+        job.start_stage("upload")
+        book_record = await self.upload_pdf(
+            file_content=file_content,
+            filename=filename,
+            user_id=user_id,
+            book_title=book_title,
+            author=author
+        )
+        job.complete_stage("upload")
+
+        # The PDF is parsed straight from the uploaded bytes, no temp file
+        total_pages = await asyncio.to_thread(count_pages, file_content)
+
+        job.start_stage("parse")
+        job.start_stage("chunk")
+        job.start_stage("embed")
+        produced = 0
+
+        def on_page(seen):
+            job.update_stage("parse", seen / total_pages, detail=f"{seen}/{total_pages} pages")
+
+        async def chunk_stream():
+            nonlocal produced
+            # Pages are extracted in parallel on the job process pool
+            # and arrive in order
+            pages = iter_pdf_pages(file_content, executor=job_manager.process_pool, name=filename)
+            async for chunk in stream_chunks(pages, chunk_size, chunk_overlap, on_page=on_page):
+                produced += 1
+                job.update_stage("chunk", job.stages["parse"]["progress"], detail=f"{produced} chunks")
+                yield chunk
+            job.complete_stage("parse", detail=f"{total_pages} pages")
+            job.complete_stage("chunk", detail=f"{produced} chunks")
+
+        def on_progress(done):
+            # The final total is unknown until parsing ends, estimate it from the pages seen
+            parsed = job.stages["parse"]["progress"] or 1.0
+            job.update_stage("embed", min(done / (produced / parsed), 1.0), detail=f"{done}/{produced} chunks")
+
+        namespace = f"user_{user_id}"
+        pinecone_service = self.pinecone_service or AsyncPineconeService()
+        # Chunks carry the book_id so chats can be scoped to this book
+        book_id = book_record.get("book_id") if book_record else None
+        stats = await pinecone_service.ingest_documents(namespace, chunk_stream(), on_progress=on_progress, book_id=book_id)
+        job.complete_stage("embed", detail=f"{stats['chunks']} chunks")
+
+        return {
+            "namespace": namespace,
+            "book_id": book_id,
+            "chunks_count": stats["chunks"],
+            "stats": stats
+        }
+
+    async def delete_book(self, job: Job, book):
+        """
+        Body of a book deletion job (see DELETION_STAGES).
+
+        1. vectors: delete the book's vectors from its namespace in batches
+        2. storage: remove the PDF from storage
+        3. record: delete the book row
+
+        The row goes last, so a failed job can be retried from the book record.
+
+        Returns:
+        --------
+        dict : Book id, namespace, number of vectors deleted and of untagged
+            vectors left in the namespace, stored as job.result
+        """
+        if self.books_repo is None:
+            self.books_repo = await AsyncBooksRepository.create()
+        pinecone_service = self.pinecone_service or AsyncPineconeService()
+        book_id = book['book_id']
+        namespace = book.get('pinecone_namespace') or f"user_{book.get('user_id')}"
+
+        job.start_stage("vectors")
+
+        def on_progress(done, total):
+            job.update_stage("vectors", done / total, detail=f"{done}/{total} vectors")
+
+        report = await pinecone_service.delete_book_vectors(namespace, book_id, on_progress=on_progress)
+        detail = f"{report['deleted']} vectors"
+        if report["untagged"]:
+            detail += f", {report['untagged']} untagged vectors in the namespace left in place"
+        job.complete_stage("vectors", detail=detail)
+
+        job.start_stage("storage")
+        if book.get('storage_path'):
+            await self.books_repo.delete_file_from_storage(book['storage_path'])
+        job.complete_stage("storage")
+
+        job.start_stage("record")
+        await self.books_repo.delete_book(book_id=book_id)
+        job.complete_stage("record")
+
+        return {
+            "book_id": book_id,
+            "namespace": namespace,
+            "vectors_deleted": report["deleted"],
+            "untagged_vectors_skipped": report["untagged"]
+        }
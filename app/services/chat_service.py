@@ -1,7 +1,7 @@
 from app.services.pinecone_service import PineconeService
-from app.database.chats_repo import chatsRepo
-from app.database.messages_repo import MessagesRepo
-from app.services.openai_service import OpenAIResponse
+from app.database.chats_repo import chatsRepo, AsyncChatsRepo
+from app.database.messages_repo import MessagesRepo, AsyncMessagesRepo
+from app.services.openai_service import OpenAIResponse, AsyncOpenAIResponse
 
 class ChatService:
     def __init__(self, user_id: str, question: str, retrieve_history : bool):
@@ -12,6 +12,7 @@ class ChatService:
         self.chats_repo = chatsRepo()
         self.messages_repo = MessagesRepo()
         self.openai_service = OpenAIResponse()
+        self.chat_id = None  # Set by new_chat once the chat is created
 
     def new_chat(self, question, vectorstore):
         # Call the OpenAI new_chat method to get AI response
@@ -22,24 +23,8 @@ class ChatService:
 
             # If chat was created successfully, add the message
             if chat_id:
-                self.messages_repo.add_message(
-                    chat_id=chat_id,
-                    role="user",
-                    content=question
-                )
-                self.messages_repo.add_message(
-                    chat_id=chat_id,
-                    role="assistant",
-                    content=result
-                )
-
-                # Get all messages for this chat_id and update the chat
-                messages = self.messages_repo.get_messages_by_chat_id(chat_id=chat_id)
-                if messages:
-                    for message in messages:
-                        message_id = message.get('message_id')
-                        if message_id:
-                            self.chats_repo.update_chat(chat_id=chat_id, message_id=message_id)
+                # The chat was just created, its messages field is still empty
+                self._save_turn(chat_id, question, result, chat_data={"messages": {}})
 
                 print("chat saved!")
                 return result
@@ -49,18 +34,35 @@ class ChatService:
         else:
             print("sorry techinical difficulty, ai function is not responding")
             return "end"
+    def _save_turn(self, chat_id, question, result, chat_data=None):
+        """
+        Persist one question/answer turn.
+
+        Both messages go in with one bulk insert and the chat's messages field
+        is patched once, so a turn costs the same number of round trips however
+        long the conversation is. chat_data (the loaded chat row) skips the
+        select of the current messages.
+        """
+        rows = self.messages_repo.add_messages(
+            chat_id=chat_id,
+            messages=[
+                {"role": "user", "content": question},
+                {"role": "assistant", "content": result}
+            ]
+        )
+        if rows:
+            self.chats_repo.append_messages(chat_id=chat_id, message_rows=rows, chat_data=chat_data)
+
     def initialize_chat_id(self, airesponse):
-        title = airesponse[:30]
-        response = self.chats_repo.create_chat(
+        # create_chat returns the inserted row, no lookup by title needed
+        chat_row = self.chats_repo.create_chat(
             user_id=self.user_id,
-            title=title
+            title=airesponse[:30]
         )
 
-        # Get the chat_id from the created chat
-        if response:
-            chat_data = self.chats_repo.get_chat_by_id(title=title)
-            if chat_data:
-                return chat_data.get('chat_id')
+        if chat_row:
+            self.chat_id = chat_row.get('chat_id')
+            return self.chat_id
 
         print("Had difficulty creating the chat")
         return None
@@ -93,33 +95,160 @@ class ChatService:
             )
 
             if result:
-                # Add user message
-                self.messages_repo.add_message(
-                    chat_id=chat_id,
-                    role="user",
-                    content=question
-                )
-                # Add assistant response
-                self.messages_repo.add_message(
-                    chat_id=chat_id,
-                    role="assistant",
-                    content=result
-                )
-
-                # Get all messages for this chat_id and update the chat
-                messages = self.messages_repo.get_messages_by_chat_id(chat_id=chat_id)
-                if messages:
-                    for message in messages:
-                        message_id = message.get('message_id')
-                        if message_id:
-                            self.chats_repo.update_chat(chat_id=chat_id, message_id=message_id)
-
-               
+                self._save_turn(chat_id, question, result, chat_data=chat_data)
+                return result
+            else:
+                print("Sorry, technical difficulty - AI function is not responding")
+                return "end"
+        else:
+            print("Sorry this chat_id doesn't belong to you, there must be technical difficulty")
+            return "end"
+
+
+class AsyncChatService:
+    """
+    Async variant of ChatService used by the API routers.
+
+    Built per request by app.dependencies.ChatServiceFactory from the
+    app's shared services.
+    """
+    def __init__(self, user_id: str, question: str, vectorstore, chats_repo: AsyncChatsRepo,
+                 messages_repo: AsyncMessagesRepo, openai_service: AsyncOpenAIResponse):
+        self.user_id = user_id
+        self.question = question
+        self.vectorstore = vectorstore
+        self.chats_repo = chats_repo
+        self.messages_repo = messages_repo
+        self.openai_service = openai_service
+        self.chat_id = None  # Set by new_chat once the chat is created
+
+    async def _save_turn(self, chat_id, question, result, chat_data=None):
+        """Persist one turn with a bulk insert and one chat update, see ChatService._save_turn"""
+        rows = await self.messages_repo.add_messages(
+            chat_id=chat_id,
+            messages=[
+                {"role": "user", "content": question},
+                {"role": "assistant", "content": result}
+            ]
+        )
+        if rows:
+            await self.chats_repo.append_messages(chat_id=chat_id, message_rows=rows, chat_data=chat_data)
+
+    async def new_chat(self, question, vectorstore, use_cache=True, book_id=None):
+        result = await self.openai_service.new_chat(
+            question=question,
+            pinconevectorstore=vectorstore,
+            use_cache=use_cache,
+            book_id=book_id
+        )
+
+        if result is not None:
+            chat_id = await self.initialize_chat_id(airesponse=result)
+
+            if chat_id:
+                # The chat was just created, its messages field is still empty
+                await self._save_turn(chat_id, question, result, chat_data={"messages": {}})
+                print("chat saved!")
+                return result
+            else:
+                print("chat-id couldn't be created as of now, sorry!")
+                return "end"
+        else:
+            print("sorry techinical difficulty, ai function is not responding")
+            return "end"
+
+    async def initialize_chat_id(self, airesponse):
+        """
+        Create the chat and return its chat_id, also kept as self.chat_id
+        so the caller of new_chat can read it.
+        """
+        chat_row = await self.chats_repo.create_chat(
+            user_id=self.user_id,
+            title=airesponse[:30]
+        )
+
+        if chat_row:
+            self.chat_id = chat_row.get('chat_id')
+            return self.chat_id
+
+        print("Had difficulty creating the chat")
+        return None
+
+    async def continuing_chat(self, chat_id, question, book_id=None):
+        """
+        Continue an existing chat conversation, see ChatService.continuing_chat.
+
+        book_id limits retrieval to one of the user's books.
+        """
+        chat_data = await self.chats_repo.get_chat_by_id(chat_id=chat_id)
+
+        if chat_data and chat_data.get('user_id') == self.user_id:
+            result = await self.openai_service.continue_chat(
+                chat_id=chat_id,
+                question=question,
+                pinconevectorstore=self.vectorstore,
+                chat_data=chat_data,
+                book_id=book_id
+            )
+
+            if result:
+                await self._save_turn(chat_id, question, result, chat_data=chat_data)
                 return result
             else:
                 print("Sorry, technical difficulty - AI function is not responding")
                 return "end"
         else:
             print("Sorry this chat_id doesn't belong to you, there must be technical difficulty")
-            return "end" 
-    
\ No newline at end of file
+            return "end"
+
+    async def stream_new_chat(self, question, vectorstore, use_cache=True, book_id=None):
+        """
+        Streaming version of new_chat.
+
+        Yields {"event": "token", "content": ...} for every token, then saves
+        the turn and yields a final {"event": "done", ...} with the chat_id.
+        """
+        parts = []
+        async for token in self.openai_service.stream_new_chat(
+            question=question,
+            pinconevectorstore=vectorstore,
+            use_cache=use_cache,
+            book_id=book_id
+        ):
+            parts.append(token)
+            yield {"event": "token", "content": token}
+
+        result = "".join(parts)
+        chat_id = await self.initialize_chat_id(airesponse=result)
+        if not chat_id:
+            yield {"event": "error", "detail": "chat-id couldn't be created"}
+            return
+
+        await self._save_turn(chat_id, question, result, chat_data={"messages": {}})
+        yield {"event": "done", "chat_id": chat_id, "answer": result}
+
+    async def stream_continuing_chat(self, chat_id, question, chat_data=None, book_id=None):
+        """
+        Streaming version of continuing_chat, see stream_new_chat for the events.
+        """
+        if chat_data is None:
+            chat_data = await self.chats_repo.get_chat_by_id(chat_id=chat_id)
+
+        if not chat_data or chat_data.get('user_id') != self.user_id:
+            yield {"event": "error", "detail": "Chat does not belong to this user"}
+            return
+
+        parts = []
+        async for token in self.openai_service.stream_continue_chat(
+            chat_id=chat_id,
+            question=question,
+            pinconevectorstore=self.vectorstore,
+            chat_data=chat_data,
+            book_id=book_id
+        ):
+            parts.append(token)
+            yield {"event": "token", "content": token}
+
+        result = "".join(parts)
+        await self._save_turn(chat_id, question, result, chat_data=chat_data)
+        yield {"event": "done", "chat_id": chat_id, "answer": result}
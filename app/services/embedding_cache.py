@@ -0,0 +1,239 @@
+import os
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from array import array
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed store of embedding vectors.
+
+    Vectors live in a SQLite file keyed by sha256(model name + chunk text), so
+    the same chunk embedded with the same model is only paid for once, across
+    re-processing runs, users and restarts. When the stored vectors grow past
+    `max_bytes` the least recently used entries are evicted.
+
+    Worker processes share the file, so the size is always read from the
+    table, and a write that cannot get the database lock within `timeout`
+    seconds is skipped (a lookup counts as a miss) rather than failing the
+    ingestion.
+    """
+
+    def __init__(self, path: str, max_bytes: int, timeout: float = 5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.skipped_writes = 0
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _size(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts):
+        """
+        Look up vectors for texts.
+
+        Returns:
+        --------
+        list : One vector (list of floats) per text, None where not cached
+        """
+        keys = [self.key(model, text) for text in texts]
+        found = {}
+        with self._lock:
+            try:
+                # SQLite limits the number of bound parameters per statement
+                for i in range(0, len(keys), 500):
+                    part = keys[i:i + 500]
+                    placeholders = ",".join("?" * len(part))
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = array("f", blob).tolist()
+            except sqlite3.OperationalError as e:
+                print(f"[WARNING] Embedding cache lookup failed, embedding every text: {e}")
+                found = {}
+
+            if found:
+                now = time.time()
+                try:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                        [(now, key) for key in found]
+                    )
+                    self._conn.commit()
+                except sqlite3.OperationalError as e:
+                    # Only the recency is lost, the vectors are still served
+                    self._conn.rollback()
+                    print(f"[WARNING] Could not update embedding cache recency: {e}")
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        return [found.get(key) for key in keys]
+
+    def put_many(self, model: str, texts, vectors):
+        """Store vectors for texts, evicting old entries if over the size limit."""
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = array("f", vector).tobytes()
+            rows.append((self.key(model, text), blob, len(blob), now))
+
+        with self._lock:
+            try:
+                # One write transaction, so the size checked is the one evicted from
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                if self._size() > self.max_bytes:
+                    self._evict()
+                self._conn.commit()
+            except sqlite3.OperationalError as e:
+                self._conn.rollback()
+                self.skipped_writes += 1
+                print(f"[WARNING] Skipped an embedding cache write: {e}")
+
+    def _evict(self):
+        # Keep the most recently used entries that fit in 90% of the limit,
+        # so eviction does not run again on the very next insert
+        cursor = self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            " SELECT key FROM ("
+            "  SELECT key, SUM(size) OVER (ORDER BY last_access DESC, key) AS newer FROM embeddings"
+            " ) WHERE newer > ?)",
+            (int(self.max_bytes * 0.9),)
+        )
+        self.evictions += cursor.rowcount
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "skipped_writes": self.skipped_writes,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that consults an EmbeddingCache before calling the
+    underlying model for documents, and only sends the texts that were not
+    cached. Query embeddings go straight to the model.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    @property
+    def model(self):
+        return getattr(self.embeddings, "model", type(self.embeddings).__name__)
+
+    @staticmethod
+    def _merge(cached, missing_vectors):
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        for i, vector in zip(missing, missing_vectors):
+            cached[i] = vector
+        return cached
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        cached = self.cache.get_many(self.model, texts)
+        missing_texts = [text for text, vector in zip(texts, cached) if vector is None]
+        if missing_texts:
+            vectors = self.embeddings.embed_documents(missing_texts)
+            self.cache.put_many(self.model, missing_texts, vectors)
+            return self._merge(cached, vectors)
+        return cached
+
+    async def aembed_documents(self, texts):
+        texts = list(texts)
+        cached = await asyncio.to_thread(self.cache.get_many, self.model, texts)
+        missing_texts = [text for text, vector in zip(texts, cached) if vector is None]
+        if missing_texts:
+            vectors = await self.embeddings.aembed_documents(missing_texts)
+            await asyncio.to_thread(self.cache.put_many, self.model, missing_texts, vectors)
+            return self._merge(cached, vectors)
+        return cached
+
+    # Questions are not cached: they rarely repeat verbatim, would evict the
+    # ingestion vectors this cache is sized for, and repeated questions are
+    # already served by the retrieval query cache
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text):
+        return await self.embeddings.aembed_query(text)
+
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """
+    Return the process-wide EmbeddingCache, or None when disabled.
+
+    Configured with EMBEDDING_CACHE_ENABLED (default: true),
+    EMBEDDING_CACHE_PATH (default: cache/embeddings.sqlite3) and
+    EMBEDDING_CACHE_MAX_MB (default: 512).
+    """
+    global _embedding_cache
+    if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() != "true":
+        return None
+
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(
+                path=os.getenv("EMBEDDING_CACHE_PATH", os.path.join("cache", "embeddings.sqlite3")),
+                max_bytes=int(float(os.getenv("EMBEDDING_CACHE_MAX_MB", "512")) * 1024 * 1024)
+            )
+    return _embedding_cache
+
+
+def with_embedding_cache(embeddings: Embeddings) -> Embeddings:
+    """Wrap embeddings with the shared cache when it is enabled."""
+    cache = get_embedding_cache()
+    return CachedEmbeddings(embeddings, cache) if cache is not None else embeddings
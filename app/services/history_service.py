@@ -0,0 +1,145 @@
+import os
+from dotenv import load_dotenv
+from app.utils.tokens import load_encoding, count_tokens, truncate_tokens
+
+load_dotenv()
+
+SUMMARY_PROMPT = "Summarize the conversation below for an assistant that will continue it. Keep names, facts, book references and open questions; drop small talk. Answer with the summary only."
+
+# Per-message overhead of the chat format (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def ordered_turns(messages: dict) -> list:
+    """
+    A chat's stored messages ({message_id: message}) as chat messages in
+    created_at order. jsonb does not keep the keys' insertion order; messages
+    stored before created_at was kept come first, in the order given.
+    """
+    turns = sorted(messages.values(), key=lambda message: message.get("created_at") or "")
+    return [{"role": message["role"], "content": message["content"]} for message in turns]
+
+
+class HistoryManager:
+    """
+    Fits a chat's stored history into a token budget.
+
+    The most recent messages are sent verbatim as long as they fit in
+    HISTORY_TOKEN_BUDGET tokens (default: 3000). Older messages are folded
+    into a running summary, stored on the chat row (`history_summary`, plus
+    `history_summary_count` for how many leading messages it covers) so it
+    is only extended when new messages fall out of the window, not rebuilt
+    on every turn.
+
+    When the window overflows, enough messages are summarized to bring it
+    back to half the budget, so the next few turns need no summarization.
+    Those messages are summarized in slices of at most the budget, each
+    completion extending the summary of the previous one, so the first
+    summary of a long chat never sends the whole backlog at once.
+    """
+
+    def __init__(self, client, chats_repo, model: str, max_tokens: int = None, summary_model: str = None):
+        """
+        Parameters:
+        -----------
+        client : AsyncOpenAI
+            Client used for the summary completions
+        chats_repo : AsyncChatsRepo
+            Repository the summary is cached through
+        model : str
+            Chat model the history is sent to (selects the tokenizer)
+        """
+        self.client = client
+        self.chats_repo = chats_repo
+        self.max_tokens = max_tokens or int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+        self.summary_model = summary_model or os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini")
+        self._encoding = load_encoding(model)
+
+    def message_tokens(self, message) -> int:
+        return count_tokens(message.get("content") or "", self._encoding) + MESSAGE_OVERHEAD_TOKENS
+
+    def window_start(self, history, budget: int, start: int = 0) -> int:
+        """Index of the oldest message (at or after start) such that the rest fits in budget tokens."""
+        used = 0
+        for index in range(len(history) - 1, start - 1, -1):
+            used += self.message_tokens(history[index])
+            if used > budget:
+                # Always keep the latest message, even when it alone is over budget
+                return min(index + 1, len(history) - 1)
+        return start
+
+    async def build(self, chat_id: str, chat_data) -> list:
+        """
+        Messages to put between the system prompt and the new question.
+
+        Returns:
+        --------
+        list : An optional summary system message followed by the recent messages
+        """
+        history = ordered_turns(chat_data.get("messages") or {})
+        summary = chat_data.get("history_summary")
+        covered = chat_data.get("history_summary_count") or 0
+        if covered > len(history):
+            # The summary is out of sync with the messages, start over
+            summary, covered = None, 0
+
+        if self.window_start(history, self.max_tokens, covered) > covered:
+            start = self.window_start(history, self.max_tokens // 2, covered)
+            try:
+                summary = await self._summarize(summary, history[covered:start])
+                covered = start
+                await self._save_summary(chat_id, summary, covered)
+            except Exception as e:
+                # Send what fits and go without the older context this turn
+                print(f"[WARNING] Could not summarize chat history: {e}")
+                covered = self.window_start(history, self.max_tokens, covered)
+
+        messages = []
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        messages.extend(history[covered:])
+        return messages
+
+    def _slices(self, messages):
+        """Consecutive runs of messages of at most max_tokens tokens each."""
+        chunk, used = [], 0
+        for message in messages:
+            tokens = self.message_tokens(message)
+            if chunk and used + tokens > self.max_tokens:
+                yield chunk
+                chunk, used = [], 0
+            chunk.append(message)
+            used += tokens
+        if chunk:
+            yield chunk
+
+    async def _summarize(self, summary, messages):
+        for chunk in self._slices(messages):
+            summary = await self._summarize_slice(summary, chunk)
+        return summary
+
+    async def _summarize_slice(self, summary, messages):
+        # A single message over the budget is cut down to it
+        transcript = "\n".join(
+            f"{message.get('role')}: {truncate_tokens(message.get('content') or '', self.max_tokens, self._encoding)}"
+            for message in messages
+        )
+        if summary:
+            transcript = f"Earlier summary:\n{summary}\n\nConversation continued:\n{transcript}"
+
+        response = await self.client.chat.completions.create(
+            model=self.summary_model,
+            temperature=0,
+            max_tokens=400,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": transcript}
+            ])
+        return response.choices[0].message.content
+
+    async def _save_summary(self, chat_id, summary, covered):
+        if self.chats_repo is None or not chat_id:
+            return
+        response = await self.chats_repo.update_history_summary(chat_id=chat_id, summary=summary, message_count=covered)
+        if response is None:
+            print(f"[WARNING] History summary for chat {chat_id} was not cached, it will be rebuilt next turn")
@@ -0,0 +1,422 @@
+import os
+import re
+import math
+import json
+import heapq
+import asyncio
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from app.utils.file_lock import file_lock
+from app.services.query_cache import cached_search
+
+load_dotenv()
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Keeps identifiers like __init__ or read_doc whole, plus their parts
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str):
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = [part for part in token.split("_") if part]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class KeywordIndex:
+    """
+    BM25 inverted index over one namespace's chunks.
+
+    Chunks are keyed by their vector id, so keyword and dense results of the
+    same chunk fuse into one. Saving appends the unsaved changes to a log
+    under KEYWORD_INDEX_PATH/<namespace>.json, one JSON line per added chunk
+    (term counts, text and metadata) or deleted id, so an ingestion writes
+    its own chunks rather than the whole index; the postings are rebuilt
+    from the log on load. The log is compacted once it holds more dead
+    lines than live chunks.
+
+    Worker processes share the files: saving holds an exclusive lock on
+    `<path>.lock` and first replays what others appended, and every read
+    replays new lines, so no worker serves deleted chunks, misses another's
+    ingestion or overwrites it.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._pending = []    # unsaved changes, as log records
+        self._lock = threading.RLock()
+        self._reset()
+        if path and os.path.exists(path):
+            self._migrate()
+            with self._lock:
+                self._refresh()
+
+    @property
+    def dirty(self):
+        return bool(self._pending)
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._docs)
+
+    def _reset(self):
+        self._docs = {}       # vector id -> (text, metadata, term counts, length)
+        self._postings = {}   # term -> {vector id: term frequency}
+        self._total_length = 0
+        self._log_state = None  # (inode, bytes replayed) of the log
+        self._log_entries = 0
+
+    # ==================== LOG ====================
+
+    def _log_stat(self):
+        try:
+            stat = os.stat(self.path)
+        except (FileNotFoundError, TypeError):
+            return None
+        return (stat.st_ino, stat.st_size)
+
+    def _refresh(self):
+        """Catch up with changes saved by other processes (hold self._lock)."""
+        stat = self._log_stat()
+        if stat is not None and stat != self._log_state:
+            # Shared lock, so a compaction is never seen half done
+            with file_lock(self.path + ".lock", shared=True):
+                self._replay()
+
+    def _replay(self):
+        """Apply the log lines not seen yet, then the unsaved changes on top (hold the file lock)."""
+        stat = self._log_stat()
+        if stat is None:
+            return
+        inode, size = stat
+        if self._log_state is None or self._log_state[0] != inode or size < self._log_state[1]:
+            # First load, or compacted by another process: start over
+            self._reset()
+            self._log_state = (inode, 0)
+        offset = self._log_state[1]
+        if size == offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        # A line still being written is picked up next time
+        data = data[:data.rfind(b"\n") + 1]
+        for line in data.splitlines():
+            self._apply(json.loads(line))
+            self._log_entries += 1
+        self._log_state = (inode, offset + len(data))
+        for record in self._pending:
+            self._apply(record)
+
+    def _migrate(self):
+        # Indexes saved as one JSON array by earlier versions become a log
+        with file_lock(self.path + ".lock"):
+            with open(self.path, "rb") as f:
+                if f.read(1) != b"[":
+                    return
+                f.seek(0)
+                records = json.load(f)
+            self._write_log(records)
+
+    def _write_log(self, records):
+        with open(self.path + ".tmp", "wb") as f:
+            for record in records:
+                f.write((json.dumps(record) + "\n").encode("utf-8"))
+        # Write beside and swap in, so readers never see half a file
+        os.replace(self.path + ".tmp", self.path)
+
+    # ==================== INDEX ====================
+
+    def _apply(self, record):
+        doc_id = record["id"]
+        if doc_id in self._docs:
+            self._remove(doc_id)
+        if not record.get("deleted"):
+            self._insert(doc_id, record["text"], record["metadata"], Counter(record["terms"]))
+
+    def _insert(self, doc_id, text, metadata, terms):
+        length = sum(terms.values())
+        self._docs[doc_id] = (text, metadata, terms, length)
+        self._total_length += length
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = count
+
+    def _remove(self, doc_id):
+        _text, _metadata, terms, length = self._docs.pop(doc_id)
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _change(self, record):
+        self._apply(record)
+        self._pending.append(record)
+
+    def add(self, ids, documents):
+        with self._lock:
+            self._refresh()
+            for doc_id, doc in zip(ids, documents):
+                metadata = {key: value for key, value in (doc.metadata or {}).items() if value is not None}
+                self._change({
+                    "id": doc_id,
+                    "text": doc.page_content,
+                    "metadata": metadata,
+                    "terms": dict(Counter(tokenize(doc.page_content)))
+                })
+
+    def delete(self, ids):
+        with self._lock:
+            self._refresh()
+            # Logged even when not loaded here: another process may have
+            # saved it since
+            for doc_id in ids:
+                self._change({"id": doc_id, "deleted": True})
+
+    def delete_where(self, filter: dict):
+        """Delete every chunk whose metadata matches filter, returns how many."""
+        with self._lock:
+            self._refresh()
+            matching = [doc_id for doc_id in self._docs if self._matches(doc_id, filter)]
+            self.delete(matching)
+            return len(matching)
+
+    def search(self, query: str, k: int = 4, filter: dict = None):
+        """
+        Top-k chunks by BM25 score, among those whose metadata matches
+        every key of filter when given.
+
+        Returns:
+        --------
+        list : (Document, score) pairs, best first
+        """
+        with self._lock:
+            self._refresh()
+            count = len(self._docs)
+            if not count:
+                return []
+            average_length = self._total_length / count
+            scores = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if filter and not self._matches(doc_id, filter):
+                        continue
+                    length = self._docs[doc_id][3]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+            results = []
+            for doc_id, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1]):
+                text, metadata, _terms, _length = self._docs[doc_id]
+                results.append((Document(id=doc_id, page_content=text, metadata=dict(metadata)), score))
+            return results
+
+    def _matches(self, doc_id, filter):
+        metadata = self._docs[doc_id][1]
+        return all(metadata.get(key) == value for key, value in filter.items())
+
+    def save(self):
+        """
+        Append the unsaved changes to the log, after replaying what other
+        processes saved meanwhile, and compact it when mostly dead lines.
+        """
+        with self._lock:
+            if not self.path or not self._pending:
+                return
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with file_lock(self.path + ".lock"):
+                self._replay()
+                with open(self.path, "ab") as f:
+                    f.write("".join(json.dumps(record) + "\n" for record in self._pending).encode("utf-8"))
+                self._pending = []
+                self._replay()
+
+                live = len(self._docs)
+                if self._log_entries - live > live:
+                    self._write_log(
+                        {"id": doc_id, "text": text, "metadata": metadata, "terms": terms}
+                        for doc_id, (text, metadata, terms, _length) in self._docs.items()
+                    )
+                    stat = os.stat(self.path)
+                    self._log_state = (stat.st_ino, stat.st_size)
+                    self._log_entries = live
+
+
+class KeywordIndexRegistry:
+    """
+    Loads each namespace's KeywordIndex once and keeps up to `max_size` of
+    them in memory, least recently used first out (unsaved ones are saved
+    before they go). Loaded indexes catch up with what other processes
+    save to the same files.
+    """
+
+    def __init__(self, path: str, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def file_path(self, namespace: str) -> str:
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", namespace) or "_default"
+        return os.path.join(self.path, f"{safe_name}.json")
+
+    def get(self, namespace: str) -> KeywordIndex:
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is not None:
+                self._indexes.move_to_end(namespace)
+                return index
+
+            index = KeywordIndex(self.file_path(namespace))
+            self._indexes[namespace] = index
+            while len(self._indexes) > self.max_size:
+                _namespace, evicted = self._indexes.popitem(last=False)
+                evicted.save()
+            return index
+
+    def add(self, namespace: str, ids, documents):
+        self.get(namespace).add(ids, documents)
+
+    def delete_ids(self, namespace: str, ids):
+        index = self.get(namespace)
+        index.delete(ids)
+        index.save()
+
+    def delete_book(self, namespace: str, book_id: str):
+        """Drop a book's chunks from the namespace's index and save it."""
+        index = self.get(namespace)
+        deleted = index.delete_where({"book_id": book_id})
+        index.save()
+        return deleted
+
+    def save(self, namespace: str):
+        with self._lock:
+            index = self._indexes.get(namespace)
+        if index is not None:
+            index.save()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "namespaces": len(self._indexes),
+                "chunks": sum(len(index) for index in self._indexes.values()),
+                "max_size": self.max_size
+            }
+
+
+# Process-wide registry, configured with KEYWORD_INDEX_PATH (default:
+# cache/keyword) and KEYWORD_INDEX_CACHE_SIZE (default: 64 namespaces)
+keyword_indexes = KeywordIndexRegistry(
+    path=os.getenv("KEYWORD_INDEX_PATH", "cache/keyword"),
+    max_size=int(os.getenv("KEYWORD_INDEX_CACHE_SIZE", "64"))
+)
+
+
+def keyword_upserter(upsert, namespace: str):
+    """
+    Wrap the upsert stage of an IngestionEngine so every batch written to
+    the vectorstore is also added to the namespace's keyword index.
+    Call keyword_indexes.save(namespace) when the ingestion is done.
+    """
+    async def upsert_both(ids, vectors, documents):
+        await upsert(ids, vectors, documents)
+        # The first batch loads the namespace's index from disk
+        await asyncio.to_thread(keyword_indexes.add, namespace, ids, documents)
+    return upsert_both
+
+
+def hybrid_search_enabled() -> bool:
+    return os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+
+
+def _fusion_key(doc):
+    return doc.id or hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def reciprocal_rank_fusion(result_lists, k: int, rrf_k: int = None):
+    """
+    Merge ranked document lists with reciprocal rank fusion.
+
+    Every document scores sum(1 / (rrf_k + rank)) over the lists it appears
+    in (rank starts at 1); the first list's copy of a document is kept.
+
+    Returns:
+    --------
+    list : Top-k fused documents, best first
+    """
+    rrf_k = rrf_k or int(os.getenv("HYBRID_RRF_K", "60"))
+    scores = {}
+    documents = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = _fusion_key(doc)
+            documents.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    best = sorted(scores, key=lambda key: scores[key], reverse=True)[:k]
+    return [documents[key] for key in best]
+
+
+def _source_ks(k: int):
+    # Each source returns at least k, so fusion has candidates to re-rank
+    dense_k = max(k, int(os.getenv("HYBRID_DENSE_K", "4")))
+    keyword_k = max(k, int(os.getenv("HYBRID_KEYWORD_K", "4")))
+    return dense_k, keyword_k
+
+
+def _keyword_search(namespace: str, query: str, k: int, filter: dict = None):
+    return [doc for doc, _score in keyword_indexes.get(namespace).search(query, k, filter)]
+
+
+def hybrid_search(vectorstore, query: str, k: int = 2, filter: dict = None):
+    """Synchronous hybrid search: dense similarity_search, then BM25, fused with RRF."""
+    search_kwargs = {"filter": filter} if filter else {}
+    if not hybrid_search_enabled():
+        return vectorstore.similarity_search(query, k=k, **search_kwargs)
+    dense_k, keyword_k = _source_ks(k)
+    dense = vectorstore.similarity_search(query, k=dense_k, **search_kwargs)
+    keyword = _keyword_search(vectorstore._namespace or "", query, keyword_k, filter)
+    return reciprocal_rank_fusion([dense, keyword], k)
+
+
+async def ahybrid_search(vectorstore, query: str, k: int = 2, filter: dict = None):
+    """
+    Run the dense search (through the query cache) and the BM25 search
+    concurrently and fuse them with RRF. filter narrows both searches by
+    metadata, e.g. {"book_id": ...}.
+
+    The keyword search runs in a worker thread while the question is being
+    embedded and sent to the vectorstore, so it adds no serial latency.
+    Namespaces ingested before the keyword index existed fall back to the
+    dense results.
+
+    Returns:
+    --------
+    tuple : (documents, question embedding)
+    """
+    if not hybrid_search_enabled():
+        return await cached_search(vectorstore, query, k=k, filter=filter)
+
+    dense_k, keyword_k = _source_ks(k)
+    (dense, embedding), keyword = await asyncio.gather(
+        cached_search(vectorstore, query, k=dense_k, filter=filter),
+        asyncio.to_thread(_keyword_search, vectorstore._namespace or "", query, keyword_k, filter)
+    )
+    return reciprocal_rank_fusion([dense, keyword], k), embedding
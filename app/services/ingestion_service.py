@@ -0,0 +1,283 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from app.services.ragappfunction import iter_chunk_batches
+from app.utils.tokens import load_encoding, count_tokens
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class IngestionEngine:
+    """
+    Embeds chunks and upserts them to the vector store as a pipeline.
+
+    Stages:
+    1. Chunks are grouped into batches bounded by a token budget and a
+       maximum number of inputs per embedding request.
+    2. Up to `max_concurrency` embedding requests run at the same time.
+    3. Finished batches go through a small queue to an upsert worker, so
+       upserts overlap with the embeddings that are still running.
+
+    At most `max_concurrency` batches are in flight, from the start of
+    their embedding until they are upserted, so a slow vector store slows
+    the embeddings down instead of letting vectors pile up in memory.
+
+    Tunables default to the environment:
+    - INGEST_BATCH_TOKENS (default: 20000)
+    - INGEST_BATCH_SIZE (default: 256 chunks)
+    - INGEST_CONCURRENCY (default: 4 requests)
+    """
+
+    def __init__(self, embeddings, upsert, max_batch_tokens: int = None,
+                 max_batch_size: int = None, max_concurrency: int = None):
+        """
+        Parameters:
+        -----------
+        embeddings : Embeddings
+            LangChain embeddings object (must support aembed_documents)
+        upsert : async callable
+            upsert(ids, vectors, documents), writes one embedded batch
+        """
+        self.embeddings = embeddings
+        self.upsert = upsert
+        self.max_batch_tokens = max_batch_tokens or int(os.getenv("INGEST_BATCH_TOKENS", "20000"))
+        self.max_batch_size = max_batch_size or int(os.getenv("INGEST_BATCH_SIZE", "256"))
+        self.max_concurrency = max_concurrency or int(os.getenv("INGEST_CONCURRENCY", "4"))
+        self._encoding = load_encoding(getattr(embeddings, "model", None))
+
+    def count_tokens(self, text: str) -> int:
+        return count_tokens(text, self._encoding)
+
+    def batches(self, documents):
+        """
+        Group documents into token-bounded batches.
+
+        Yields (batch, token_count) tuples. A single chunk over the budget
+        gets a batch of its own instead of being dropped.
+        """
+        batch, batch_tokens = [], 0
+        for doc in documents:
+            tokens = self.count_tokens(doc.page_content)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= self.max_batch_size):
+                yield batch, batch_tokens
+                batch, batch_tokens = [], 0
+            batch.append(doc)
+            batch_tokens += tokens
+        if batch:
+            yield batch, batch_tokens
+
+    async def abatches(self, documents):
+        """batches() for either a plain iterable or an async iterable of documents."""
+        if not hasattr(documents, "__aiter__"):
+            for item in self.batches(documents):
+                yield item
+            return
+
+        batch, batch_tokens = [], 0
+        async for doc in documents:
+            tokens = self.count_tokens(doc.page_content)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= self.max_batch_size):
+                yield batch, batch_tokens
+                batch, batch_tokens = [], 0
+            batch.append(doc)
+            batch_tokens += tokens
+        if batch:
+            yield batch, batch_tokens
+
+    async def ingest(self, documents, ids=None, on_progress=None):
+        """
+        Embed and upsert the documents.
+
+        Parameters:
+        -----------
+        documents : iterable or async iterable of Document
+            Chunks to ingest, consumed lazily (see stream_chunks)
+        ids : callable, optional
+            ids(document) -> vector id; by default the document's own id,
+            or a random UUID when it has none
+        on_progress : callable, optional
+            on_progress(chunks_upserted) called after every upserted batch
+
+        Returns:
+        --------
+        dict : Throughput report (chunks, tokens, batches, seconds, chunks_per_second, tokens_per_second)
+        """
+        started = time.perf_counter()
+        make_id = ids or (lambda doc: doc.id or str(uuid.uuid4()))
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        queue = asyncio.Queue(maxsize=self.max_concurrency)
+        stats = {"chunks": 0, "tokens": 0, "batches": 0}
+        upserted = 0
+
+        async def embed(batch):
+            try:
+                vectors = await self.embeddings.aembed_documents([doc.page_content for doc in batch])
+            except BaseException:
+                semaphore.release()
+                raise
+            # The slot is released by the upserter once the batch is written
+            await queue.put((batch, vectors))
+
+        async def upsert_worker():
+            nonlocal upserted
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                batch, vectors = item
+                await self.upsert([make_id(doc) for doc in batch], vectors, batch)
+                semaphore.release()
+                upserted += len(batch)
+                if on_progress:
+                    on_progress(upserted)
+
+        async def acquire():
+            # Slots are only freed by the upserter: stop waiting if it dies
+            waiting = asyncio.ensure_future(semaphore.acquire())
+            await asyncio.wait([waiting, upserter], return_when=asyncio.FIRST_COMPLETED)
+            if not waiting.done():
+                waiting.cancel()
+                upserter.result()
+
+        upserter = asyncio.create_task(upsert_worker())
+        embedders = []
+        try:
+            async for batch, batch_tokens in self.abatches(documents):
+                # Bound the number of batches in flight (and in memory), from
+                # embedding until upserted
+                await acquire()
+                embedders.append(asyncio.create_task(embed(batch)))
+                stats["chunks"] += len(batch)
+                stats["tokens"] += batch_tokens
+                stats["batches"] += 1
+                # Surface failures early instead of after the whole book
+                for task in [t for t in embedders if t.done()]:
+                    task.result()
+                    embedders.remove(task)
+                if upserter.done():
+                    upserter.result()
+
+            # Wait for the remaining embeddings, unless the upserter dies first
+            # (embedders would otherwise block forever on the full queue)
+            embedding = asyncio.gather(*embedders)
+            await asyncio.wait([embedding, upserter], return_when=asyncio.FIRST_COMPLETED)
+            if upserter.done():
+                upserter.result()
+            await embedding
+            await queue.put(None)
+            await upserter
+        except BaseException:
+            for task in embedders + [upserter]:
+                task.cancel()
+            raise
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 3)
+        stats["chunks_per_second"] = round(stats["chunks"] / elapsed, 2) if elapsed else 0.0
+        stats["tokens_per_second"] = round(stats["tokens"] / elapsed, 2) if elapsed else 0.0
+        if hasattr(self.embeddings, "cache"):
+            stats["embedding_cache"] = self.embeddings.cache.stats()
+
+        print(f"[INFO] Ingested {stats['chunks']} chunks ({stats['tokens']} tokens) in {stats['batches']} batches, "
+              f"{stats['seconds']}s - {stats['chunks_per_second']} chunks/s, {stats['tokens_per_second']} tokens/s")
+        return stats
+
+
+async def iterate_in_thread(iterator, max_buffered: int = 4):
+    """
+    Consume a blocking iterator in a worker thread and yield its items here.
+
+    At most max_buffered items wait in between, so a slow consumer slows the
+    producer down instead of letting items pile up in memory.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=max_buffered)
+    stop = threading.Event()
+
+    def put(item):
+        # Wait for room in the queue, but give up once the consumer is gone
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return True
+            except FutureTimeout:
+                if stop.is_set():
+                    future.cancel()
+                    return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put(("item", item)):
+                    return
+            put(("done", None))
+        except BaseException as e:
+            put(("error", e))
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == "done":
+                break
+            if kind == "error":
+                raise value
+            yield value
+        await producer
+    finally:
+        # Consumer stopped early (error or cancellation): let the thread wind down
+        stop.set()
+
+
+async def with_metadata(documents, **metadata):
+    """
+    Async stream of the documents (plain or async iterable) with the given
+    metadata keys set on each, e.g. with_metadata(chunks, book_id=...).
+    """
+    if hasattr(documents, "__aiter__"):
+        async for doc in documents:
+            doc.metadata.update(metadata)
+            yield doc
+        return
+    for doc in documents:
+        doc.metadata.update(metadata)
+        yield doc
+
+
+async def with_ids(documents, make_id):
+    """
+    Async stream of the documents (plain or async iterable) with doc.id set
+    to make_id(doc), called in document order.
+    """
+    # with_metadata() without keys only turns a plain iterable into an async stream
+    async for doc in with_metadata(documents):
+        doc.id = make_id(doc)
+        yield doc
+
+
+async def stream_chunks(pages, chunk_size: int = 400, chunk_overlap: int = 50, batch_size: int = 64, on_page=None):
+    """
+    Turn a blocking page iterator into an async stream of chunks.
+
+    Pages are parsed and split in a worker thread, in batches of at most
+    batch_size chunks, so peak memory depends on the batch size and not on
+    the size of the book. on_page(pages_seen) is called for every page.
+    """
+    def counted(pages):
+        for seen, page in enumerate(pages, start=1):
+            if on_page:
+                on_page(seen)
+            yield page
+
+    async for batch in iterate_in_thread(iter_chunk_batches(counted(pages), chunk_size, chunk_overlap, batch_size)):
+        for chunk in batch:
+            yield chunk
+
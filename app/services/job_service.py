@@ -0,0 +1,170 @@
+import os
+import uuid
+import asyncio
+import contextvars
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _now():
+    return datetime.datetime.now().isoformat()
+
+
+class Job:
+    """
+    A background job made of named stages.
+
+    Each stage moves from "pending" to "running" to "completed" (or "failed")
+    and carries a 0..1 progress value plus an optional detail string, which is
+    what /api/books/jobs/{job_id} reports back to the client.
+    """
+
+    def __init__(self, kind: str, stages):
+        self.job_id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = "queued"
+        self.stages = {
+            name: {"name": name, "status": "pending", "progress": 0.0, "detail": None}
+            for name in stages
+        }
+        self.result = None
+        self.error = None
+        self.created_at = _now()
+        self.updated_at = self.created_at
+
+    def start_stage(self, name: str, detail: str = None):
+        self.stages[name].update(status="running", detail=detail)
+        self.updated_at = _now()
+
+    def update_stage(self, name: str, progress: float, detail: str = None):
+        stage = self.stages[name]
+        stage["progress"] = round(min(max(progress, 0.0), 1.0), 4)
+        if detail is not None:
+            stage["detail"] = detail
+        self.updated_at = _now()
+
+    def complete_stage(self, name: str, detail: str = None):
+        self.stages[name].update(status="completed", progress=1.0)
+        if detail is not None:
+            self.stages[name]["detail"] = detail
+        self.updated_at = _now()
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "stages": list(self.stages.values()),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+class JobManager:
+    """
+    Runs jobs in the background of the API process.
+
+    Network stages run as asyncio tasks on the server's event loop, with at
+    most JOB_CONCURRENCY jobs active at once (default: 2). CPU-heavy work such
+    as PDF parsing goes to a process pool of JOB_PROCESS_WORKERS processes
+    (default: CPU count) through run_in_process.
+
+    Jobs are kept in memory, the most recent JOB_HISTORY_SIZE (default: 500)
+    are retained for status polling.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.max_history = int(os.getenv("JOB_HISTORY_SIZE", "500"))
+        self.max_concurrency = int(os.getenv("JOB_CONCURRENCY", "2"))
+        self.process_workers = int(os.getenv("JOB_PROCESS_WORKERS", "0")) or None
+        self._semaphore = None
+        self._process_pool = None
+        self._tasks = set()
+
+    def submit(self, kind: str, stages, run):
+        """
+        Register a job and start it in the background.
+
+        Parameters:
+        -----------
+        kind : str
+            Job type, e.g. "book_ingestion"
+        stages : list of str
+            Stage names in execution order
+        run : callable
+            async run(job) -> dict, the job body; its return value becomes job.result
+
+        Returns:
+        --------
+        Job : The queued job
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        job = Job(kind, stages)
+        self.jobs[job.job_id] = job
+        self._trim_history()
+
+        # A fresh context, so the job does not share the unit of work of the
+        # request that queued it (app/database/unit_of_work.py)
+        task = asyncio.create_task(self._run(job, run), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job, run):
+        async with self._semaphore:
+            job.status = "running"
+            job.updated_at = _now()
+            try:
+                job.result = await run(job)
+                job.status = "completed"
+            except Exception as e:
+                print(f"[ERROR] Job {job.job_id} ({job.kind}) failed: {e}")
+                job.status = "failed"
+                job.error = str(e)
+                for stage in job.stages.values():
+                    if stage["status"] == "running":
+                        stage["status"] = "failed"
+            job.updated_at = _now()
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    @property
+    def process_pool(self):
+        """The shared process pool for CPU-bound job work, created on first use."""
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._process_pool
+
+    async def run_in_process(self, fn, *args):
+        """Run a picklable, CPU-bound function in the process pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.process_pool, fn, *args)
+
+    def _trim_history(self):
+        # Drop the oldest finished jobs once over the retention limit
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ("completed", "failed")]
+        while len(self.jobs) > self.max_history and finished:
+            self.jobs.pop(finished.pop(0), None)
+
+    async def shutdown(self):
+        """Cancel running jobs and stop the process pool."""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(cancel_futures=True)
+            self._process_pool = None
+        self._semaphore = None
+
+
+job_manager = JobManager()
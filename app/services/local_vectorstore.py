@@ -0,0 +1,484 @@
+import os
+import re
+import json
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from app.utils.file_lock import file_lock
+
+load_dotenv()
+
+# Below this many vectors an exact scan is faster than probing an IVF index
+IVF_MIN_VECTORS = 4096
+
+# k-means iterations used to train the IVF centroids
+IVF_TRAIN_ITERATIONS = 10
+
+
+def vector_backend() -> str:
+    """Configured vector backend, "pinecone" (default) or "local" (VECTOR_BACKEND)."""
+    return os.getenv("VECTOR_BACKEND", "pinecone").lower()
+
+
+def local_vector_path() -> str:
+    return os.getenv("LOCAL_VECTOR_PATH", "cache/vectors")
+
+
+def _unit_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalVectorStore(VectorStore):
+    """
+    One namespace of the in-process vector backend.
+
+    Vectors are kept unit-normalized under LOCAL_VECTOR_PATH/<namespace>/ as
+    raw float32 rows appended to `vectors.f32` (memory-mapped for search),
+    and every upsert or delete is appended as a JSON line to
+    `records.jsonl`, so a write costs the size of the batch rather than of
+    the namespace. Rows that were overwritten or deleted are dropped by a
+    compaction once they outnumber the live ones. Search is cosine
+    similarity, the metric of the Pinecone index, so scores and rankings
+    match.
+
+    Several stores may have the same namespace open (worker processes, the
+    backend's LRU and stores built outside of it): writes hold an exclusive
+    lock on the namespace's `.lock` file and first replay what the others
+    appended, and reads replay new log lines before searching.
+
+    With LOCAL_VECTOR_INDEX=ivf, namespaces of IVF_MIN_VECTORS or more are
+    searched through an inverted-file index (k-means centroids, probing the
+    LOCAL_VECTOR_NPROBE closest lists) built on first search after a write.
+    """
+
+    def __init__(self, embedding, namespace: str = "", path: str = None, index_type: str = None, nprobe: int = None):
+        self._embedding = embedding
+        self._namespace = namespace
+        self._text_key = "text"
+        self.index_type = (index_type or os.getenv("LOCAL_VECTOR_INDEX", "flat")).lower()
+        self.nprobe = nprobe or int(os.getenv("LOCAL_VECTOR_NPROBE", "8"))
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", namespace) or "_default"
+        self.folder = os.path.join(path or local_vector_path(), safe_name)
+        self._lock = threading.RLock()
+        self._reset()
+        if os.path.exists(self._path("records.json")) and not os.path.exists(self._path("records.jsonl")):
+            with file_lock(self._path(".lock")):
+                self._migrate()
+        with self._lock:
+            self._current()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._live)
+
+    # ==================== STORAGE ====================
+
+    def _path(self, name):
+        return os.path.join(self.folder, name)
+
+    def _reset(self):
+        self._live = {}           # id -> (row in vectors.f32, text, metadata)
+        self._dimension = 0
+        self._mapped = None       # memory map of vectors.f32
+        self._mapped_rows = 0
+        self._log_state = None    # (inode, bytes replayed) of records.jsonl
+        self._log_entries = 0
+        self._stale = True        # the arrays below need rebuilding
+        self._ids, self._texts, self._metadatas, self._positions = [], [], [], {}
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._ivf = None
+
+    def _log_stat(self):
+        try:
+            stat = os.stat(self._path("records.jsonl"))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size)
+
+    def _refresh(self):
+        """Catch up with writes made through other stores of this namespace."""
+        stat = self._log_stat()
+        if stat is not None and stat != self._log_state:
+            # Shared lock, so a compaction is never seen half done
+            with file_lock(self._path(".lock"), shared=True):
+                self._replay()
+
+    def _replay(self):
+        """Apply the log lines this store has not seen yet (hold the file lock)."""
+        stat = self._log_stat()
+        if stat is None:
+            if self._log_state is not None:
+                self._reset()
+            return
+        inode, size = stat
+        if self._log_state is None or self._log_state[0] != inode or size < self._log_state[1]:
+            # First load, or compacted by another store: start over
+            self._reset()
+            with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+                self._dimension = json.load(f)["dimension"]
+            self._log_state = (inode, 0)
+
+        offset = self._log_state[1]
+        if size == offset:
+            return
+        with open(self._path("records.jsonl"), "rb") as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        # A line still being written is picked up next time
+        data = data[:data.rfind(b"\n") + 1]
+        for line in data.splitlines():
+            record = json.loads(line)
+            if record.get("deleted"):
+                self._live.pop(record["id"], None)
+            else:
+                # Re-inserted at the end, so the live ids stay in row order
+                self._live.pop(record["id"], None)
+                self._live[record["id"]] = (record["row"], record["text"], record["metadata"])
+            self._log_entries += 1
+        self._log_state = (inode, offset + len(data))
+        self._stale = True
+
+    def _map_vectors(self, rows):
+        if rows > self._mapped_rows:
+            self._mapped = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(rows, self._dimension))
+            self._mapped_rows = rows
+
+    def _current(self):
+        """Refresh, then rebuild the search arrays if anything changed (hold self._lock)."""
+        self._refresh()
+        if not self._stale:
+            return
+        rows = np.fromiter((row for row, _text, _metadata in self._live.values()), dtype=np.int64, count=len(self._live))
+        if len(rows):
+            self._map_vectors(int(rows.max()) + 1)
+            # Without dead rows in front, search straight from the memory map
+            contiguous = bool(np.array_equal(rows, np.arange(len(rows))))
+            self._vectors = self._mapped[:len(rows)] if contiguous else np.asarray(self._mapped[rows])
+        else:
+            self._vectors = np.zeros((0, self._dimension), dtype=np.float32)
+        self._ids = list(self._live)
+        self._texts = [text for _row, text, _metadata in self._live.values()]
+        self._metadatas = [metadata for _row, _text, metadata in self._live.values()]
+        self._positions = {vector_id: position for position, vector_id in enumerate(self._ids)}
+        self._ivf = None
+        self._stale = False
+
+    def _append(self, vectors, records):
+        """Append rows and their log lines, then replay them (hold both locks)."""
+        os.makedirs(self.folder, exist_ok=True)
+        if not os.path.exists(self._path("meta.json")):
+            with open(self._path("meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"dimension": self._dimension}, f)
+        if vectors is not None and len(vectors):
+            if os.path.exists(self._path("vectors.f32")):
+                # Drop a partial row left by a writer that died mid-append
+                os.truncate(self._path("vectors.f32"), self._file_rows() * 4 * self._dimension)
+            with open(self._path("vectors.f32"), "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        # Rows first, so a reader never sees a record before its vector
+        with open(self._path("records.jsonl"), "ab") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records).encode("utf-8"))
+        self._replay()
+
+    def _file_rows(self):
+        size = os.path.getsize(self._path("vectors.f32")) if os.path.exists(self._path("vectors.f32")) else 0
+        return size // (4 * self._dimension) if self._dimension else 0
+
+    def _compact(self):
+        """
+        Rewrite both files with only the live rows once the dead rows or log
+        lines outnumber them (hold both locks). Amortized, each write pays
+        for the compaction at most once.
+        """
+        live = len(self._live)
+        if self._file_rows() - live <= live and self._log_entries - live <= live:
+            return
+        rows = [row for row, _text, _metadata in self._live.values()]
+        if rows:
+            self._map_vectors(max(rows) + 1)
+        # Write beside and swap in, so readers never see half a file
+        with open(self._path("vectors.f32.tmp"), "wb") as f:
+            for start in range(0, len(rows), 4096):
+                f.write(np.ascontiguousarray(self._mapped[rows[start:start + 4096]]).tobytes())
+        with open(self._path("records.jsonl.tmp"), "wb") as f:
+            for position, (vector_id, (_row, text, metadata)) in enumerate(self._live.items()):
+                record = {"id": vector_id, "row": position, "text": text, "metadata": metadata}
+                f.write((json.dumps(record) + "\n").encode("utf-8"))
+        os.replace(self._path("vectors.f32.tmp"), self._path("vectors.f32"))
+        os.replace(self._path("records.jsonl.tmp"), self._path("records.jsonl"))
+        self._reset()
+        self._replay()
+
+    def _migrate(self):
+        # Namespaces saved as vectors.npy + records.json by earlier versions
+        if os.path.exists(self._path("records.jsonl")):
+            return
+        vectors = np.load(self._path("vectors.npy"))
+        with open(self._path("records.json"), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        with open(self._path("meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"dimension": int(vectors.shape[1]) if vectors.ndim == 2 else 0}, f)
+        with open(self._path("vectors.f32"), "wb") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self._path("records.jsonl"), "wb") as f:
+            for row, record in enumerate(records):
+                f.write((json.dumps({**record, "row": row}) + "\n").encode("utf-8"))
+        os.remove(self._path("vectors.npy"))
+        os.remove(self._path("records.json"))
+
+    def list_ids(self, prefix: str = "", filter: dict = None):
+        """Ids of the stored vectors starting with prefix, and matching filter if given."""
+        with self._lock:
+            self._current()
+            rows = self._filter_rows(filter) if filter else range(len(self._ids))
+            return [self._ids[row] for row in rows if self._ids[row].startswith(prefix)]
+
+    def count_missing(self, key: str) -> int:
+        """Number of stored vectors whose metadata has no key."""
+        with self._lock:
+            self._current()
+            return sum(1 for metadata in self._metadatas if key not in metadata)
+
+    # ==================== WRITES ====================
+
+    def upsert_vectors(self, ids, vectors, documents):
+        """
+        Insert or replace pre-computed vectors, the local counterpart of an
+        Index.upsert. A replaced id keeps only its latest row.
+        """
+        new_ids = list(ids)
+        new_vectors = _unit_rows(np.asarray(vectors, dtype=np.float32).reshape(len(new_ids), -1))
+        # Repeated within this call, the last one wins
+        latest = {}
+        for row, (vector_id, doc) in enumerate(zip(new_ids, documents)):
+            latest.pop(vector_id, None)
+            latest[vector_id] = (row, doc)
+
+        with self._lock, file_lock(self._path(".lock")):
+            self._replay()
+            if self._live and self._dimension != new_vectors.shape[1]:
+                raise ValueError(
+                    f"Vector dimension {new_vectors.shape[1]} does not match namespace "
+                    f"{self._namespace} ({self._dimension})"
+                )
+            if not self._live and self._dimension != new_vectors.shape[1]:
+                # Empty namespace, possibly emptied of another dimension: start a fresh file
+                self._start(new_vectors.shape[1])
+
+            first_row = self._file_rows()
+            records = []
+            for offset, (vector_id, (_row, doc)) in enumerate(latest.items()):
+                metadata = {key: value for key, value in (doc.metadata or {}).items() if value is not None}
+                records.append({"id": vector_id, "row": first_row + offset, "text": doc.page_content, "metadata": metadata})
+            self._append(new_vectors[[row for row, _doc in latest.values()]], records)
+            self._compact()
+        return new_ids
+
+    def _start(self, dimension):
+        """Drop the files of an empty namespace and start over with dimension (hold both locks)."""
+        for name in ("records.jsonl", "vectors.f32", "meta.json"):
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+        self._reset()
+        self._dimension = dimension
+
+    async def aupsert_vectors(self, ids, vectors, documents):
+        return await asyncio.to_thread(self.upsert_vectors, ids, vectors, documents)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        documents = [Document(page_content=text, metadata=metadata or {})
+                     for text, metadata in zip(texts, metadatas or [{}] * len(texts))]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in documents]
+        return self.upsert_vectors(ids, self._embedding.embed_documents(texts), documents)
+
+    async def aadd_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        documents = [Document(page_content=text, metadata=metadata or {})
+                     for text, metadata in zip(texts, metadatas or [{}] * len(texts))]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in documents]
+        vectors = await self._embedding.aembed_documents(texts)
+        return await self.aupsert_vectors(ids, vectors, documents)
+
+    def delete(self, ids=None, filter: dict = None, delete_all: bool = None, **kwargs):
+        """
+        Delete vectors by id, by metadata (every key of filter must be equal)
+        or all of them. Returns the number of vectors removed.
+        """
+        with self._lock, file_lock(self._path(".lock")):
+            self._replay()
+            remove = set()
+            if delete_all:
+                remove = set(self._live)
+            if ids:
+                remove.update(vector_id for vector_id in ids if vector_id in self._live)
+            if filter:
+                remove.update(
+                    vector_id for vector_id, (_row, _text, metadata) in self._live.items()
+                    if all(metadata.get(key) == value for key, value in filter.items())
+                )
+            if not remove:
+                return 0
+
+            self._append(None, [{"id": vector_id, "deleted": True} for vector_id in remove])
+            self._compact()
+            return len(remove)
+
+    async def adelete(self, ids=None, filter: dict = None, delete_all: bool = None, **kwargs):
+        return await asyncio.to_thread(self.delete, ids=ids, filter=filter, delete_all=delete_all)
+
+    # ==================== SEARCH ====================
+
+    def _filter_rows(self, filter: dict):
+        return [
+            row for row, metadata in enumerate(self._metadatas)
+            if all(metadata.get(key) == value for key, value in filter.items())
+        ]
+
+    def _train_ivf(self):
+        count = len(self._ids)
+        lists = max(1, int(np.sqrt(count)))
+        generator = np.random.default_rng(0)
+        centroids = np.array(self._vectors[generator.choice(count, size=lists, replace=False)])
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            assignment = np.argmax(self._vectors @ centroids.T, axis=1)
+            for cluster in range(lists):
+                members = self._vectors[assignment == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            centroids = _unit_rows(centroids)
+        assignment = np.argmax(self._vectors @ centroids.T, axis=1)
+        self._ivf = (centroids, [np.flatnonzero(assignment == cluster) for cluster in range(lists)])
+
+    def _candidates(self, query):
+        """Rows worth scoring for query, None for all of them."""
+        if self.index_type != "ivf" or len(self._ids) < IVF_MIN_VECTORS:
+            return None
+        if self._ivf is None:
+            self._train_ivf()
+        centroids, lists = self._ivf
+        probes = np.argsort(centroids @ query)[::-1][:self.nprobe]
+        return np.concatenate([lists[cluster] for cluster in probes])
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4, filter: dict = None, **kwargs):
+        with self._lock:
+            self._current()
+            if not self._ids:
+                return []
+            query = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            query = query / norm if norm else query
+
+            rows = self._candidates(query)
+            if filter:
+                allowed = np.asarray(self._filter_rows(filter), dtype=np.int64)
+                rows = allowed if rows is None else np.intersect1d(rows, allowed)
+            if rows is not None and len(rows) == 0:
+                return []
+
+            scores = (self._vectors if rows is None else self._vectors[rows]) @ query
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            results = []
+            for position in top:
+                row = int(position if rows is None else rows[position])
+                results.append((
+                    Document(id=self._ids[row], page_content=self._texts[row], metadata=dict(self._metadatas[row])),
+                    float(scores[position])
+                ))
+            return results
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter: dict = None, **kwargs):
+        return [doc for doc, _score in self.similarity_search_with_score_by_vector(embedding, k=k, filter=filter)]
+
+    async def asimilarity_search_by_vector(self, embedding, k: int = 4, filter: dict = None, **kwargs):
+        # A large namespace's scan, or the IVF training on the first search
+        # after a write, would block the event loop
+        return await asyncio.to_thread(self.similarity_search_by_vector, embedding, k=k, filter=filter)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k=k, filter=filter)
+
+    async def asimilarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        embedding = await self._embedding.aembed_query(query)
+        return await self.asimilarity_search_by_vector(embedding, k=k, filter=filter)
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, namespace: str = "", path: str = None, **kwargs):
+        store = cls(embedding, namespace=namespace, path=path)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+class LocalVectorBackend:
+    """
+    Drop-in for VectorStorePool when VECTOR_BACKEND=local.
+
+    Keeps up to VECTORSTORE_CACHE_SIZE (default: 256) namespaces open, least
+    recently used first out; evicting one only drops its memory map.
+    """
+
+    def __init__(self, embeddings, path: str = None, max_size: int = None):
+        self.embeddings = embeddings
+        self.path = path or local_vector_path()
+        self.max_size = max_size or int(os.getenv("VECTORSTORE_CACHE_SIZE", "256"))
+        # No shared Pinecone Index, upserts go through the store itself
+        self.index = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stores = OrderedDict()
+
+    async def connect(self):
+        os.makedirs(self.path, exist_ok=True)
+
+    async def get(self, namespace: str) -> LocalVectorStore:
+        store = self._stores.get(namespace)
+        if store is not None:
+            self._stores.move_to_end(namespace)
+            self.hits += 1
+            return store
+
+        self.misses += 1
+        store = await asyncio.to_thread(LocalVectorStore, self.embeddings, namespace, self.path)
+        self._stores[namespace] = store
+        while len(self._stores) > self.max_size:
+            self._stores.popitem(last=False)
+            self.evictions += 1
+        return store
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "local",
+            "namespaces": len(self._stores),
+            "vectors": sum(len(store) for store in self._stores.values()),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    async def close(self):
+        self._stores.clear()
@@ -1,18 +1,23 @@
 import os
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 from app.services import ragappfunction
-from app.database.chats_repo import chatsRepo
+from app.database.chats_repo import chatsRepo, AsyncChatsRepo
+from app.services.answer_cache import answer_cache, answer_cache_enabled
+from app.services.history_service import HistoryManager
 
 load_dotenv()
 
+SYSTEM_PROMPT = "You are a helpful assistant. Answer questions based only on the provided context. If the answer is not in the context, say so.; If the User asks another topic or question, then don't worry about the context"
+CHAT_MODEL = "gpt-4o"
+
 class OpenAIResponse:
     def __init__(self):
         self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.messages = [
             {
                 "role": "system",
-                "content": "You are a helpful assistant. Answer questions based only on the provided context. If the answer is not in the context, say so.; If the User asks another topic or question, then don't worry about the context"
+                "content": SYSTEM_PROMPT
             }
         ]
         self.chats_repo = chatsRepo()
@@ -30,7 +35,7 @@ class OpenAIResponse:
 
         def answer(messages):
             response = self.client.chat.completions.create(
-                model="gpt-4o",
+                model=CHAT_MODEL,
                 temperature=0.5,
                 messages=messages)
             return response.choices[0].message.content
@@ -61,7 +66,7 @@ class OpenAIResponse:
 
         def answer(messages):
             response = self.client.chat.completions.create(
-                model="gpt-4o",
+                model=CHAT_MODEL,
                 temperature=0.5,
                 messages=messages)
             return response.choices[0].message.content
@@ -84,3 +89,147 @@ class OpenAIResponse:
             self.messages.append({"role": "user", "content": f"Context::\n{docsearch}\n\nQuestion: {question}"})
             result = answer(self.messages)
             return result
+
+
+class AsyncOpenAIResponse:
+    """
+    Async variant of OpenAIResponse.
+
+    Retrieval and completion are awaited instead of blocking the event loop,
+    and the message list is built per call so one instance can serve many turns.
+    """
+    def __init__(self, chats_repo: AsyncChatsRepo = None, client: AsyncOpenAI = None):
+        self.client = client or AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.chats_repo = chats_repo
+
+    @staticmethod
+    def _system_messages():
+        return [{"role": "system", "content": SYSTEM_PROMPT}]
+
+    async def _retrieve_context(self, query_ans, pinconevectorstore, book_id=None):
+        """
+        Retrieve the context documents and the question embedding, (None, None) on failure.
+
+        With book_id only that book's chunks are searched.
+        """
+        try:
+            docsearch, embedding = await ragappfunction.aretrive_query_with_embedding(
+                vectorstore=pinconevectorstore, query=query_ans, book_id=book_id
+            )
+            if docsearch:
+                print(f"[DEBUG] Retrieved {len(docsearch)} document(s) from vectorstore")
+            else:
+                print("[DEBUG] No documents retrieved from vectorstore")
+            return docsearch, embedding
+        except Exception as e:
+            # If vectorstore query fails, proceed without context
+            print(f"\n[WARNING] Could not retrieve context from vectorstore: {str(e)}")
+            print("[INFO] Proceeding without book context - AI will use general knowledge only")
+            return None, None
+
+    @staticmethod
+    def _question_message(docsearch, query_ans):
+        return {"role": "user", "content": f"Context::\n{docsearch}\n\nQuestion: {query_ans}"}
+
+    async def _retrive_ans(self, messages, query_ans, pinconevectorstore, book_id=None):
+        docsearch, _embedding = await self._retrieve_context(query_ans, pinconevectorstore, book_id)
+        messages.append(self._question_message(docsearch, query_ans))
+        return messages
+
+    @staticmethod
+    def _cacheable(use_cache, docsearch, embedding):
+        # Only answers grounded in retrieved context are cached
+        return use_cache and answer_cache_enabled() and bool(docsearch) and embedding is not None
+
+    async def _answer(self, messages):
+        response = await self.client.chat.completions.create(
+            model=CHAT_MODEL,
+            temperature=0.5,
+            messages=messages)
+        return response.choices[0].message.content
+
+    async def _stream_answer(self, messages):
+        """Yield the completion's content deltas as they arrive."""
+        stream = await self.client.chat.completions.create(
+            model=CHAT_MODEL,
+            temperature=0.5,
+            messages=messages,
+            stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def _continue_chat_messages(self, chat_id, question, pinconevectorstore, chat_data, book_id=None):
+        if self.chats_repo is None:
+            self.chats_repo = await AsyncChatsRepo.create()
+        if chat_data is None:
+            chat_data = await self.chats_repo.get_chat_by_id(chat_id=chat_id)
+
+        # Recent turns verbatim, older ones summarized, within the token budget
+        history = HistoryManager(self.client, self.chats_repo, model=CHAT_MODEL)
+        messages = self._system_messages() + await history.build(chat_id, chat_data)
+
+        return await self._retrive_ans(messages, question, pinconevectorstore, book_id)
+
+    async def new_chat(self, question=None, pinconevectorstore=None, use_cache=True, book_id=None):
+        """
+        Answer the first question of a chat.
+
+        With SEMANTIC_CACHE_ENABLED, a semantically identical question over the
+        same retrieved context reuses the cached answer instead of a completion.
+        use_cache=False bypasses the cache (it is neither read nor written).
+        book_id limits retrieval to one of the user's books.
+        """
+        docsearch, embedding = await self._retrieve_context(question, pinconevectorstore, book_id)
+        cacheable = self._cacheable(use_cache, docsearch, embedding)
+        namespace = getattr(pinconevectorstore, "_namespace", None) or ""
+        if cacheable:
+            cached = answer_cache.get(namespace, embedding, docsearch)
+            if cached is not None:
+                print("[DEBUG] Answer served from the semantic cache")
+                return cached
+
+        result = await self._answer(self._system_messages() + [self._question_message(docsearch, question)])
+        if cacheable and result:
+            answer_cache.put(namespace, embedding, docsearch, result)
+        return result
+
+    async def continue_chat(self, chat_id=None, question=None, pinconevectorstore=None, chat_data=None, book_id=None):
+        """
+        Answer a follow-up question with the chat's stored history.
+
+        chat_data can be passed in when the caller already loaded the chat row.
+        book_id limits retrieval to one of the user's books.
+        """
+        messages = await self._continue_chat_messages(chat_id, question, pinconevectorstore, chat_data, book_id)
+        return await self._answer(messages)
+
+    async def stream_new_chat(self, question=None, pinconevectorstore=None, use_cache=True, book_id=None):
+        """
+        Streaming version of new_chat, yields the answer token by token.
+
+        A semantic cache hit is yielded as a single token.
+        """
+        docsearch, embedding = await self._retrieve_context(question, pinconevectorstore, book_id)
+        cacheable = self._cacheable(use_cache, docsearch, embedding)
+        namespace = getattr(pinconevectorstore, "_namespace", None) or ""
+        if cacheable:
+            cached = answer_cache.get(namespace, embedding, docsearch)
+            if cached is not None:
+                print("[DEBUG] Answer served from the semantic cache")
+                yield cached
+                return
+
+        parts = []
+        messages = self._system_messages() + [self._question_message(docsearch, question)]
+        async for token in self._stream_answer(messages):
+            parts.append(token)
+            yield token
+        if cacheable and parts:
+            answer_cache.put(namespace, embedding, docsearch, "".join(parts))
+
+    async def stream_continue_chat(self, chat_id=None, question=None, pinconevectorstore=None, chat_data=None, book_id=None):
+        """Streaming version of continue_chat, yields the answer token by token."""
+        messages = await self._continue_chat_messages(chat_id, question, pinconevectorstore, chat_data, book_id)
+        async for token in self._stream_answer(messages):
+            yield token
@@ -1,18 +1,289 @@
-from app.services.ragappfunction import vectorstore, read_doc, chunks
+from app.services.ragappfunction import vectorstore, read_doc, chunks, iter_pdf_pages
 import os
+import asyncio
+import hashlib
+from collections import Counter, OrderedDict
 from dotenv import load_dotenv
+from pinecone import Pinecone
 from langchain_openai import OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
-from app.database.books_repo import BooksRepository
+from app.database.books_repo import BooksRepository, AsyncBooksRepository
+from app.services.ingestion_service import IngestionEngine, stream_chunks, with_metadata, with_ids
+from app.services.embedding_cache import with_embedding_cache
+from app.services.query_cache import query_cache
+from app.services.hybrid_search import keyword_indexes, keyword_upserter
+from app.services.local_vectorstore import LocalVectorStore, vector_backend
+from app.services.job_service import job_manager
 
 load_dotenv()
+
+INDEX_NAME = "langchaintest2"
+
+# Vectors per Pinecone upsert request (keeps requests under the 2MB limit)
+UPSERT_BATCH_SIZE = 100
+
+# Ids per Pinecone delete request (the API limit)
+DELETE_BATCH_SIZE = 1000
+
+# Most matches one Pinecone query returns (the API limit)
+QUERY_ID_LIMIT = 10000
+
+
+def book_vector_prefix(book_id: str) -> str:
+    return f"{book_id}#"
+
+
+def book_vector_ids(book_id: str):
+    """
+    Deterministic vector ids for a book's chunks: "{book_id}#{chunk hash}".
+
+    The hash covers the chunk's page and text, so re-chunking a book with the
+    same parameters yields the same ids, and the book prefix lets its vectors
+    be listed for re-indexing and deletion. Returns a stateful make_id(doc);
+    call it on the chunks in document order, since a chunk repeated on the
+    same page gets a "-2", "-3"... suffix.
+    """
+    prefix = book_vector_prefix(book_id)
+    seen = Counter()
+
+    def make_id(doc):
+        digest = hashlib.sha256(f"{doc.metadata.get('page')}\0{doc.page_content}".encode("utf-8")).hexdigest()[:32]
+        seen[digest] += 1
+        return f"{prefix}{digest}" if seen[digest] == 1 else f"{prefix}{digest}-{seen[digest]}"
+    return make_id
+
+
+def list_by_prefix(index, namespace: str, prefix: str):
+    """Ids of every vector whose id starts with prefix. Blocking, run it in a worker thread."""
+    return [vector_id for page in index.list(prefix=prefix, namespace=namespace) for vector_id in page]
+
+
+def delete_ids(index, namespace: str, ids, on_progress=None):
+    """
+    Delete vectors by id, DELETE_BATCH_SIZE ids per request. Blocking, run
+    it in a worker thread. on_progress(deleted, total) follows every batch.
+    """
+    ids = list(ids)
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        index.delete(ids=ids[start:start + DELETE_BATCH_SIZE], namespace=namespace)
+        if on_progress:
+            on_progress(min(start + DELETE_BATCH_SIZE, len(ids)), len(ids))
+    return len(ids)
+
+
+def delete_by_prefix(index, namespace: str, prefix: str, on_progress=None):
+    """
+    Delete every vector whose id starts with prefix, see delete_ids.
+
+    Returns:
+    --------
+    int : Number of vectors deleted
+    """
+    # List everything first, deleting while paginating could skip ids
+    return delete_ids(index, namespace, list_by_prefix(index, namespace, prefix), on_progress)
+
+
+def query_ids(index, namespace: str, metadata_filter: dict):
+    """
+    Ids of up to QUERY_ID_LIMIT vectors matching a metadata filter. Blocking,
+    run it in a worker thread.
+
+    Serverless indexes cannot delete by metadata and pod-based ones cannot
+    list ids, but both answer a filtered query.
+    """
+    dimension = index.describe_index_stats().dimension
+    # Any non-zero vector will do, only the filter matters
+    probe = [1.0] + [0.0] * (dimension - 1)
+    response = index.query(
+        vector=probe,
+        top_k=QUERY_ID_LIMIT,
+        filter=metadata_filter,
+        namespace=namespace,
+        include_values=False,
+        include_metadata=False
+    )
+    return [match.id for match in response.matches]
+
+
+def list_book_vectors(index, namespace: str, book_id: str):
+    """
+    Ids of a book's vectors. Blocking, run it in a worker thread.
+
+    Ids with the book's prefix are listed where the index supports it
+    (serverless). Vectors ingested before ids were deterministic carry random
+    ids and are only tagged with the book_id, so they are found with a
+    filtered query, as is everything on pod-based indexes, which cannot list.
+
+    Returns:
+    --------
+    tuple : (prefixed ids, legacy ids, whether the index can list ids)
+    """
+    prefix = book_vector_prefix(book_id)
+    try:
+        prefixed = list_by_prefix(index, namespace, prefix)
+        listable = True
+    except Exception as e:
+        print(f"[INFO] Index cannot list vector ids, finding book {book_id} by metadata: {e}")
+        prefixed, listable = None, False
+
+    tagged = query_ids(index, namespace, {"book_id": {"$eq": book_id}})
+    if len(tagged) >= QUERY_ID_LIMIT:
+        print(f"[WARNING] Book {book_id} has over {QUERY_ID_LIMIT} tagged vectors, older ones past that were not found")
+    if prefixed is None:
+        prefixed = [vector_id for vector_id in tagged if vector_id.startswith(prefix)]
+    known = set(prefixed)
+    legacy = [vector_id for vector_id in tagged if vector_id not in known]
+    return prefixed, legacy, listable
+
+
+def count_untagged(index, namespace: str):
+    """Number of vectors (up to QUERY_ID_LIMIT) without a book_id. Blocking."""
+    return len(query_ids(index, namespace, {"book_id": {"$exists": False}}))
+
+
+def delete_book(index, namespace: str, book_id: str, on_progress=None):
+    """
+    Delete every vector of a book, see list_book_vectors. Blocking, run it
+    in a worker thread.
+
+    Vectors ingested before chunks were tagged with their book_id cannot be
+    attributed to a book; they are left in place and counted.
+
+    Returns:
+    --------
+    dict : deleted (vectors removed) and untagged (vectors without a book_id left in the namespace)
+    """
+    prefixed, legacy, listable = list_book_vectors(index, namespace, book_id)
+    if listable:
+        deleted = delete_ids(index, namespace, prefixed + legacy, on_progress)
+    else:
+        # Pod-based indexes delete by metadata, without the query's limit
+        index.delete(filter={"book_id": {"$eq": book_id}}, namespace=namespace)
+        deleted = len(prefixed) + len(legacy)
+        if on_progress and deleted:
+            on_progress(deleted, deleted)
+
+    untagged = count_untagged(index, namespace)
+    if untagged:
+        print(f"[WARNING] {untagged} vectors in namespace {namespace} have no book_id and were not deleted "
+              f"with book {book_id}")
+    return {"deleted": deleted, "untagged": untagged}
+
+
+def vector_upserter(vector_store, namespace: str, index=None):
+    """
+    Build the upsert stage of an IngestionEngine for a Pinecone vectorstore.
+
+    Vectors are written with the chunk text under the vectorstore's text key,
+    the same layout add_documents produces, so similarity_search keeps working.
+    index overrides the vectorstore's own (sync) Index handle. A
+    LocalVectorStore is written directly.
+    """
+    if isinstance(vector_store, LocalVectorStore):
+        return vector_store.aupsert_vectors
+
+    index = index or vector_store.index
+
+    async def upsert(ids, vectors, documents):
+        records = []
+        for vector_id, values, doc in zip(ids, vectors, documents):
+            # Pinecone rejects null metadata values
+            metadata = {key: value for key, value in doc.metadata.items() if value is not None}
+            metadata[vector_store._text_key] = doc.page_content
+            records.append((vector_id, values, metadata))
+
+        await asyncio.to_thread(
+            index.upsert,
+            vectors=records,
+            namespace=namespace,
+            batch_size=UPSERT_BATCH_SIZE
+        )
+    return upsert
+
+
+class VectorStorePool:
+    """
+    Bounded LRU of namespace -> PineconeVectorStore.
+
+    All vectorstores share one Pinecone client, one sync Index handle (pooled
+    urllib3 connections, used for upserts) and one IndexAsyncio (one aiohttp
+    session, used for searches), so only the first call pays for resolving the
+    index host and opening connections. Holds up to VECTORSTORE_CACHE_SIZE
+    (default: 256) namespaces; evicted stores are dropped without closing the
+    shared session, which close() shuts down.
+    """
+
+    def __init__(self, embeddings, api_key: str = None, index_name: str = INDEX_NAME, max_size: int = None):
+        self.embeddings = embeddings
+        self.api_key = api_key or os.getenv("PINECONE_API_KEY")
+        self.index_name = index_name
+        self.max_size = max_size or int(os.getenv("VECTORSTORE_CACHE_SIZE", "256"))
+        self.index = None
+        self.async_index = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stores = OrderedDict()
+        self._connect_lock = asyncio.Lock()
+
+    async def connect(self):
+        """Resolve the index once and open the shared handles."""
+        async with self._connect_lock:
+            if self.index is None:
+                client = Pinecone(api_key=self.api_key)
+                # describe_index round trip, in a thread
+                index = await asyncio.to_thread(client.Index, self.index_name)
+                # aiohttp needs the running loop, so this one is built here
+                self.async_index = client.IndexAsyncio(host=index.config.host)
+                self.index = index
+
+    async def get(self, namespace: str) -> PineconeVectorStore:
+        store = self._stores.get(namespace)
+        if store is not None:
+            self._stores.move_to_end(namespace)
+            self.hits += 1
+            return store
+
+        self.misses += 1
+        if self.index is None:
+            await self.connect()
+        store = PineconeVectorStore(index=self.async_index, embedding=self.embeddings, namespace=namespace)
+        # Keep the shared async index open between searches instead of a
+        # session per query
+        await store.__aenter__()
+        self._stores[namespace] = store
+        while len(self._stores) > self.max_size:
+            self._stores.popitem(last=False)
+            self.evictions += 1
+        return store
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "namespaces": len(self._stores),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    async def close(self):
+        self._stores.clear()
+        if self.async_index is not None:
+            await self.async_index.close()
+        self.index = None
+        self.async_index = None
+
+
 class PineconeService:
+    # Uploads and re-indexing go through AsyncPineconeService (final_upload,
+    # reindex_book), which only embeds the chunks that changed
     def __init__(self):
         self.api = os.getenv("PINECONE_API_KEY")
-        self.index_name = "langchaintest2"
-        self.embeddings = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))#getting openai llm
+        self.index_name = INDEX_NAME
+        self.embeddings = with_embedding_cache(OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY")))#getting openai llm, behind the on-disk embedding cache
         self.books_repo = BooksRepository()
-        self.temp_folder = "temp"
 
     def upload_vectors(self, book_title: str):
         """
@@ -26,13 +297,9 @@ class PineconeService:
         Process:
         --------
         1. Get book record from database using book_id
-        2. Check if file exists in temp folder (temp/{user_id}_{filename})
-        3. If exists: Read file, create docs variable, delete temp file
-        4. If not exists: Download from Supabase Storage to temp, read file, create docs variable
+        2. Download the PDF bytes from Supabase Storage
+        3. Parse the bytes in memory into docs (no temp file)
         """
-        docs = None
-        temp_path = None
-
         try:
             # Step 1: Get book record from database
             book_record = self.books_repo.get_book_by_id(book_title=book_title)
@@ -40,48 +307,14 @@ class PineconeService:
             if not book_record:
                 raise Exception(f"Book with the Title: {book_title} not found in database")
 
-            # Step 2: Extract user_id and filename from book record
-            user_id = book_record['user_id']
-            filename = book_record['filename']
-
-            # Step 3: Construct temp file path
-            temp_path = os.path.join(self.temp_folder, f"{user_id}_{filename}")
-
-            # Step 4: Check if file exists in temp folder
-            if os.path.exists(temp_path):
-                # Case A: File exists in temp folder
-                # Read the file and create docs variable
-                docs = read_doc(temp_path)
-
-                # Delete the temp file after reading
-                os.remove(temp_path)
-
-            else:
-                # Case B: File doesn't exist in temp folder
-                # Download from Supabase Storage
-                storage_path = book_record['storage_path']
-
-                # Download file from Supabase Storage
-                file_data = self.books_repo.client.storage.from_("documents").download(storage_path)
-
-                # Save to temp folder
-                with open(temp_path, "wb") as f:
-                    f.write(file_data)
-
-                # Read the file and create docs variable
-                docs = read_doc(temp_path)
+            # Step 2: Download file from Supabase Storage
+            storage_path = book_record['storage_path']
+            file_data = self.books_repo.client.storage.from_("book_storage").download(storage_path)
 
-                # Delete the temp file after reading
-                os.remove(temp_path)
-
-            # Return docs variable
-            return docs
+            # Step 3: Read the bytes and return docs
+            return read_doc(file_data, name=book_record['filename'])
 
         except Exception as e:
-            # If error occurs and temp file exists, clean it up
-            if temp_path and os.path.exists(temp_path):
-                os.remove(temp_path)
-
             raise Exception(f"Error processing book for vectors: {str(e)}")
 
     def chunk_doc(self, docs, chunk_size=400, chunk_overlap=50):
@@ -103,81 +336,257 @@ class PineconeService:
         """
         return chunks(docs, chunk_size, chunk_overlap)
 
-    def final_upload(self, book_title: str):
+    def get_vectorstore(self, namespace: str):
         """
-        Final upload method that chunks documents and uploads to Pinecone vectorstore.
+        Retrieve a specific namespace as a vector store for searching vectors.
 
         Parameters:
         -----------
-        book_title : str
-            The title of the book to process
+        namespace : str
+            The namespace to retrieve (e.g., "user_123")
 
-        Process:
+        Returns:
         --------
-        1. Get book record from database to retrieve namespace
-        2. Get docs from upload_vectors method
-        3. Chunk the docs using chunk_doc method
-        4. Create/update vectorstore with chunked docs and namespace
+        PineconeVectorStore : Vector store instance for the specified namespace
+            (a LocalVectorStore with VECTOR_BACKEND=local)
         """
         try:
-            # Step 1: Get book record to retrieve namespace
-            book_record = self.books_repo.get_book_by_id(book_title=book_title)
+            if vector_backend() == "local":
+                return LocalVectorStore(self.embeddings, namespace=namespace)
+
+            # Create and return a PineconeVectorStore instance for the specified namespace
+            vector_store = PineconeVectorStore(
+                index_name=self.index_name,
+                embedding=self.embeddings,
+                namespace=namespace,
+                pinecone_api_key=self.api
+            )
+
+            return vector_store
+
+        except Exception as e:
+            raise Exception(f"Error retrieving vectorstore for namespace {namespace}: {str(e)}")
+
+
+class AsyncPineconeService:
+    """
+    Async variant of PineconeService.
+
+    Network calls are awaited (Supabase storage, embeddings and Pinecone upserts
+    through the vectorstore's async API) and CPU-bound PDF parsing runs in a
+    worker thread so the event loop stays free.
+    """
+    def __init__(self, books_repo: AsyncBooksRepository = None, embeddings=None, pool: VectorStorePool = None):
+        """
+        - books_repo: created on first use when not given
+        - embeddings: shared embeddings object, a new cached OpenAIEmbeddings when not given
+        - pool: shared VectorStorePool; without it every vectorstore resolves
+          the index host and opens its own connections
+        """
+        self.api = os.getenv("PINECONE_API_KEY")
+        self.index_name = INDEX_NAME
+        self.embeddings = embeddings or with_embedding_cache(OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY")))
+        self.books_repo = books_repo
+        self.pool = pool
+
+    async def _get_books_repo(self):
+        if self.books_repo is None:
+            self.books_repo = await AsyncBooksRepository.create()
+        return self.books_repo
+
+    async def stream_book(self, book_record: dict, chunk_size=400, chunk_overlap=50):
+        """
+        Download a stored book and stream its chunks (see stream_chunks).
+
+        Pages are parsed from the downloaded bytes on the job process pool
+        and chunked as they arrive, so only the file and a few batches of
+        chunks are in memory, however long the book is.
+        """
+        try:
+            books_repo = await self._get_books_repo()
+            file_data = await books_repo.download_file_from_storage(book_record['storage_path'])
+        except Exception as e:
+            raise Exception(f"Error processing book for vectors: {str(e)}")
+
+        pages = iter_pdf_pages(file_data, executor=job_manager.process_pool, name=book_record['filename'])
+        return stream_chunks(pages, chunk_size, chunk_overlap)
+
+    async def final_upload(self, book_title: str):
+        """
+        Chunk a stored book and upload it to its Pinecone namespace,
+        only embedding the chunks that are not indexed yet (see reindex_book).
+        """
+        try:
+            books_repo = await self._get_books_repo()
+            book_record = await books_repo.get_book_by_id(book_title=book_title)
 
             if not book_record:
                 raise Exception(f"Book with the Title: {book_title} not found in database")
 
-            # Get namespace from book record
             namespace = book_record['pinecone_namespace']
 
-            # Step 2: Get docs from upload_vectors
-            docs = self.upload_vectors(book_title)
-
-            # Step 3: Chunk the documents
-            chunked_docs = self.chunk_doc(docs)
-
-            # Step 4: Create vectorstore and upload
-            vectorstore(
-                embeddings=self.embeddings,
-                indexname=self.index_name,
-                pineconeapikey=self.api,
-                doc=chunked_docs,
-                namespace=namespace
-            )
+            documents = await self.stream_book(book_record)
+            stats = await self.reindex_book(namespace, book_record['book_id'], documents)
 
             return {
                 "success": True,
                 "message": f"Successfully uploaded vectors for book: {book_title}",
                 "namespace": namespace,
-                "chunks_count": len(chunked_docs)
+                "chunks_count": stats["chunks"],
+                "stats": stats
             }
 
         except Exception as e:
             raise Exception(f"Error in final upload: {str(e)}")
 
-    def get_vectorstore(self, namespace: str):
+    async def ingest_documents(self, namespace: str, documents, on_progress=None, book_id: str = None):
         """
-        Retrieve a specific namespace as a vector store for searching vectors.
+        Embed and upsert chunks into a namespace with the batched,
+        concurrent IngestionEngine, adding them to the namespace's keyword
+        index too. on_progress(chunks_upserted) is called as batches land.
+        With book_id, every chunk is tagged with it so retrieval can be
+        scoped to the book, and gets a deterministic "{book_id}#{chunk hash}"
+        vector id (see book_vector_ids).
 
-        Parameters:
-        -----------
-        namespace : str
-            The namespace to retrieve (e.g., "user_123")
+        Returns:
+        --------
+        dict : Throughput report from IngestionEngine.ingest
+        """
+        vector_store = await self.get_vectorstore(namespace)
+        index = self.pool.index if self.pool is not None else None
+        upsert = keyword_upserter(vector_upserter(vector_store, namespace, index=index), namespace)
+        engine = IngestionEngine(self.embeddings, upsert)
+        if book_id:
+            # Ids are assigned in document order, before batches are embedded concurrently
+            documents = with_ids(with_metadata(documents, book_id=book_id), book_vector_ids(book_id))
+        try:
+            # Chunks are stored under their own id (doc.id) when they have one
+            return await engine.ingest(documents, on_progress=on_progress)
+        finally:
+            # Cached retrievals for this namespace no longer see every book
+            query_cache.invalidate(namespace)
+            await asyncio.to_thread(keyword_indexes.save, namespace)
+
+    async def _list_book_ids(self, vector_store, namespace: str, book_id: str):
+        """(prefixed ids, legacy ids) of a book's vectors, see list_book_vectors."""
+        prefix = book_vector_prefix(book_id)
+        if isinstance(vector_store, LocalVectorStore):
+            tagged = vector_store.list_ids(filter={"book_id": book_id})
+            return vector_store.list_ids(prefix), [vector_id for vector_id in tagged if not vector_id.startswith(prefix)]
+        index = self.pool.index if self.pool is not None else vector_store.index
+        prefixed, legacy, _listable = await asyncio.to_thread(list_book_vectors, index, namespace, book_id)
+        return prefixed, legacy
+
+    async def _delete_ids(self, vector_store, namespace: str, ids, on_progress=None):
+        if isinstance(vector_store, LocalVectorStore):
+            return await vector_store.adelete(ids=ids)
+        index = self.pool.index if self.pool is not None else vector_store.index
+        return await asyncio.to_thread(delete_ids, index, namespace, ids, on_progress)
+
+    async def reindex_book(self, namespace: str, book_id: str, documents, on_progress=None):
+        """
+        Bring a book's vectors in line with a fresh chunking of it.
+
+        Every chunk gets its deterministic id (book_vector_ids); chunks whose
+        id is already in the namespace are skipped without being embedded,
+        new ones are embedded and upserted, and the book's vectors whose id
+        no longer comes up are deleted. Re-chunking with the same parameters
+        is therefore a no-op, and changed parameters only touch what changed.
+        Vectors ingested before ids were deterministic (random ids, with or
+        without the book prefix) are replaced: they are deleted once the new
+        chunks are in, so the book is never missing from searches.
 
         Returns:
         --------
-        PineconeVectorStore : Vector store instance for the specified namespace
+        dict : IngestionEngine report for the new chunks, plus total, unchanged,
+            deleted and legacy_replaced counts
         """
+        vector_store = await self.get_vectorstore(namespace)
+        existing, legacy = await self._list_book_ids(vector_store, namespace, book_id)
+        existing = set(existing)
+        current = set()
+
+        async def new_chunks():
+            async for doc in with_ids(with_metadata(documents, book_id=book_id), book_vector_ids(book_id)):
+                current.add(doc.id)
+                if doc.id not in existing:
+                    yield doc
+
+        # Same pipeline as a first ingestion, minus the chunks already indexed
+        stats = await self.ingest_documents(namespace, new_chunks(), on_progress=on_progress)
+
+        vanished = (existing - current) | set(legacy)
+        if vanished:
+            try:
+                await self._delete_ids(vector_store, namespace, sorted(vanished))
+                await asyncio.to_thread(keyword_indexes.delete_ids, namespace, vanished)
+            finally:
+                query_cache.invalidate(namespace)
+
+        stats.update({
+            "total_chunks": len(current),
+            "unchanged": len(current & existing),
+            "deleted": len(vanished),
+            "legacy_replaced": len(legacy)
+        })
+        print(f"[INFO] Re-indexed book {book_id}: {stats['chunks']} new, {stats['unchanged']} unchanged, "
+              f"{stats['deleted']} deleted chunks ({stats['legacy_replaced']} with legacy ids)")
+        return stats
+
+    async def delete_book_vectors(self, namespace: str, book_id: str, on_progress=None):
+        """
+        Delete every vector of a book from its namespace, and its chunks
+        from the keyword index.
+
+        On serverless indexes the book's vectors are listed by id prefix and
+        by book_id and deleted in batches of DELETE_BATCH_SIZE; pod-based
+        indexes, which cannot list ids, delete them by book_id metadata (see
+        delete_book). on_progress(deleted, total) is called after every batch.
+
+        Returns:
+        --------
+        dict : deleted (vectors removed) and untagged (vectors of the namespace
+            without a book_id, which could not be attributed to any book)
+        """
+        vector_store = await self.get_vectorstore(namespace)
         try:
-            # Create and return a PineconeVectorStore instance for the specified namespace
-            vector_store = PineconeVectorStore(
+            if isinstance(vector_store, LocalVectorStore):
+                report = {
+                    "deleted": await vector_store.adelete(filter={"book_id": book_id}),
+                    "untagged": vector_store.count_missing("book_id")
+                }
+            else:
+                index = self.pool.index if self.pool is not None else vector_store.index
+                report = await asyncio.to_thread(delete_book, index, namespace, book_id, on_progress)
+
+            await asyncio.to_thread(keyword_indexes.delete_book, namespace, book_id)
+            return report
+        finally:
+            # Cached retrievals may still hold the deleted chunks
+            query_cache.invalidate(namespace)
+
+    async def get_vectorstore(self, namespace: str):
+        """
+        Retrieve a specific namespace as a vector store for searching vectors.
+
+        With a pool, hot namespaces come back from its LRU; otherwise building
+        the store resolves the index host over the network, so it happens in a
+        worker thread.
+        """
+        try:
+            if self.pool is not None:
+                return await self.pool.get(namespace)
+            if vector_backend() == "local":
+                return await asyncio.to_thread(LocalVectorStore, self.embeddings, namespace)
+
+            return await asyncio.to_thread(
+                PineconeVectorStore,
                 index_name=self.index_name,
                 embedding=self.embeddings,
                 namespace=namespace,
                 pinecone_api_key=self.api
             )
 
-            return vector_store
-
         except Exception as e:
             raise Exception(f"Error retrieving vectorstore for namespace {namespace}: {str(e)}")
 
@@ -0,0 +1,171 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation, so near-identical questions share an entry."""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+
+
+class QueryCache:
+    """
+    Per-namespace cache of retrieval results.
+
+    Maps (namespace, normalized question, k, metadata filter) to the
+    question's embedding and the top-k documents Pinecone returned for it. Entries expire after
+    `ttl_seconds` and the least recently used ones are evicted past
+    `max_entries`.
+
+    Adding or removing a book bumps the namespace's generation: cached
+    results of older generations are no longer served, but their embedding
+    is reused so the repeat search skips the embedding request.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(namespace: str, question: str, k: int, filter: dict = None):
+        scope = tuple(sorted(filter.items())) if filter else None
+        return (namespace, normalize_question(question), k, scope)
+
+    def get(self, namespace: str, question: str, k: int, filter: dict = None):
+        """
+        Look up a question.
+
+        Returns:
+        --------
+        tuple : (documents, embedding); documents is None when the results
+                are missing or stale, embedding is None when not cached at all
+        """
+        key = self.key(namespace, question, k, filter)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires"] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None, None
+
+            self._entries.move_to_end(key)
+            if entry["generation"] != self._generations.get(namespace, 0):
+                self.stale += 1
+                return None, entry["embedding"]
+
+            self.hits += 1
+            return list(entry["documents"]), entry["embedding"]
+
+    def generation(self, namespace: str) -> int:
+        """Current generation of a namespace, read before searching (see put)."""
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def put(self, namespace: str, question: str, k: int, embedding, documents, filter: dict = None, generation: int = None):
+        """
+        Cache a question's results. generation is the namespace's generation
+        when the search started: results of a search that overlapped an
+        invalidation may predate the change, so they are not stored.
+        """
+        key = self.key(namespace, question, k, filter)
+        with self._lock:
+            current = self._generations.get(namespace, 0)
+            if generation is not None and generation != current:
+                return
+            self._entries[key] = {
+                "embedding": embedding,
+                "documents": list(documents),
+                "ids": [getattr(doc, "id", None) for doc in documents],
+                "generation": current,
+                "expires": time.monotonic() + self.ttl_seconds
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, namespace: str):
+        """Mark a namespace's cached results stale, e.g. after a book was added or removed."""
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Process-wide cache, configured with QUERY_CACHE_ENABLED (default: true),
+# QUERY_CACHE_MAX_ENTRIES (default: 1024) and QUERY_CACHE_TTL_SECONDS (default: 600)
+query_cache = QueryCache(
+    max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+)
+
+
+def query_cache_enabled() -> bool:
+    return os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+
+
+async def cached_search(vectorstore, query: str, k: int = 2, filter: dict = None):
+    """
+    Similarity search through the query cache.
+
+    A hit returns the cached documents without embedding the question or
+    calling Pinecone. A stale hit reuses the cached embedding and only runs
+    the search again. filter is a metadata filter, e.g. {"book_id": ...}.
+
+    Returns:
+    --------
+    tuple : (documents, question embedding)
+    """
+    namespace = vectorstore._namespace or ""
+    enabled = query_cache_enabled()
+    # Before the search, so results racing a book change are not cached
+    generation = query_cache.generation(namespace)
+    documents, embedding = query_cache.get(namespace, query, k, filter) if enabled else (None, None)
+    if documents is not None:
+        return documents, embedding
+
+    if embedding is None:
+        embedding = await vectorstore.embeddings.aembed_query(query)
+    search_kwargs = {"filter": filter} if filter else {}
+    documents = await vectorstore.asimilarity_search_by_vector(embedding, k=k, **search_kwargs)
+    if enabled:
+        query_cache.put(namespace, query, k, embedding, documents, filter, generation=generation)
+    return documents, embedding
+
+
+async def cached_retrieve(vectorstore, query: str, k: int = 2, filter: dict = None):
+    """cached_search without the embedding."""
+    documents, _embedding = await cached_search(vectorstore, query, k, filter)
+    return documents
@@ -1,40 +1,193 @@
 import openai
 import langchain
 import os 
+import io
+import itertools
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 # For document loading
-from langchain_community.document_loaders import PyPDFLoader
+import pypdf
+from langchain_core.documents import Document
 
 # For text splitting
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # For vector store
 from langchain_pinecone import PineconeVectorStore
+from app.services.local_vectorstore import LocalVectorStore, vector_backend
+from app.services.hybrid_search import hybrid_search, ahybrid_search
 
 # For LLM and chain
 from langchain_openai import ChatOpenAI
 load_dotenv()
-def read_doc(directory):
-    file_loader = PyPDFLoader(directory)
-    document = file_loader.load()
-    return document
 
-def chunks(docs, chunk_size = 400, chunk_overlap = 50):
+# Below this many pages a process pool costs more than it saves
+PARALLEL_MIN_PAGES = 16
+
+
+def _pdf_metadata(reader, source):
+    # Same document-level keys and normalization PyPDFLoader produces
+    raw = {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+    raw.update(reader.metadata or {})
+    raw.update({"source": source, "total_pages": len(reader.pages)})
+
+    metadata = {}
+    for key, value in raw.items():
+        if type(value) not in (str, int):
+            value = str(value)
+        key = key.lstrip("/").lower()
+        if key in ("creationdate", "moddate"):
+            try:
+                value = datetime.strptime(value.replace("'", ""), "D:%Y%m%d%H%M%S%z").isoformat("T")
+            except ValueError:
+                pass
+        elif isinstance(value, str):
+            value = value.strip()
+        metadata[key] = value
+    return metadata
+
+
+def _open_pdf(source):
+    # A path, or the raw bytes of an upload parsed straight from memory
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return pypdf.PdfReader(io.BytesIO(source))
+    return pypdf.PdfReader(source)
+
+
+def _extract_pages(source, start, stop, name=None):
+    """Extract pages [start, stop) of a PDF as Documents (runs in a worker process)."""
+    reader = _open_pdf(source)
+    metadata = _pdf_metadata(reader, name or source)
+    page_labels = reader.page_labels
+    return [
+        Document(
+            page_content=reader.pages[page].extract_text(extraction_mode="plain").strip(),
+            metadata={**metadata, "page": page, "page_label": page_labels[page]}
+        )
+        for page in range(start, stop)
+    ]
+
+
+def count_pages(source):
+    return len(_open_pdf(source).pages)
+
+
+def iter_pdf_pages(source, executor=None, workers=None, pages_per_task=None, name=None):
+    """
+    Extract a PDF's pages in parallel and yield them in page order.
+
+    The page range is split into small slices that run across a process
+    pool. Pages are yielded as soon as every earlier slice has finished, so
+    a consumer (e.g. chunking) can start before the last page is parsed.
+
+    Parameters:
+    -----------
+    source : str or bytes
+        Path of the PDF file, or its content (parsed in memory, no temp file)
+    executor : ProcessPoolExecutor, optional
+        Pool to use, a temporary one is created when not given
+    workers : int, optional
+        Size of the temporary pool (default: CPU count)
+    pages_per_task : int, optional
+        Pages per slice (default: spread over ~4 slices per worker)
+    name : str, optional
+        Value of the "source" metadata, needed when source is bytes
+    """
+    if isinstance(source, (bytearray, memoryview)):
+        source = bytes(source)
+    if name is None and isinstance(source, bytes):
+        name = "upload.pdf"
+    total_pages = count_pages(source)
+    if total_pages < PARALLEL_MIN_PAGES:
+        yield from _extract_pages(source, 0, total_pages, name)
+        return
+
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        slots = workers or getattr(executor, "_max_workers", None) or os.cpu_count() or 1
+        # In-memory PDFs are pickled to the worker with every slice,
+        # so they get fewer, larger slices
+        slices_per_worker = 2 if isinstance(source, bytes) else 4
+        step = pages_per_task or max(1, -(-total_pages // (slots * slices_per_worker)))
+        starts = iter(range(0, total_pages, step))
+        pending = deque()
+
+        # Keep a bounded window of slices in flight so parsed pages do not
+        # pile up ahead of a slow consumer
+        for start in itertools.islice(starts, slots * 2):
+            pending.append(executor.submit(_extract_pages, source, start, min(start + step, total_pages), name))
+        while pending:
+            pages = pending.popleft().result()
+            start = next(starts, None)
+            if start is not None:
+                pending.append(executor.submit(_extract_pages, source, start, min(start + step, total_pages), name))
+            yield from pages
+    finally:
+        if owns_executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def read_doc(directory, name=None, executor=None):
+    # Pass the app's shared pool (job_manager.process_pool) from request handlers,
+    # otherwise every call starts and tears down its own
+    return list(iter_pdf_pages(directory, executor=executor, name=name))
+
+def iter_chunks(docs, chunk_size = 400, chunk_overlap = 50):
+    """
+    Lazily split page documents into chunks.
+
+    Pages are consumed one at a time and their chunks yielded right away,
+    so only the current page has to be in memory. The output is the same
+    as chunks(), since the splitter works on each document independently.
+    """
     text_splitter = RecursiveCharacterTextSplitter(chunk_size = chunk_size, chunk_overlap = chunk_overlap)
-    splited_doc = text_splitter.split_documents(docs)
-    return splited_doc
+    for doc in docs:
+        yield from text_splitter.split_documents([doc])
+
+
+def iter_chunk_batches(docs, chunk_size = 400, chunk_overlap = 50, batch_size = 256):
+    """Like iter_chunks, but yields lists of at most batch_size chunks."""
+    batch_iterator = iter_chunks(docs, chunk_size, chunk_overlap)
+    while True:
+        batch = list(itertools.islice(batch_iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def chunks(docs, chunk_size = 400, chunk_overlap = 50):
+    return list(iter_chunks(docs, chunk_size, chunk_overlap))
 
 def vectorstore(embeddings, indexname, pineconeapikey, doc=None, namespace: str = ""):
-    vectorstore = PineconeVectorStore(embedding=embeddings,
+    if vector_backend() == "local":
+        # In-process backend, indexname and pineconeapikey are not used
+        vectorstore = LocalVectorStore(embeddings, namespace=namespace)
+    else:
+        vectorstore = PineconeVectorStore(embedding=embeddings,
                                                  index_name = indexname, pinecone_api_key = pineconeapikey, namespace=namespace)
     if doc == None: 
         pass
     else: 
         vectorstore.add_documents(doc)
     return vectorstore
-def retrive_query(vectorstore, query, k=2):
-    matching_results = vectorstore.similarity_search(query, k=k)
+def book_filter(book_id=None):
+    """Metadata filter limiting retrieval to one book's chunks, None for all books."""
+    return {"book_id": book_id} if book_id else None
+
+def retrive_query(vectorstore, query, k=2, book_id=None):
+    # Dense and BM25 keyword results fused with RRF
+    matching_results = hybrid_search(vectorstore, query, k=k, filter=book_filter(book_id))
     return matching_results
 
+async def aretrive_query(vectorstore, query, k=2, book_id=None):
+    # Hybrid search, repeated questions' dense results come from the query cache
+    matching_results, _embedding = await ahybrid_search(vectorstore, query, k=k, filter=book_filter(book_id))
+    return matching_results
 
-                                            
\ No newline at end of file
+async def aretrive_query_with_embedding(vectorstore, query, k=2, book_id=None):
+    # Same as aretrive_query, also returns the question's embedding
+    return await ahybrid_search(vectorstore, query, k=k, filter=book_filter(book_id))
@@ -0,0 +1,30 @@
+import tiktoken
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def load_encoding(model=None):
+    """tiktoken encoding for a model (cl100k_base as fallback), None when tiktoken cannot load one."""
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"[WARNING] tiktoken encoding unavailable, estimating tokens: {e}")
+            return None
+
+
+def count_tokens(text: str, encoding=None) -> int:
+    if encoding is None:
+        # Rough estimate when no tokenizer is available
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, encoding=None) -> str:
+    """text cut down to at most max_tokens tokens."""
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
@@ -2,12 +2,40 @@
 FastAPI application for RAG Chat Backend
 Provides REST API endpoints for user management, chat functionality, and book uploads
 """
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 
-from app.routers import users, chats, messages, books
+from app.routers import users, chats, messages, books, admin
+from app.database.base import supabase_registry
+from app.database.unit_of_work import unit_of_work, db_debug_headers_enabled, FlushError
+from app.services.job_service import job_manager
+from app.dependencies import app_services
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """
+    Application lifecycle - open shared clients on startup, close them on shutdown.
+    """
+    try:
+        supabase_registry.startup()
+        await supabase_registry.astartup()
+        await app_services.startup()
+    except ValueError as e:
+        # Keep the API up (docs, health) even without credentials;
+        # repositories will raise the same error when first used
+        print(f"[WARNING] Supabase client not initialized: {e}")
+
+    yield
+
+    await job_manager.shutdown()
+    await app_services.shutdown()
+    supabase_registry.shutdown()
+    await supabase_registry.ashutdown()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -26,7 +54,8 @@ app = FastAPI(
     """,
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -37,13 +66,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Round-Trips", "X-DB-Identity-Hits"],
 )
 
+
+@app.middleware("http")
+async def database_unit_of_work(request: Request, call_next):
+    """
+    Run every request in its own database unit of work.
+
+    Rows are loaded at most once per request and staged updates are sent
+    before the response goes out, unless the handler failed. A request whose
+    updates could not be saved gets a 500. With DB_DEBUG_HEADERS
+    (default: false) the response reports the Supabase round trips and
+    identity map hits.
+    """
+    try:
+        async with unit_of_work() as uow:
+            response = await call_next(request)
+            if response.status_code >= 400:
+                # The handler raised an HTTPException, keep its partial changes out
+                uow.discard()
+    except FlushError as e:
+        print(f"[WARNING] {request.method} {request.url.path}: {e}")
+        return JSONResponse(status_code=500, content={"detail": str(e)})
+
+    if db_debug_headers_enabled():
+        response.headers["X-DB-Round-Trips"] = str(uow.round_trips)
+        response.headers["X-DB-Identity-Hits"] = str(uow.identity_hits)
+    return response
+
 # Include routers
 app.include_router(users.router)
 app.include_router(chats.router)
 app.include_router(messages.router)
 app.include_router(books.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -66,7 +124,8 @@ async def root():
             "users": "/api/users",
             "chats": "/api/chats",
             "messages": "/api/messages",
-            "books": "/api/books"
+            "books": "/api/books",
+            "admin": "/api/admin"
         }
     }
 
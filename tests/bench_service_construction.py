@@ -0,0 +1,91 @@
+"""
+Microbenchmark: per-request construction of the chat services versus the
+shared app-scoped services from app.dependencies.
+
+Runs offline with placeholder keys; nothing is sent to OpenAI, Pinecone or
+Supabase. The per-request path below leaves out what it cannot do offline,
+resolving the Pinecone index host (one describe_index round trip per request
+before the shared vectorstore pool), so the real gap is larger than shown.
+
+Usage: python tests/bench_service_construction.py [iterations]
+"""
+import sys
+import os
+import time
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("PINECONE_API_KEY", "pc-benchmark")
+
+from pinecone import Pinecone
+from langchain_pinecone import PineconeVectorStore
+from openai import AsyncOpenAI
+from app.database.chats_repo import AsyncChatsRepo
+from app.database.messages_repo import AsyncMessagesRepo
+from app.services.chat_service import AsyncChatService
+from app.services.openai_service import AsyncOpenAIResponse
+from app.services.pinecone_service import AsyncPineconeService, VectorStorePool
+from app.dependencies import ChatServiceFactory
+
+
+async def per_request(host):
+    # What every chat request used to build (repositories share the Supabase client either way)
+    chats_repo = AsyncChatsRepo(None)
+    messages_repo = AsyncMessagesRepo(None)
+    pinecone_service = AsyncPineconeService()
+    # Own store and connections, minus the describe_index call kept out of the offline run
+    index = Pinecone(api_key=os.environ["PINECONE_API_KEY"]).IndexAsyncio(host=host)
+    vectorstore = PineconeVectorStore(
+        index=index,
+        embedding=pinecone_service.embeddings, namespace="user_bench")
+    service = AsyncChatService("bench", "question", vectorstore, chats_repo, messages_repo,
+                               AsyncOpenAIResponse(chats_repo=chats_repo))
+    await index.close()  # its own connections go away with the request
+    return service
+
+
+async def shared(factory):
+    return await factory.create("bench", "question")
+
+
+async def measure(label, make, iterations):
+    await make()  # warm up imports and caches
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await make()
+    elapsed = time.perf_counter() - started
+    per_call = elapsed / iterations * 1e6
+    print(f"{label:<28} {per_call:10.1f} us/request")
+    return per_call
+
+
+async def main(iterations):
+    host = "https://bench-index.svc.pinecone.io"
+    client = Pinecone(api_key=os.environ["PINECONE_API_KEY"])
+    pinecone_service = AsyncPineconeService()
+    pool = VectorStorePool(embeddings=pinecone_service.embeddings)
+    # Connected by hand, VectorStorePool.connect() would call describe_index
+    pool.index = client.Index(host=host)
+    pool.async_index = client.IndexAsyncio(host=host)
+    chats_repo = AsyncChatsRepo(None)
+    factory = ChatServiceFactory(
+        pinecone_service=AsyncPineconeService(embeddings=pinecone_service.embeddings, pool=pool),
+        chats_repo=chats_repo,
+        messages_repo=AsyncMessagesRepo(None),
+        openai_service=AsyncOpenAIResponse(chats_repo=chats_repo, client=AsyncOpenAI())
+    )
+
+    print(f"{iterations} iterations")
+    before = await measure("per-request construction", lambda: per_request(host), iterations)
+    after = await measure("shared services (Depends)", lambda: shared(factory), iterations)
+    print(f"{'saved':<28} {before - after:10.1f} us/request ({before / after:.0f}x)")
+    print(f"vectorstore pool: {pool.stats()}")
+    await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
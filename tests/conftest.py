@@ -0,0 +1,121 @@
+"""
+Shared fixtures for the offline tests: a fake Supabase client standing in for
+the PostgREST query builder (no network)
+"""
+import sys
+import os
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import pytest
+from app.database.unit_of_work import count_round_trip
+
+
+class FakeQuery:
+    """
+    One query on a table. Builder calls are recorded on the client; execute()
+    answers a select with the table's rows matching the eq() filters, in the
+    order() requested and up to limit(), and a write with the written rows,
+    like PostgREST's return=representation. Writes do not change the rows.
+    """
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.operation = None
+        self.payload = None
+        self.calls = []
+        self.data = []
+
+    def _record(self, name, *args, **kwargs):
+        self.calls.append((name, args, kwargs))
+        self.client.calls.append((name, args, kwargs))
+        return self
+
+    def _write(self, operation, payload=None):
+        self.operation = operation
+        self.payload = payload
+        return self
+
+    def select(self, *args):
+        self.operation = self.operation or "select"
+        return self._record("select", *args)
+
+    def insert(self, rows):
+        return self._write("insert", rows)
+
+    def update(self, data):
+        return self._write("update", data)
+
+    def delete(self):
+        return self._write("delete")
+
+    def eq(self, *args):
+        return self._record("eq", *args)
+
+    def or_(self, *args):
+        return self._record("or_", *args)
+
+    def order(self, *args, **kwargs):
+        return self._record("order", *args, **kwargs)
+
+    def limit(self, *args):
+        return self._record("limit", *args)
+
+    def _select(self):
+        filters = [args for name, args, _kwargs in self.calls if name == "eq"]
+        rows = [
+            row for row in self.client.rows.get(self.table, [])
+            if all(row.get(column) == value for column, value in filters)
+        ]
+        orders = [(args[0], kwargs.get("desc", False)) for name, args, kwargs in self.calls if name == "order"]
+        for column, desc in reversed(orders):
+            rows = sorted(rows, key=lambda row: row[column], reverse=desc)
+        limit = next((args[0] for name, args, _kwargs in self.calls if name == "limit"), None)
+        return [dict(row) for row in rows[:limit]]
+
+    def _run(self):
+        if self.client.unavailable:
+            raise ConnectionError("Supabase unavailable")
+        self.client.requests.append((self.table, self.operation))
+        count_round_trip()
+        if self.operation == "select":
+            self.data = self._select()
+        elif self.operation in ("insert", "update"):
+            self.data = self.payload if isinstance(self.payload, list) else [self.payload]
+        return self
+
+    def execute(self):
+        if self.client.is_async:
+            async def run():
+                return self._run()
+            return run()
+        return self._run()
+
+
+class FakeSupabaseClient:
+    """
+    Records one (table, operation) entry per request sent to Supabase in
+    `requests`, and every query builder call in `calls`.
+
+    rows maps a table name to its rows. Set `unavailable` to make every
+    request fail.
+    """
+
+    def __init__(self, rows=None, is_async=True):
+        self.rows = rows or {}
+        self.is_async = is_async
+        self.requests = []
+        self.calls = []
+        self.unavailable = False
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+@pytest.fixture
+def fake_supabase():
+    """Factory of fake Supabase clients: fake_supabase(rows=None, is_async=True)"""
+    return FakeSupabaseClient
@@ -0,0 +1,35 @@
+"""
+Offline test for the semantic answer cache
+"""
+import sys
+import os
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from langchain_core.documents import Document
+from app.services.answer_cache import SemanticAnswerCache
+
+
+CONTEXT = [Document(page_content="Lists are mutable", id="book#1"), Document(page_content="Tuples are not", id="book#2")]
+
+
+def test_similar_question_over_same_context_hits():
+    """A close embedding with the same context ids (in any order) reuses the answer"""
+    cache = SemanticAnswerCache(threshold=0.95, max_entries=10, ttl_seconds=60)
+    cache.put("user_1", [1.0, 0.0, 0.1], CONTEXT, "Lists can change.")
+
+    assert cache.get("user_1", [0.99, 0.0, 0.12], list(reversed(CONTEXT))) == "Lists can change."
+    assert cache.stats()["hits"] == 1
+
+
+def test_different_question_context_or_namespace_misses():
+    """Dissimilar questions, other context sets and other namespaces never share answers"""
+    cache = SemanticAnswerCache(threshold=0.95, max_entries=10, ttl_seconds=60)
+    cache.put("user_1", [1.0, 0.0, 0.0], CONTEXT, "Lists can change.")
+
+    assert cache.get("user_1", [0.0, 1.0, 0.0], CONTEXT) is None
+    assert cache.get("user_1", [1.0, 0.0, 0.0], CONTEXT[:1]) is None
+    assert cache.get("user_2", [1.0, 0.0, 0.0], CONTEXT) is None
+    assert cache.stats()["misses"] == 3
@@ -0,0 +1,162 @@
+"""
+Offline tests for book deletion (vectors, keyword index, storage and record)
+"""
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from app.services import pinecone_service
+from app.services import hybrid_search
+from app.services.hybrid_search import KeywordIndexRegistry
+from app.services.pinecone_service import AsyncPineconeService, delete_by_prefix, delete_book, list_book_vectors, DELETE_BATCH_SIZE
+from app.services.local_vectorstore import LocalVectorBackend
+from app.services.book_processing_service import BookProcessingService, DELETION_STAGES
+from app.services.job_service import Job
+
+
+class FakeIndex:
+    """
+    Lists ids by prefix in pages like a serverless Pinecone index; with
+    pod=True listing fails and deletes by metadata work instead, like a
+    pod-based one
+    """
+    def __init__(self, ids, book_ids=None, pod=False):
+        self.ids = set(ids)
+        self.book_ids = book_ids or {}  # vector id -> book_id metadata
+        self.pod = pod
+        self.deletes = []
+        self.filter_deletes = []
+
+    def list(self, prefix, namespace):
+        if self.pod:
+            raise Exception("(400) Bad Request: list is not supported for pod-based indexes")
+        matching = sorted(vector_id for vector_id in self.ids if vector_id.startswith(prefix))
+        for start in range(0, len(matching), 100):
+            yield matching[start:start + 100]
+
+    def describe_index_stats(self):
+        return SimpleNamespace(dimension=4)
+
+    def _matches(self, filter):
+        if "$exists" in filter["book_id"]:
+            return sorted(vector_id for vector_id in self.ids if vector_id not in self.book_ids)
+        return sorted(vector_id for vector_id in self.ids if self.book_ids.get(vector_id) == filter["book_id"]["$eq"])
+
+    def query(self, vector, top_k, filter, namespace, **_kwargs):
+        assert len(vector) == 4
+        return SimpleNamespace(matches=[SimpleNamespace(id=vector_id) for vector_id in self._matches(filter)[:top_k]])
+
+    def delete(self, ids=None, filter=None, namespace=None):
+        if filter is not None:
+            if not self.pod:
+                raise Exception("(400) Bad Request: serverless indexes do not support deleting by metadata")
+            self.filter_deletes.append(filter)
+            self.ids.difference_update(self._matches(filter))
+            return
+        self.deletes.append(len(ids))
+        self.ids.difference_update(ids)
+
+
+def _namespace_with_legacy_vectors(pod=False):
+    """Book a's prefixed and older random-id vectors, book b's vectors and untagged ones"""
+    prefixed = [f"book-a#{i}" for i in range(1200)]
+    legacy = [f"random-{i}" for i in range(5)]
+    other = [f"book-b#{i}" for i in range(3)]
+    untagged = [f"untagged-{i}" for i in range(2)]
+    book_ids = {vector_id: "book-a" for vector_id in prefixed + legacy}
+    book_ids.update({vector_id: "book-b" for vector_id in other})
+    return FakeIndex(prefixed + legacy + other + untagged, book_ids, pod=pod), set(other + untagged)
+
+
+class FakeBooksRepo:
+    def __init__(self):
+        self.removed_files = []
+        self.deleted_books = []
+
+    async def delete_file_from_storage(self, storage_path):
+        self.removed_files.append(storage_path)
+
+    async def delete_book(self, book_id=None, book_title=None):
+        self.deleted_books.append(book_id)
+
+
+def test_delete_by_prefix_batches_and_keeps_other_books():
+    index = FakeIndex([f"book-a#{i}" for i in range(2500)] + [f"book-b#{i}" for i in range(10)])
+    progress = []
+
+    deleted = delete_by_prefix(index, "user_x", "book-a#", on_progress=lambda done, total: progress.append(done))
+
+    assert deleted == 2500
+    assert index.deletes == [DELETE_BATCH_SIZE, DELETE_BATCH_SIZE, 500]
+    assert progress[-1] == 2500
+    assert index.ids == {f"book-b#{i}" for i in range(10)}
+
+
+def test_delete_book_on_serverless_includes_legacy_vectors():
+    index, remaining = _namespace_with_legacy_vectors()
+
+    report = delete_book(index, "user_x", "book-a")
+
+    assert report == {"deleted": 1205, "untagged": 2}
+    assert index.ids == remaining
+    assert index.deletes == [DELETE_BATCH_SIZE, 205]
+    assert index.filter_deletes == []
+
+
+def test_delete_book_on_pod_index_deletes_by_metadata():
+    index, remaining = _namespace_with_legacy_vectors(pod=True)
+    progress = []
+
+    report = delete_book(index, "user_x", "book-a", on_progress=lambda done, total: progress.append((done, total)))
+
+    assert report == {"deleted": 1205, "untagged": 2}
+    assert index.ids == remaining
+    assert index.filter_deletes == [{"book_id": {"$eq": "book-a"}}]
+    assert progress == [(1205, 1205)]
+
+
+def test_list_book_vectors_without_listing():
+    """Re-indexing on a pod-based index finds the book's vectors by metadata"""
+    index, _remaining = _namespace_with_legacy_vectors(pod=True)
+
+    prefixed, legacy, listable = list_book_vectors(index, "user_x", "book-a")
+
+    assert not listable
+    assert len(prefixed) == 1200 and all(vector_id.startswith("book-a#") for vector_id in prefixed)
+    assert sorted(legacy) == [f"random-{i}" for i in range(5)]
+
+
+def test_delete_book_job_purges_vectors_storage_and_record(tmp_path, monkeypatch):
+    registry = KeywordIndexRegistry(str(tmp_path / "keyword"), 4)
+    monkeypatch.setattr(hybrid_search, "keyword_indexes", registry)
+    monkeypatch.setattr(pinecone_service, "keyword_indexes", registry)
+
+    async def run():
+        embeddings = DeterministicFakeEmbedding(size=16)
+        service = AsyncPineconeService(embeddings=embeddings, pool=LocalVectorBackend(embeddings, path=str(tmp_path / "vectors")))
+        await service.ingest_documents("user_d", [Document(page_content=f"gone {i}") for i in range(6)], book_id="book-a")
+        await service.ingest_documents("user_d", [Document(page_content=f"kept {i}") for i in range(4)], book_id="book-b")
+
+        books_repo = FakeBooksRepo()
+        job = Job("book_deletion", DELETION_STAGES)
+        book = {"book_id": "book-a", "user_id": "d", "pinecone_namespace": "user_d", "storage_path": "d/a.pdf"}
+        result = await BookProcessingService(books_repo=books_repo, pinecone_service=service).delete_book(job, book)
+
+        store = await service.get_vectorstore("user_d")
+        return result, job, books_repo, store
+
+    result, job, books_repo, store = asyncio.run(run())
+    assert result["vectors_deleted"] == 6 and result["untagged_vectors_skipped"] == 0
+    assert len(store) == 4
+    assert all(doc.metadata["book_id"] == "book-b" for doc in store.similarity_search("gone", k=10))
+    assert [doc.metadata["book_id"] for doc, _score in registry.get("user_d").search("gone kept", k=10)] == ["book-b"] * 4
+    assert books_repo.removed_files == ["d/a.pdf"]
+    assert books_repo.deleted_books == ["book-a"]
+    assert all(stage["status"] == "completed" for stage in job.stages.values())
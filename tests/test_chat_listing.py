@@ -0,0 +1,70 @@
+"""
+Offline test for the keyset-paginated chat listing (fake Supabase client, no network)
+"""
+import sys
+import os
+import uuid
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import pytest
+from app.database.base import decode_cursor
+from app.database.chats_repo import AsyncChatsRepo, encode_chat_cursor
+
+
+def _chats(count, with_counts=False):
+    chats = [
+        {
+            "chat_id": str(uuid.UUID(int=count - i)),
+            "user_id": "u1",
+            "chat_title": f"chat {i}",
+            "created_at": "2025-01-01T00:00:00",
+            "updated_at": f"2025-01-01T00:{59 - i:02d}:00"
+        }
+        for i in range(count)
+    ]
+    if with_counts:
+        for i, chat in enumerate(chats):
+            chat["messages_table"] = [{"count": i}]
+    return chats
+
+
+def test_page_projection_and_cursor(fake_supabase):
+    """A page skips the messages column and points to the next one"""
+    client = fake_supabase({"chats_table": _chats(5)})
+    repo = AsyncChatsRepo(client)
+
+    page = asyncio.run(repo.list_chats("u1", limit=2))
+
+    select = next(args[0] for name, args, _kwargs in client.calls if name == "select")
+    assert "messages" not in select.split(", ")
+    assert ("limit", (3,), {}) in client.calls
+    assert [chat["chat_title"] for chat in page["chats"]] == ["chat 0", "chat 1"]
+    assert "message_count" not in page["chats"][0]
+    assert decode_cursor(page["next_cursor"]) == (
+        page["chats"][-1]["updated_at"], page["chats"][-1]["chat_id"]
+    )
+
+
+def test_cursor_filters_after_the_last_chat(fake_supabase):
+    client = fake_supabase({"chats_table": _chats(2, with_counts=True)})
+    repo = AsyncChatsRepo(client)
+    last = {"updated_at": "2025-01-01T00:58:00", "chat_id": str(uuid.UUID(int=1))}
+
+    page = asyncio.run(repo.list_chats("u1", limit=2, cursor=encode_chat_cursor(last), with_message_count=True))
+
+    condition = next(args[0] for name, args, _kwargs in client.calls if name == "or_")
+    assert 'updated_at.lt."2025-01-01T00:58:00"' in condition
+    assert f"chat_id.lt.{last['chat_id']}" in condition
+    # The last page has no cursor, counts are flattened
+    assert page["next_cursor"] is None
+    assert [chat["message_count"] for chat in page["chats"]] == [0, 1]
+
+
+def test_invalid_cursor_is_rejected(fake_supabase):
+    repo = AsyncChatsRepo(fake_supabase())
+    with pytest.raises(ValueError):
+        asyncio.run(repo.list_chats("u1", cursor="not-a-cursor"))
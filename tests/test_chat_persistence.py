@@ -0,0 +1,60 @@
+"""
+Offline test for per-turn chat persistence (fake Supabase client, no network)
+"""
+import sys
+import os
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app.database.chats_repo import AsyncChatsRepo
+from app.database.messages_repo import AsyncMessagesRepo
+from app.services.chat_service import AsyncChatService
+
+
+class FakeOpenAI:
+    async def new_chat(self, **_kwargs):
+        return "The answer to the first question"
+
+
+def test_turn_cost_is_constant(fake_supabase):
+    """Saving a turn is one insert and one update, whatever the chat length"""
+    client = fake_supabase()
+    service = AsyncChatService(
+        user_id="u1",
+        question=None,
+        vectorstore=None,
+        chats_repo=AsyncChatsRepo(client),
+        messages_repo=AsyncMessagesRepo(client),
+        openai_service=None
+    )
+    history = {f"m{i}": {"role": "user", "content": "hi"} for i in range(100)}
+
+    asyncio.run(service._save_turn("chat1", "question", "answer", chat_data={"messages": history}))
+
+    assert client.requests == [("messages_table", "insert"), ("chats_table", "update")]
+
+
+def test_new_chat_uses_the_inserted_row(fake_supabase):
+    """The chat_id comes from the insert, the chat is never selected back"""
+    client = fake_supabase()
+    service = AsyncChatService(
+        user_id="u1",
+        question=None,
+        vectorstore=None,
+        chats_repo=AsyncChatsRepo(client),
+        messages_repo=AsyncMessagesRepo(client),
+        openai_service=FakeOpenAI()
+    )
+
+    result = asyncio.run(service.new_chat("question", vectorstore=None))
+
+    assert result == "The answer to the first question"
+    assert service.chat_id
+    assert client.requests == [
+        ("chats_table", "insert"),
+        ("messages_table", "insert"),
+        ("chats_table", "update")
+    ]
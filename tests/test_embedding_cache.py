@@ -0,0 +1,120 @@
+"""
+Offline test for the on-disk embedding cache
+"""
+import sys
+import os
+import asyncio
+import sqlite3
+import tempfile
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app.services.embedding_cache import EmbeddingCache, CachedEmbeddings
+
+
+class CountingEmbeddings:
+    """Fake embeddings model that counts how many texts it was asked to embed"""
+    model = "fake-model"
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [[float(len(text)), 1.0, 2.0] for text in texts]
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_repeat_embedding_is_served_from_cache():
+    """The second ingestion of the same chunks does not call the model"""
+    with tempfile.TemporaryDirectory() as folder:
+        cache = EmbeddingCache(os.path.join(folder, "emb.sqlite3"), max_bytes=1024 * 1024)
+        model = CountingEmbeddings()
+        embeddings = CachedEmbeddings(model, cache)
+
+        texts = ["alpha", "beta", "gamma"]
+        first = embeddings.embed_documents(texts)
+        second = asyncio.run(embeddings.aembed_documents(texts + ["delta"]))
+
+        assert model.embedded == 4
+        assert second[:3] == first
+        assert second[3] == [5.0, 1.0, 2.0]
+        assert cache.stats()["hits"] == 3
+
+
+def test_query_embeddings_are_not_stored():
+    with tempfile.TemporaryDirectory() as folder:
+        cache = EmbeddingCache(os.path.join(folder, "emb.sqlite3"), max_bytes=1024 * 1024)
+        model = CountingEmbeddings()
+        embeddings = CachedEmbeddings(model, cache)
+
+        embeddings.embed_query("what happens in chapter 3?")
+        embeddings.embed_query("what happens in chapter 3?")
+
+        assert model.embedded == 2
+        assert cache.stats()["entries"] == 0
+
+
+def test_cache_persists_across_instances():
+    """A new cache instance on the same file still has the vectors"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "emb.sqlite3")
+        EmbeddingCache(path, max_bytes=1024 * 1024).put_many("m", ["text"], [[1.0, 2.0]])
+
+        reopened = EmbeddingCache(path, max_bytes=1024 * 1024)
+        assert reopened.get_many("m", ["text"]) == [[1.0, 2.0]]
+        assert reopened.get_many("other-model", ["text"]) == [None]
+
+
+def test_size_based_eviction_drops_oldest():
+    """Going over max_bytes evicts least recently used vectors"""
+    with tempfile.TemporaryDirectory() as folder:
+        # Each vector is 4 floats = 16 bytes, room for 4 of them
+        cache = EmbeddingCache(os.path.join(folder, "emb.sqlite3"), max_bytes=64)
+        for i in range(6):
+            cache.put_many("m", [f"text {i}"], [[float(i)] * 4])
+
+        stats = cache.stats()
+        assert stats["bytes"] <= 64
+        assert stats["evictions"] > 0
+        assert cache.get_many("m", ["text 0"]) == [None]
+        assert cache.get_many("m", ["text 5"]) == [[5.0] * 4]
+
+
+def test_workers_sharing_the_file_stay_under_the_limit():
+    """Each worker's writes count against the size of the shared table"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "emb.sqlite3")
+        workers = [EmbeddingCache(path, max_bytes=64) for _ in range(2)]
+        for i in range(8):
+            workers[i % 2].put_many("m", [f"text {i}"], [[float(i)] * 4])
+
+        assert workers[0].stats()["bytes"] <= 64
+        assert workers[1].stats()["entries"] <= 4
+        assert workers[0].get_many("m", ["text 7"]) == [[7.0] * 4]
+
+
+def test_locked_database_skips_the_write():
+    """Another process holding the write lock does not fail the ingestion"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "emb.sqlite3")
+        cache = EmbeddingCache(path, max_bytes=1024 * 1024, timeout=0.05)
+        cache.put_many("m", ["cached"], [[1.0]])
+
+        other = sqlite3.connect(path)
+        other.execute("BEGIN IMMEDIATE")
+        try:
+            cache.put_many("m", ["new"], [[2.0]])
+            assert cache.get_many("m", ["cached", "new"]) == [[1.0], None]
+        finally:
+            other.rollback()
+            other.close()
+
+        assert cache.stats()["skipped_writes"] == 1
@@ -0,0 +1,103 @@
+"""
+Offline test for the token-budgeted conversation history
+"""
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app.services.history_service import HistoryManager
+from app.utils.tokens import count_tokens
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions, returns a short summary"""
+    def __init__(self):
+        self.calls = 0
+        self.transcripts = []
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.transcripts.append(kwargs["messages"][-1]["content"])
+        message = SimpleNamespace(content=f"summary {self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeChatsRepo:
+    def __init__(self):
+        self.saved = None
+
+    async def update_history_summary(self, chat_id=None, summary=None, message_count=0):
+        self.saved = (summary, message_count)
+        return True
+
+
+def make_chat(turns):
+    messages = {}
+    for i in range(turns):
+        messages[f"q{i}"] = {"role": "user", "content": f"question {i} " + "word " * 40}
+        messages[f"a{i}"] = {"role": "assistant", "content": f"answer {i} " + "word " * 40}
+    return {"messages": messages}
+
+
+def test_short_chat_is_sent_verbatim():
+    completions = FakeCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    manager = HistoryManager(client, FakeChatsRepo(), model="gpt-4o", max_tokens=10_000)
+
+    messages = asyncio.run(manager.build("chat1", make_chat(3)))
+
+    assert len(messages) == 6
+    assert completions.calls == 0
+
+
+def test_long_chat_fits_budget_and_caches_summary():
+    """Older turns are summarized in budget-sized slices, and the cached summary is reused next turn"""
+    completions = FakeCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    repo = FakeChatsRepo()
+    manager = HistoryManager(client, repo, model="gpt-4o", max_tokens=400)
+    chat = make_chat(30)
+
+    messages = asyncio.run(manager.build("chat1", chat))
+
+    calls = completions.calls
+    assert calls > 1
+    assert messages[0]["role"] == "system" and f"summary {calls}" in messages[0]["content"]
+    assert sum(manager.message_tokens(m) for m in messages[1:]) <= 400
+    summary, covered = repo.saved
+    assert covered == 60 - len(messages[1:])
+
+    # Every slice fits the budget and extends the previous slice's summary
+    assert "Earlier summary" not in completions.transcripts[0]
+    for i, transcript in enumerate(completions.transcripts[1:], start=1):
+        assert transcript.startswith(f"Earlier summary:\nsummary {i}\n")
+        assert count_tokens(transcript.split("Conversation continued:\n")[1], manager._encoding) <= 400
+
+    # Next turn: the stored summary still covers enough, no new completion
+    chat["history_summary"], chat["history_summary_count"] = summary, covered
+    chat["messages"]["q30"] = {"role": "user", "content": "one more"}
+    asyncio.run(manager.build("chat1", chat))
+    assert completions.calls == calls
+
+
+def test_turns_follow_created_at_not_key_order():
+    """jsonb returns the messages' keys in its own order, the summary must cover the oldest turns"""
+    completions = FakeCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    manager = HistoryManager(client, FakeChatsRepo(), model="gpt-4o", max_tokens=400)
+    chat = make_chat(30)
+    for i, message in enumerate(chat["messages"].values()):
+        message["created_at"] = f"2026-01-01T00:00:{i // 10:02d}.{i % 10:06d}"
+    # Keys sorted like jsonb does (by length, then bytes), not in turn order
+    chat["messages"] = dict(sorted(chat["messages"].items(), key=lambda item: (len(item[0]), item[0])))
+
+    messages = asyncio.run(manager.build("chat1", chat))
+
+    assert messages[-1]["content"].startswith("answer 29 ")
+    assert all(set(message) == {"role", "content"} for message in messages)
+    assert "question 0 " in completions.transcripts[0] and "question 29 " not in "".join(completions.transcripts)
@@ -0,0 +1,129 @@
+"""
+Offline tests for BM25 + dense hybrid retrieval
+"""
+import sys
+import os
+import json
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from app.services.hybrid_search import (
+    KeywordIndex, KeywordIndexRegistry, reciprocal_rank_fusion, ahybrid_search
+)
+import app.services.hybrid_search as hybrid_search
+from app.services.local_vectorstore import LocalVectorStore
+from app.services.query_cache import query_cache
+
+
+def test_keyword_index_finds_identifiers_and_persists(tmp_path):
+    path = str(tmp_path / "user_a.json")
+    index = KeywordIndex(path)
+    index.add(["a", "b", "c"], [
+        Document(page_content="The constructor __init__ sets up the object state."),
+        Document(page_content="Call read_doc to load a PDF into pages.", metadata={"page": 3}),
+        Document(page_content="Objects are created from classes in Python."),
+    ])
+    assert index.search("what does read_doc do", k=1)[0][0].id == "b"
+    # Identifier parts match too
+    assert index.search("doc reader", k=1)[0][0].id == "b"
+    index.save()
+
+    reopened = KeywordIndex(path)
+    top, _score = reopened.search("__init__", k=1)[0]
+    assert top.id == "a"
+    reopened.delete(["a"])
+    assert reopened.search("__init__", k=1) == []
+    assert reopened.search("read_doc", k=1)[0][0].metadata == {"page": 3}
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = (Document(id=name, page_content=name) for name in "abc")
+    fused = reciprocal_rank_fusion([[a, b], [c, b]], k=3, rrf_k=60)
+    assert [doc.id for doc in fused] == ["b", "a", "c"]
+
+
+def test_hybrid_search_surfaces_exact_term_match(tmp_path, monkeypatch):
+    monkeypatch.setattr(hybrid_search, "keyword_indexes", KeywordIndexRegistry(str(tmp_path / "keyword"), 4))
+    query_cache.clear()
+    texts = [f"General discussion of programming topic number {i}." for i in range(30)]
+    texts.append("Gandalf arrives at Bag End.")
+    ids = [f"id-{i}" for i in range(len(texts))]
+    documents = [Document(page_content=text) for text in texts]
+
+    store = LocalVectorStore(DeterministicFakeEmbedding(size=16), namespace="user_h", path=str(tmp_path / "vectors"))
+    store.add_texts(texts, ids=ids)
+    hybrid_search.keyword_indexes.add("user_h", ids, documents)
+
+    docs, embedding = asyncio.run(ahybrid_search(store, "Who is Gandalf?", k=2))
+    assert len(docs) == 2 and len(embedding) == 16
+    assert "id-30" in [doc.id for doc in docs]
+
+
+def test_book_scope_filters_ingested_chunks(tmp_path, monkeypatch):
+    from app.services import pinecone_service
+    from app.services.pinecone_service import AsyncPineconeService
+    from app.services.local_vectorstore import LocalVectorBackend
+    from app.services.ragappfunction import aretrive_query
+
+    registry = KeywordIndexRegistry(str(tmp_path / "keyword"), 4)
+    monkeypatch.setattr(hybrid_search, "keyword_indexes", registry)
+    monkeypatch.setattr(pinecone_service, "keyword_indexes", registry)
+    query_cache.clear()
+
+    async def run():
+        embeddings = DeterministicFakeEmbedding(size=16)
+        service = AsyncPineconeService(embeddings=embeddings, pool=LocalVectorBackend(embeddings, path=str(tmp_path / "vectors")))
+        await service.ingest_documents("user_s", [Document(page_content=f"Hobbits and wizards, part {i}") for i in range(5)], book_id="book-a")
+        await service.ingest_documents("user_s", [Document(page_content=f"Python lists and wizards, part {i}") for i in range(5)], book_id="book-b")
+        store = await service.get_vectorstore("user_s")
+
+        unscoped = await aretrive_query(store, "wizards", k=4)
+        scoped = await aretrive_query(store, "wizards", k=4, book_id="book-b")
+        return unscoped, scoped
+
+    unscoped, scoped = asyncio.run(run())
+    assert len(scoped) == 4
+    assert {doc.metadata["book_id"] for doc in scoped} == {"book-b"}
+    assert all(doc.metadata.get("book_id") in ("book-a", "book-b") for doc in unscoped)
+
+
+def test_registries_on_the_same_path_share_changes(tmp_path):
+    """Two worker processes: each sees the other's saves and neither overwrites them"""
+    worker_1 = KeywordIndexRegistry(str(tmp_path), max_size=1)
+    worker_2 = KeywordIndexRegistry(str(tmp_path), max_size=1)
+    # Both load the namespace before either writes
+    assert worker_1.get("user_a").search("dragon") == []
+    assert worker_2.get("user_a").search("dragon") == []
+
+    worker_1.add("user_a", ["b1#0"], [Document(page_content="the red dragon", metadata={"book_id": "b1"})])
+    worker_1.save("user_a")
+    worker_2.add("user_a", ["b2#0"], [Document(page_content="the blue dragon", metadata={"book_id": "b2"})])
+    # Evicting saves worker 2's unsaved index, merged with worker 1's
+    worker_2.get("user_b")
+
+    assert {doc.id for doc, _score in worker_1.get("user_a").search("dragon")} == {"b1#0", "b2#0"}
+
+    assert worker_2.delete_book("user_a", "b1") == 1
+    assert [doc.id for doc, _score in worker_1.get("user_a").search("dragon")] == ["b2#0"]
+    # Two adds and a delete for one live chunk: compacted
+    with open(worker_1.file_path("user_a"), encoding="utf-8") as f:
+        assert [json.loads(line)["id"] for line in f] == ["b2#0"]
+
+    # A fresh process reads the same index
+    assert [doc.id for doc, _score in KeywordIndex(worker_1.file_path("user_a")).search("dragon")] == ["b2#0"]
+
+
+def test_keyword_index_migrates_the_json_format(tmp_path):
+    path = str(tmp_path / "user_a.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"id": "b1#0", "text": "the red dragon", "metadata": {"book_id": "b1"}, "terms": {"red": 1, "dragon": 1}}], f)
+
+    index = KeywordIndex(path)
+
+    assert [doc.id for doc, _score in index.search("dragon")] == ["b1#0"]
+    assert len(KeywordIndex(path)) == 1
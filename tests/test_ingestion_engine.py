@@ -0,0 +1,124 @@
+"""
+Offline test for the batched ingestion pipeline (no OpenAI or Pinecone calls)
+"""
+import sys
+import os
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from langchain_core.documents import Document
+from app.services.ingestion_service import IngestionEngine, stream_chunks
+
+
+class FakeEmbeddings:
+    """Returns one small vector per text and records the batch sizes"""
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def aembed_documents(self, texts):
+        self.calls.append(len(texts))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return [[float(len(text)), 0.0] for text in texts]
+
+
+def test_ingest_batches_and_upserts_everything():
+    """Every chunk is embedded once and upserted once, within the limits"""
+    embeddings = FakeEmbeddings()
+    upserted = []
+
+    async def upsert(ids, vectors, documents):
+        assert len(ids) == len(vectors) == len(documents)
+        upserted.extend(ids)
+
+    docs = [Document(page_content=f"chunk number {i} " * 5) for i in range(50)]
+    engine = IngestionEngine(embeddings, upsert, max_batch_tokens=10_000, max_batch_size=8, max_concurrency=3)
+
+    stats = asyncio.run(engine.ingest(docs))
+
+    assert stats["chunks"] == 50
+    assert len(upserted) == 50
+    assert len(set(upserted)) == 50
+    assert max(embeddings.calls) <= 8
+    assert embeddings.max_in_flight <= 3
+    assert stats["chunks_per_second"] > 0
+
+
+def test_batches_respect_token_budget():
+    """A batch never goes over the token budget unless a single chunk does"""
+    engine = IngestionEngine(FakeEmbeddings(), None, max_batch_tokens=20, max_batch_size=100, max_concurrency=1)
+    docs = [Document(page_content="word " * 8) for _ in range(10)]
+
+    for batch, tokens in engine.batches(docs):
+        assert tokens <= 20 or len(batch) == 1
+
+
+def test_upsert_failure_is_raised():
+    """A failing upsert stops ingestion instead of hanging"""
+    async def upsert(ids, vectors, documents):
+        raise RuntimeError("pinecone down")
+
+    docs = [Document(page_content=f"text {i}") for i in range(40)]
+    engine = IngestionEngine(FakeEmbeddings(), upsert, max_batch_tokens=10_000, max_batch_size=2, max_concurrency=2)
+
+    try:
+        asyncio.run(asyncio.wait_for(engine.ingest(docs), timeout=5))
+    except RuntimeError as e:
+        assert "pinecone down" in str(e)
+    else:
+        assert False, "expected the upsert error"
+
+
+def test_ingest_consumes_a_chunk_stream():
+    """Pages streamed from a blocking generator are chunked and ingested lazily"""
+    embeddings = FakeEmbeddings()
+    upserted = []
+
+    async def upsert(ids, vectors, documents):
+        upserted.extend(documents)
+
+    pages = (Document(page_content=f"page {i} " + "words " * 200, metadata={"page": i}) for i in range(20))
+    engine = IngestionEngine(embeddings, upsert, max_batch_tokens=10_000, max_batch_size=16, max_concurrency=2)
+
+    stats = asyncio.run(engine.ingest(stream_chunks(pages, chunk_size=400, chunk_overlap=50, batch_size=8)))
+
+    assert stats["chunks"] == len(upserted) > 20
+    assert sorted({doc.metadata["page"] for doc in upserted}) == list(range(20))
+
+
+def test_slow_upserts_bound_the_batches_in_memory():
+    """Embedded batches waiting for a slow upsert count against max_concurrency"""
+    embedded = []
+    upserted = []
+
+    class CountingEmbeddings(FakeEmbeddings):
+        async def aembed_documents(self, texts):
+            embedded.append(len(texts))
+            return await super().aembed_documents(texts)
+
+    async def upsert(ids, vectors, documents):
+        await asyncio.sleep(0.02)
+        upserted.append(len(ids))
+
+    docs = [Document(page_content=f"text {i}") for i in range(100)]
+    engine = IngestionEngine(CountingEmbeddings(), upsert, max_batch_tokens=10_000, max_batch_size=1, max_concurrency=2)
+    in_flight = []
+
+    async def run():
+        ingest = asyncio.create_task(engine.ingest(docs))
+        while not ingest.done():
+            in_flight.append(len(embedded) - len(upserted))
+            await asyncio.sleep(0.001)
+        return await ingest
+
+    stats = asyncio.run(run())
+
+    assert stats["batches"] == len(upserted) == 100
+    assert max(in_flight) <= 2
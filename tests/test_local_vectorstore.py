@@ -0,0 +1,155 @@
+"""
+Offline tests for the in-process vector backend (VECTOR_BACKEND=local)
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import threading
+import numpy as np
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from app.services.local_vectorstore import LocalVectorStore, IVF_MIN_VECTORS
+from app.services.query_cache import cached_search
+
+
+def test_add_search_delete_and_reopen(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    store = LocalVectorStore(embeddings, namespace="user_a", path=str(tmp_path))
+    texts = [f"passage number {i}" for i in range(20)]
+    store.add_texts(texts, metadatas=[{"book": "even" if i % 2 == 0 else "odd"} for i in range(20)],
+                    ids=[f"id-{i}" for i in range(20)])
+
+    top = store.similarity_search("passage number 7", k=3)
+    assert top[0].page_content == "passage number 7"
+    assert top[0].id == "id-7"
+    assert all(doc.metadata["book"] == "even" for doc in store.similarity_search("passage number 7", k=3, filter={"book": "even"}))
+
+    # Same id replaces the row instead of adding one
+    store.add_texts(["passage number 7, revised"], metadatas=[{"book": "odd"}], ids=["id-7"])
+    assert len(store) == 20
+
+    assert store.delete(filter={"book": "odd"}) == 10
+    reopened = LocalVectorStore(embeddings, namespace="user_a", path=str(tmp_path))
+    assert len(reopened) == 10
+    assert isinstance(reopened._vectors, np.memmap)
+    assert all(doc.metadata["book"] == "even" for doc in reopened.similarity_search("passage", k=10))
+
+    # Namespaces do not see each other
+    assert LocalVectorStore(embeddings, namespace="user_b", path=str(tmp_path)).similarity_search("passage", k=3) == []
+
+
+def test_cached_search_and_ivf_recall(tmp_path):
+    rng = np.random.default_rng(1)
+    count, size = IVF_MIN_VECTORS, 32
+    vectors = rng.normal(size=(count, size)).astype(np.float32)
+    documents = [Document(page_content=f"chunk {i}") for i in range(count)]
+    ids = [f"id-{i}" for i in range(count)]
+
+    flat = LocalVectorStore(DeterministicFakeEmbedding(size=size), namespace="flat", path=str(tmp_path), index_type="flat")
+    flat.upsert_vectors(ids, vectors, documents)
+    ivf = LocalVectorStore(DeterministicFakeEmbedding(size=size), namespace="flat", path=str(tmp_path), index_type="ivf", nprobe=16)
+
+    # A stored vector is its own nearest neighbour with either index
+    for row in (0, 1234, count - 1):
+        assert flat.similarity_search_by_vector(vectors[row], k=1)[0].id == f"id-{row}"
+        assert ivf.similarity_search_by_vector(vectors[row], k=1)[0].id == f"id-{row}"
+
+    started = time.perf_counter()
+    for row in range(100):
+        flat.similarity_search_by_vector(vectors[row], k=4)
+    assert (time.perf_counter() - started) / 100 < 0.05
+
+    docs, embedding = asyncio.run(cached_search(flat, "chunk 5", k=2))
+    assert len(docs) == 2 and len(embedding) == size
+
+
+def test_async_search_runs_off_the_event_loop(tmp_path, monkeypatch):
+    """A slow search (e.g. IVF training after a write) must not block other requests"""
+    store = LocalVectorStore(DeterministicFakeEmbedding(size=8), namespace="user_c", path=str(tmp_path))
+    store.add_texts(["a passage"], ids=["id-0"])
+    search = store.similarity_search_by_vector
+
+    def slow_search(*args, **kwargs):
+        time.sleep(0.2)
+        return search(*args, **kwargs), threading.current_thread()
+
+    monkeypatch.setattr(store, "similarity_search_by_vector", slow_search)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        (docs, thread) = await store.asimilarity_search_by_vector([1.0] * 8, k=1)
+        task.cancel()
+        return docs, thread, ticks
+
+    docs, thread, ticks = asyncio.run(run())
+    assert docs[0].id == "id-0"
+    assert thread is not threading.main_thread()
+    assert ticks >= 5
+
+
+def test_stores_of_one_namespace_stay_in_sync(tmp_path):
+    """Writes through one store (another worker, an evicted store) are seen by the others, never dropped"""
+    embeddings = DeterministicFakeEmbedding(size=8)
+    worker_1 = LocalVectorStore(embeddings, namespace="user_s", path=str(tmp_path))
+    worker_2 = LocalVectorStore(embeddings, namespace="user_s", path=str(tmp_path))
+
+    worker_1.add_texts(["from worker one"], ids=["w1"])
+    worker_2.add_texts(["from worker two"], ids=["w2"])
+    assert sorted(worker_1.list_ids()) == ["w1", "w2"]
+    assert worker_1.similarity_search("from worker two", k=1)[0].id == "w2"
+
+    worker_1.delete(ids=["w2"])
+    assert worker_2.list_ids() == ["w1"]
+    assert len(LocalVectorStore(embeddings, namespace="user_s", path=str(tmp_path))) == 1
+
+
+def test_writes_append_instead_of_rewriting(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    store = LocalVectorStore(embeddings, namespace="user_g", path=str(tmp_path))
+    records = os.path.join(store.folder, "records.jsonl")
+    vectors = os.path.join(store.folder, "vectors.f32")
+
+    store.add_texts([f"batch one {i}" for i in range(50)], ids=[f"a{i}" for i in range(50)])
+    inode, size = os.stat(records).st_ino, os.path.getsize(vectors)
+    store.add_texts([f"batch two {i}" for i in range(10)], ids=[f"b{i}" for i in range(10)])
+
+    # Only the new batch was written, the files were not replaced
+    assert os.stat(records).st_ino == inode
+    assert os.path.getsize(vectors) == size + 10 * 8 * 4
+
+    # Once dead rows outnumber live ones the files are compacted
+    store.add_texts([f"batch one {i}, revised" for i in range(50)], ids=[f"a{i}" for i in range(50)])
+    store.delete(ids=[f"b{i}" for i in range(10)])
+    assert len(store) == 50
+    assert os.path.getsize(vectors) == 50 * 8 * 4
+    assert store.similarity_search("batch one 3, revised", k=1)[0].page_content == "batch one 3, revised"
+    assert isinstance(store._vectors, np.memmap)
+
+
+def test_earlier_format_is_migrated(tmp_path):
+    folder = tmp_path / "user_m"
+    folder.mkdir()
+    np.save(folder / "vectors.npy", np.eye(3, dtype=np.float32))
+    (folder / "records.json").write_text(json.dumps([
+        {"id": f"id-{i}", "text": f"text {i}", "metadata": {"page": i}} for i in range(3)
+    ]))
+
+    store = LocalVectorStore(DeterministicFakeEmbedding(size=3), namespace="user_m", path=str(tmp_path))
+
+    assert store.similarity_search_by_vector([0.0, 1.0, 0.0], k=1)[0].metadata == {"page": 1}
+    assert not (folder / "records.json").exists()
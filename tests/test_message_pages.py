@@ -0,0 +1,63 @@
+"""
+Offline test for cursor-paginated message history (fake Supabase client, no network)
+"""
+import sys
+import os
+import uuid
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import pytest
+from app.database.base import decode_cursor
+from app.database.messages_repo import AsyncMessagesRepo, encode_message_cursor
+
+
+def _messages(count):
+    return [
+        {
+            "message_id": str(uuid.UUID(int=i)),
+            "chat_id": "c1",
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"message {i}",
+            "created_at": f"2025-01-01T00:00:00.{i:06d}"
+        }
+        for i in range(count)
+    ]
+
+
+def test_newest_first_page(fake_supabase):
+    """Opening a long chat fetches only the latest page, ordered by the database"""
+    client = fake_supabase({"messages_table": _messages(2000)})
+    repo = AsyncMessagesRepo(client)
+
+    page = asyncio.run(repo.get_messages_page("c1", limit=20, newest_first=True))
+
+    assert ("limit", (21,), {}) in client.calls
+    assert ("order", ("created_at",), {"desc": True}) in client.calls
+    assert [msg["content"] for msg in page["messages"][:2]] == ["message 1999", "message 1998"]
+    assert len(page["messages"]) == 20
+    last = page["messages"][-1]
+    assert decode_cursor(page["next_cursor"]) == (last["created_at"], last["message_id"])
+
+
+def test_before_and_after_bound_the_page(fake_supabase):
+    client = fake_supabase({"messages_table": _messages(4)})
+    repo = AsyncMessagesRepo(client)
+    before = encode_message_cursor(_messages(4)[3])
+    after = encode_message_cursor(_messages(4)[0])
+
+    page = asyncio.run(repo.get_messages_page("c1", before=before, after=after))
+
+    condition = next(args[0] for name, args, _kwargs in client.calls if name == "or_")
+    assert condition.startswith("and(or(created_at.lt.")
+    assert ",or(created_at.gt." in condition
+    assert page["next_cursor"] is None
+
+
+def test_invalid_cursor_is_rejected(fake_supabase):
+    repo = AsyncMessagesRepo(fake_supabase())
+    with pytest.raises(ValueError):
+        asyncio.run(repo.get_messages_page("c1", after="bm90IGEgY3Vyc29y"))
@@ -0,0 +1,115 @@
+"""
+Offline test for the user/book metadata cache (fake Supabase client, no network)
+"""
+import sys
+import os
+import time
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import pytest
+from app.database import metadata_cache as metadata_cache_module
+from app.database.metadata_cache import MetadataCache, MemoryCacheBackend, SQLiteCacheBackend
+from app.database.books_repo import BooksRepository
+from app.database.chats_repo import AsyncChatsRepo
+from app.database.unit_of_work import UnitOfWork
+
+
+ROWS = {
+    "books_table": [{"book_id": "b1", "book_title": "Dune", "user_id": "u1"}],
+    "chats_table": [{"chat_id": "c1", "user_id": "u1", "chat_title": "t", "messages": {}}]
+}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setenv("METADATA_CACHE_ENABLED", "true")
+    cache = MetadataCache(MemoryCacheBackend(max_entries=100), ttl_seconds=60)
+    monkeypatch.setattr(metadata_cache_module, "_metadata_cache", cache)
+    return cache
+
+
+def test_read_through_and_delete_invalidation(cache, fake_supabase):
+    client = fake_supabase(ROWS, is_async=False)
+    repo = BooksRepository.__new__(BooksRepository)
+    repo.client = client
+
+    first = repo.get_book_by_id(book_title="Dune")
+    first["book_title"] = "changed by the caller"
+    second = repo.get_book_by_id(book_title="Dune")
+
+    # One select, and callers get their own copy
+    assert client.requests == [("books_table", "select")]
+    assert second["book_title"] == "Dune"
+
+    # Deleting by id also drops the entry cached under the title
+    repo.delete_book(book_id="b1")
+    repo.get_book_by_id(book_title="Dune")
+    assert client.requests[-2:] == [("books_table", "delete"), ("books_table", "select")]
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["invalidations"] == 1
+    assert stats["tables"]["books_table"] == {"hits": 1, "misses": 2}
+
+
+def test_flushed_update_invalidates(cache, fake_supabase):
+    client = fake_supabase(ROWS)
+    cache.put("books_table", "book_title", "Dune", ROWS["books_table"][0])
+    uow = UnitOfWork()
+
+    uow.stage_update(client, "books_table", "book_id", "b1", {"book_title": "Dune Messiah"})
+    # Still cached until the update is flushed
+    assert cache.get("books_table", "book_title", "Dune") is not None
+    asyncio.run(uow.flush())
+
+    assert client.requests == [("books_table", "update")]
+    assert cache.get("books_table", "book_title", "Dune") is None
+
+
+def test_chats_are_not_cached(cache, fake_supabase):
+    """Every turn rewrites the messages, so each read goes to the database"""
+    client = fake_supabase(ROWS)
+    repo = AsyncChatsRepo(client)
+
+    async def requests():
+        await repo.get_chat_by_id(chat_id="c1")
+        await repo.update_history_summary(chat_id="c1", summary="s", message_count=2)
+        await repo.get_chat_by_id(chat_id="c1")
+
+    asyncio.run(requests())
+
+    assert client.requests == [
+        ("chats_table", "select"),
+        ("chats_table", "update"),
+        ("chats_table", "select")
+    ]
+    assert len(cache.backend) == 0 and "chats_table" not in cache.stats()["tables"]
+
+
+def test_memory_backend_expiry_and_eviction():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", "row:a", "1", ttl_seconds=0.05)
+    backend.set("b", "row:b", "2", ttl_seconds=60)
+    backend.set("c", "row:c", "3", ttl_seconds=60)
+
+    assert backend.get("a") is None and backend.evictions == 1
+    time.sleep(0.06)
+    backend.set("d", "row:d", "4", ttl_seconds=0.05)
+    time.sleep(0.06)
+    assert backend.get("d") is None
+    assert backend.get("c") == "3"
+
+
+def test_sqlite_backend_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "metadata.sqlite3")
+    worker_1 = MetadataCache(SQLiteCacheBackend(path, max_entries=100), ttl_seconds=60)
+    worker_2 = MetadataCache(SQLiteCacheBackend(path, max_entries=100), ttl_seconds=60)
+
+    worker_1.put("user_table", "email", "a@b.c", {"user_id": "u1", "email": "a@b.c"})
+    assert worker_2.get("user_table", "email", "a@b.c")["user_id"] == "u1"
+
+    worker_2.invalidate("user_table", "user_id", "u1")
+    assert worker_1.get("user_table", "email", "a@b.c") is None
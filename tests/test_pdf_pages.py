@@ -0,0 +1,81 @@
+"""
+Offline test for the parallel PDF page extraction, against PyPDFLoader on the bundled PDFs
+"""
+import sys
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import pytest
+from app.services.ragappfunction import iter_pdf_pages, read_doc, count_pages
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from langchain_community.document_loaders import PyPDFLoader
+
+PDFS = [
+    os.path.join(project_root, "shortstory.pdf"),
+    os.path.join(project_root, "Code files", "EndGlobe .pdf"),
+    # Long enough to be split across the pool
+    os.path.join(project_root, "Python Programming.pdf")
+]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    executor = ProcessPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture(scope="module")
+def loaded():
+    """PyPDFLoader's pages of every bundled PDF, loaded once"""
+    return {path: PyPDFLoader(path).load() for path in PDFS}
+
+
+@pytest.mark.parametrize("path", PDFS, ids=os.path.basename)
+def test_pages_match_pypdf_loader(path, pool, loaded):
+    """Same pages, in the same order, with the same metadata"""
+    expected = loaded[path]
+
+    pages = list(iter_pdf_pages(path, executor=pool, pages_per_task=8))
+
+    assert [page.metadata["page"] for page in pages] == list(range(len(expected)))
+    assert [page.page_content for page in pages] == [doc.page_content for doc in expected]
+    assert [page.metadata for page in pages] == [doc.metadata for doc in expected]
+
+
+def test_read_doc_uses_the_given_pool(pool, loaded):
+    path = PDFS[-1]
+    submitted = []
+
+    class RecordingPool:
+        _max_workers = 2
+
+        def submit(self, fn, *args):
+            submitted.append(args[1:3])
+            return pool.submit(fn, *args)
+
+    docs = read_doc(path, executor=RecordingPool())
+
+    assert submitted and submitted[0][0] == 0
+    assert [doc.page_content for doc in docs] == [doc.page_content for doc in loaded[path]]
+
+
+@pytest.mark.parametrize("path", PDFS, ids=os.path.basename)
+def test_bytes_match_the_path(path, pool):
+    """An upload parsed from memory gives the same pages as the file on disk"""
+    with open(path, "rb") as f:
+        content = f.read()
+
+    from_path = list(iter_pdf_pages(path, executor=pool, pages_per_task=8))
+    from_bytes = list(iter_pdf_pages(content, executor=pool, pages_per_task=8, name=path))
+
+    assert count_pages(content) == count_pages(path) == len(from_path)
+    assert [page.page_content for page in from_bytes] == [page.page_content for page in from_path]
+    assert [page.metadata for page in from_bytes] == [page.metadata for page in from_path]
@@ -0,0 +1,95 @@
+"""
+Offline test for the per-namespace retrieval query cache
+"""
+import sys
+import os
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from langchain_core.documents import Document
+from app.services.query_cache import QueryCache, cached_retrieve, query_cache
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.queries = 0
+
+    async def aembed_query(self, text):
+        self.queries += 1
+        return [float(len(text))]
+
+
+class FakeVectorStore:
+    """Counts embedding and search calls like a PineconeVectorStore would make them"""
+    def __init__(self, namespace):
+        self._namespace = namespace
+        self.embeddings = FakeEmbeddings()
+        self.searches = 0
+
+    async def asimilarity_search_by_vector(self, embedding, k=2):
+        self.searches += 1
+        return [Document(page_content=f"result {self.searches}", id=str(i)) for i in range(k)]
+
+
+def test_repeated_question_is_served_from_cache():
+    """Near-identical questions skip both the embedding and the search"""
+    query_cache.clear()
+    store = FakeVectorStore("user_cache_test")
+
+    first = asyncio.run(cached_retrieve(store, "What is a list?"))
+    second = asyncio.run(cached_retrieve(store, "  what is a   LIST "))
+
+    assert store.embeddings.queries == 1
+    assert store.searches == 1
+    assert [doc.page_content for doc in second] == [doc.page_content for doc in first]
+
+
+def test_invalidation_reuses_embedding_but_searches_again():
+    """A book change in the namespace forces a new search, not a new embedding"""
+    query_cache.clear()
+    store = FakeVectorStore("user_invalidate_test")
+
+    asyncio.run(cached_retrieve(store, "What is a tuple?"))
+    query_cache.invalidate("user_invalidate_test")
+    refreshed = asyncio.run(cached_retrieve(store, "What is a tuple?"))
+
+    assert store.embeddings.queries == 1
+    assert store.searches == 2
+    assert refreshed[0].page_content == "result 2"
+
+
+def test_ttl_and_lru_eviction():
+    """Expired entries miss and the oldest entries are evicted past max_entries"""
+    cache = QueryCache(max_entries=2, ttl_seconds=0)
+    cache.put("ns", "q1", 2, [1.0], [])
+    assert cache.get("ns", "q1", 2) == (None, None)
+
+    cache = QueryCache(max_entries=2, ttl_seconds=60)
+    for question in ("q1", "q2", "q3"):
+        cache.put("ns", question, 2, [1.0], [])
+    assert cache.get("ns", "q1", 2) == (None, None)
+    assert cache.get("ns", "q3", 2)[0] == []
+    assert cache.stats()["evictions"] == 1
+
+
+def test_search_overlapping_an_invalidation_is_not_cached():
+    """Results that may predate a book change are returned but not stored"""
+    query_cache.clear()
+    store = FakeVectorStore("user_race_test")
+    search = store.asimilarity_search_by_vector
+
+    async def search_during_invalidation(embedding, k=2):
+        # A book is added while the search is running
+        query_cache.invalidate("user_race_test")
+        return await search(embedding, k=k)
+
+    store.asimilarity_search_by_vector = search_during_invalidation
+    asyncio.run(cached_retrieve(store, "What is a set?"))
+    store.asimilarity_search_by_vector = search
+    again = asyncio.run(cached_retrieve(store, "What is a set?"))
+
+    assert store.searches == 2
+    assert again[0].page_content == "result 2"
@@ -0,0 +1,123 @@
+"""
+Offline test for diff-based re-indexing with deterministic chunk ids
+"""
+import sys
+import os
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from app.services import pinecone_service
+from app.services import hybrid_search
+from app.services.hybrid_search import KeywordIndexRegistry
+from app.services.pinecone_service import AsyncPineconeService, book_vector_ids
+from app.services.local_vectorstore import LocalVectorBackend
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    async def aembed_documents(self, texts):
+        self.embedded += len(texts)
+        return self.embed_documents(texts)
+
+
+def chunks(texts):
+    return [Document(page_content=text, metadata={"page": 1}) for text in texts]
+
+
+def test_book_vector_ids_are_deterministic_and_unique():
+    make_id = book_vector_ids("book-a")
+    ids = [make_id(doc) for doc in chunks(["alpha", "beta", "alpha"])]
+    again = book_vector_ids("book-a")
+    assert ids == [again(doc) for doc in chunks(["alpha", "beta", "alpha"])]
+    assert len(set(ids)) == 3 and ids[2] == ids[0] + "-2"
+    assert all(vector_id.startswith("book-a#") for vector_id in ids)
+
+
+def test_reindex_only_touches_changed_chunks(tmp_path, monkeypatch):
+    registry = KeywordIndexRegistry(str(tmp_path / "keyword"), 4)
+    monkeypatch.setattr(hybrid_search, "keyword_indexes", registry)
+    monkeypatch.setattr(pinecone_service, "keyword_indexes", registry)
+
+    async def run():
+        embeddings = CountingEmbeddings(size=16)
+        service = AsyncPineconeService(embeddings=embeddings, pool=LocalVectorBackend(embeddings, path=str(tmp_path / "vectors")))
+        texts = [f"chunk {i}" for i in range(10)]
+
+        first = await service.reindex_book("user_r", "book-a", chunks(texts))
+        embedded_first = embeddings.embedded
+        repeat = await service.reindex_book("user_r", "book-a", chunks(texts))
+        embedded_repeat = embeddings.embedded - embedded_first
+        changed = await service.reindex_book("user_r", "book-a", chunks(texts[:8] + ["chunk 10", "chunk 11", "chunk 12"]))
+        store = await service.get_vectorstore("user_r")
+        return first, repeat, embedded_repeat, changed, store
+
+    first, repeat, embedded_repeat, changed, store = asyncio.run(run())
+    assert first["chunks"] == 10 and first["unchanged"] == 0
+    assert repeat["chunks"] == 0 and repeat["unchanged"] == 10 and repeat["deleted"] == 0
+    assert embedded_repeat == 0
+    assert changed["chunks"] == 3 and changed["unchanged"] == 8 and changed["deleted"] == 2
+    assert len(store) == 11
+    assert len(registry.get("user_r")) == 11
+
+
+def test_reindex_replaces_vectors_with_legacy_ids(tmp_path, monkeypatch):
+    """A book ingested with random ids is not duplicated by its first re-index"""
+    registry = KeywordIndexRegistry(str(tmp_path / "keyword"), 4)
+    monkeypatch.setattr(hybrid_search, "keyword_indexes", registry)
+    monkeypatch.setattr(pinecone_service, "keyword_indexes", registry)
+
+    async def run():
+        embeddings = CountingEmbeddings(size=16)
+        service = AsyncPineconeService(embeddings=embeddings, pool=LocalVectorBackend(embeddings, path=str(tmp_path / "vectors")))
+        store = await service.get_vectorstore("user_l")
+        texts = [f"chunk {i}" for i in range(5)]
+        legacy = [Document(page_content=text, metadata={"page": 1, "book_id": "book-a"}) for text in texts]
+        other = [Document(page_content="other book", metadata={"page": 1, "book_id": "book-b"})]
+        store.upsert_vectors(
+            [f"random-{i}" for i in range(5)] + ["book-b-random"],
+            embeddings.embed_documents(texts + ["other book"]),
+            legacy + other
+        )
+
+        stats = await service.reindex_book("user_l", "book-a", chunks(texts))
+        return stats, store
+
+    stats, store = asyncio.run(run())
+    assert stats["chunks"] == 5 and stats["legacy_replaced"] == 5 and stats["deleted"] == 5
+    assert len(store) == 6
+    assert sorted(store.list_ids(filter={"book_id": "book-a"})) == sorted(store.list_ids("book-a#"))
+    assert store.list_ids(filter={"book_id": "book-b"}) == ["book-b-random"]
+
+
+def test_reprocessing_streams_the_stored_book(tmp_path, monkeypatch):
+    """/process feeds the book's chunks to reindex_book as a stream, same chunks as the whole-book path"""
+    registry = KeywordIndexRegistry(str(tmp_path / "keyword"), 4)
+    monkeypatch.setattr(hybrid_search, "keyword_indexes", registry)
+    monkeypatch.setattr(pinecone_service, "keyword_indexes", registry)
+    path = os.path.join(project_root, "shortstory.pdf")
+
+    class FakeBooksRepo:
+        async def download_file_from_storage(self, storage_path):
+            with open(path, "rb") as f:
+                return f.read()
+
+    async def run():
+        embeddings = CountingEmbeddings(size=16)
+        service = AsyncPineconeService(
+            books_repo=FakeBooksRepo(), embeddings=embeddings,
+            pool=LocalVectorBackend(embeddings, path=str(tmp_path / "vectors"))
+        )
+        documents = await service.stream_book({"storage_path": "u/shortstory.pdf", "filename": "shortstory.pdf"})
+        assert hasattr(documents, "__aiter__")
+        return await service.reindex_book("user_s", "book-s", documents)
+
+    stats = asyncio.run(run())
+
+    expected = pinecone_service.chunks(pinecone_service.read_doc(path, name="shortstory.pdf"))
+    assert stats["total_chunks"] == stats["chunks"] == len(expected)
@@ -29,9 +29,8 @@ def test_auth_flow():
     else:
         print(f"   User not found. Creating new user...")
         try:
-            response = users_repo.create_user(email=test_email, name=test_name)
-            if response and response.data:
-                user_data = response.data[0]
+            user_data = users_repo.create_user(email=test_email, name=test_name)
+            if user_data:
                 user_id = user_data.get('user_id')
                 print(f"   User created successfully!")
                 print(f"   User ID: {user_id}")
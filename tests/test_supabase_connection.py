@@ -68,11 +68,10 @@ def test_create_and_retrieve_user():
 
         # Create user
         print(f"Creating test user: {test_name} ({test_email})")
-        response = users_repo.create_user(email=test_email, name=test_name)
+        created_user = users_repo.create_user(email=test_email, name=test_name)
 
-        if response and response.data:
+        if created_user:
             print("[PASS] User created successfully")
-            created_user = response.data[0]
             print(f"  User ID: {created_user.get('user_id')}")
             print(f"  Name: {created_user.get('name')}")
             print(f"  Email: {created_user.get('email')}")
@@ -91,7 +90,7 @@ def test_create_and_retrieve_user():
                 print("[FAIL] Failed to retrieve user after creation!")
                 return False
         else:
-            print(f"[FAIL] Failed to create user: {response}")
+            print(f"[FAIL] Failed to create user: {created_user}")
             return False
 
     except Exception as e:
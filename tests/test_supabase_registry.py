@@ -0,0 +1,55 @@
+"""
+Offline test for the shared async Supabase client (client creation is faked, no network)
+"""
+import sys
+import os
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import pytest
+from app.database import base
+from app.database.base import SupabaseClientRegistry
+
+
+@pytest.fixture
+def created(monkeypatch):
+    """Clients built by the registry, with a slow fake acreate_client"""
+    monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setenv("SUPABASE_SERVICE_KEY", "service-key")
+    monkeypatch.setenv("SUPABASE_HTTP2", "false")
+    clients = []
+
+    async def acreate_client(url, key, options=None):
+        await asyncio.sleep(0.01)
+        clients.append(options.httpx_client)
+        return object()
+
+    monkeypatch.setattr(base, "acreate_client", acreate_client)
+    return clients
+
+
+def test_concurrent_first_calls_build_one_client(created):
+    registry = SupabaseClientRegistry()
+
+    async def first_requests():
+        return await asyncio.gather(*(registry.astartup() for _ in range(5)))
+
+    clients = asyncio.run(first_requests())
+
+    assert len(created) == 1
+    assert all(client is clients[0] for client in clients)
+
+
+def test_new_loop_closes_the_previous_client(created):
+    registry = SupabaseClientRegistry()
+
+    first = asyncio.run(registry.astartup())
+    second = asyncio.run(registry.astartup())
+
+    assert first is not second
+    assert created[0].is_closed and not created[1].is_closed
+    asyncio.run(registry.ashutdown())
+    assert created[1].is_closed
@@ -0,0 +1,119 @@
+"""
+Offline test for the request-scoped unit of work (fake Supabase client, no network)
+"""
+import sys
+import os
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import pytest
+from fastapi.testclient import TestClient
+from app.database.chats_repo import AsyncChatsRepo
+from app.database.messages_repo import AsyncMessagesRepo
+from app.database.unit_of_work import unit_of_work, FlushError
+from app.services.chat_service import AsyncChatService
+
+
+@pytest.fixture(autouse=True)
+def no_metadata_cache(monkeypatch):
+    # These tests count requests, the metadata cache is tested on its own
+    monkeypatch.setenv("METADATA_CACHE_ENABLED", "false")
+
+
+CHAT = {"chat_id": "chat1", "user_id": "u1", "chat_title": "t", "messages": {}}
+
+
+class FakeOpenAI:
+    async def continue_chat(self, **_kwargs):
+        return "answer"
+
+
+def test_continue_chat_loads_the_chat_once(fake_supabase):
+    """The router's and the service's lookups share one select, the update is flushed once"""
+    client = fake_supabase({"chats_table": [CHAT]})
+    chats_repo = AsyncChatsRepo(client)
+    service = AsyncChatService(
+        user_id="u1",
+        question=None,
+        vectorstore=None,
+        chats_repo=chats_repo,
+        messages_repo=AsyncMessagesRepo(client),
+        openai_service=FakeOpenAI()
+    )
+
+    async def request():
+        async with unit_of_work() as uow:
+            # What /api/chats/continue does: check the chat, then continue it
+            assert await chats_repo.get_chat_by_id(chat_id="chat1")
+            assert await service.continuing_chat("chat1", "question") == "answer"
+            await chats_repo.update_history_summary(chat_id="chat1", summary="s", message_count=2)
+            # Staged changes are visible to later reads of the same request
+            chat = await chats_repo.get_chat_by_id(chat_id="chat1")
+            assert len(chat["messages"]) == 2 and chat["history_summary"] == "s"
+            assert client.requests == [("chats_table", "select"), ("messages_table", "insert")]
+        return uow
+
+    uow = asyncio.run(request())
+
+    assert client.requests[-1] == ("chats_table", "update")
+    assert client.requests.count(("chats_table", "update")) == 1
+    assert uow.round_trips == 3
+    assert uow.identity_hits == 2
+
+
+def test_without_unit_of_work_writes_go_out_immediately(fake_supabase):
+    client = fake_supabase({"chats_table": [CHAT]})
+    chats_repo = AsyncChatsRepo(client)
+
+    async def calls():
+        await chats_repo.get_chat_by_id(chat_id="chat1")
+        await chats_repo.get_chat_by_id(chat_id="chat1")
+        return await chats_repo.update_history_summary(chat_id="chat1", summary="s", message_count=2)
+
+    row = asyncio.run(calls())
+
+    assert row["history_summary"] == "s"
+    assert client.requests == [("chats_table", "select"), ("chats_table", "select"), ("chats_table", "update")]
+
+
+def test_failed_request_is_not_flushed(fake_supabase):
+    client = fake_supabase({"chats_table": [CHAT]})
+    chats_repo = AsyncChatsRepo(client)
+
+    async def request():
+        async with unit_of_work():
+            await chats_repo.update_history_summary(chat_id="chat1", summary="s", message_count=2)
+            raise RuntimeError("handler failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(request())
+
+    assert client.requests == []
+
+
+def test_flush_error_is_raised(fake_supabase):
+    client = fake_supabase({"chats_table": [CHAT]})
+    chats_repo = AsyncChatsRepo(client)
+
+    async def request():
+        async with unit_of_work():
+            await chats_repo.update_history_summary(chat_id="chat1", summary="s", message_count=2)
+            client.unavailable = True
+
+    with pytest.raises(FlushError, match="chat_id=chat1"):
+        asyncio.run(request())
+
+
+def test_debug_headers(monkeypatch):
+    import main
+
+    assert "X-DB-Round-Trips" not in TestClient(main.app).get("/health").headers
+
+    monkeypatch.setenv("DB_DEBUG_HEADERS", "true")
+    response = TestClient(main.app).get("/health")
+
+    assert response.headers["X-DB-Round-Trips"] == "0"
+    assert response.headers["X-DB-Identity-Hits"] == "0"
@@ -0,0 +1,45 @@
+"""
+Offline test for the shared per-namespace vectorstore pool
+"""
+import sys
+import os
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from pinecone import Pinecone
+from langchain_core.embeddings import FakeEmbeddings
+from app.services.pinecone_service import VectorStorePool
+
+
+def test_pool_reuses_stores_and_evicts_least_recent():
+    async def run():
+        host = "https://test-index.svc.pinecone.io"
+        client = Pinecone(api_key="pc-test")
+        pool = VectorStorePool(FakeEmbeddings(size=8), api_key="pc-test", max_size=2)
+        # Connected by hand, connect() would resolve the host over the network
+        pool.index = client.Index(host=host)
+        pool.async_index = client.IndexAsyncio(host=host)
+
+        first = await pool.get("user_a")
+        assert await pool.get("user_a") is first
+        assert first._namespace == "user_a"
+
+        await pool.get("user_b")
+        await pool.get("user_a")  # user_b is now the least recently used
+        await pool.get("user_c")
+
+        stats = pool.stats()
+        assert stats["namespaces"] == 2
+        assert stats["evictions"] == 1
+        assert stats["hits"] == 2 and stats["misses"] == 3
+        assert await pool.get("user_a") is first
+        # Every store searches through the one shared async index
+        assert (await pool.get("user_c"))._async_index is pool.async_index
+
+        await pool.close()
+        assert pool.async_index is None
+
+    asyncio.run(run())
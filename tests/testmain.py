@@ -185,9 +185,9 @@ def create_new_user() -> UserProfile:
         # Create user
         try:
             print("\nCreating user account...")
-            response = users_repo.create_user(email=email, name=name)
+            user_data = users_repo.create_user(email=email, name=name)
 
-            if response and response.data:
+            if user_data:
                 print(f"\nAccount created successfully!")
                 print(f"Welcome, {name}!")
 
@@ -428,13 +428,9 @@ def chat_session(user_profile: UserProfile, chat_id=None):
                     if result and result != "end":
                         print(f"\nAI Response: {result}")
 
-                        # Get the chat_id that was created
-                        chats_repo_instance = chatsRepo()
-                        all_chats = chats_repo_instance.get_all_chats(user_id=user_profile.user_id)
-                        if all_chats and len(all_chats) > 0:
-                            # Sort by created_at and get the most recent
-                            sorted_chats = sorted(all_chats, key=lambda x: x.get('created_at', ''), reverse=True)
-                            current_chat_id = sorted_chats[0].get('chat_id')
+                        # new_chat keeps the chat_id of the chat it created
+                        current_chat_id = chat_service.chat_id
+                        if current_chat_id:
                             print("\n[INFO] Chat will continue automatically. Type 'end chat' to start a new conversation.")
                     else:
                         print("\nFailed to create chat. Please try again.")